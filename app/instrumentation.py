@@ -0,0 +1,183 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger("app.slow_requests")
+
+# Distinct statements kept in a slow log entry, most expensive first.
+SLOW_LOG_MAX_STATEMENTS = 20
+
+
+class RequestTiming:
+    """What one request spent: SQL per statement, the view and rendering."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}
+        self.view_started = self.view_finished = None
+        self.view_db_time = 0.0
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Called by record_query() for each statement of the request.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            count, total = self.statements.get(sql, (0, 0.0))
+            self.statements[sql] = (count + 1, total + duration)
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def finish_view(self):
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+            self.view_db_time = self.db_time - self.view_db_time
+
+    @property
+    def view_time(self):
+        # Python time in the view, which for API views is mostly serialization.
+        if self.view_finished is None:
+            return 0.0
+        return self.view_finished - self.view_started - self.view_db_time
+
+    def server_timing(self, total):
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f"view;dur={self.view_time * 1000:.1f}",
+            f"render;dur={self.render_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+    def slow_log_entry(self, request, response, total):
+        statements = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(total * 1000, 1),
+            "db_ms": round(self.db_time * 1000, 1),
+            "queries": self.queries,
+            "view_ms": round(self.view_time * 1000, 1),
+            "render_ms": round(self.render_time * 1000, 1),
+            "sql": [
+                {"sql": sql, "count": count, "duration_ms": round(duration * 1000, 1)}
+                for sql, (count, duration) in statements[:SLOW_LOG_MAX_STATEMENTS]
+            ],
+        }
+
+
+# The RequestTiming of the request being served. Context variables follow
+# the request into sync_to_async threads, where the ORM runs under ASGI.
+current_timing = ContextVar("current_timing", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    # A database execute_wrapper, installed once per connection.
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_wrappers():
+    # Connections are per thread; this covers the calling thread's.
+    for connection in connections.all():
+        install_wrapper(connection)
+
+
+class RequestTimingMiddleware:
+    """
+    Measure every request's SQL (count and time), view and render time.
+    They are reported in a Server-Timing header when SERVER_TIMING_HEADER
+    is set, and requests slower than SLOW_REQUEST_THRESHOLD seconds are
+    logged as JSON, with their most expensive statements, to the
+    `app.slow_requests` logger.
+
+    Queries are attributed to the request through `current_timing`, so
+    concurrent requests under ASGI are measured apart, including the ORM
+    calls they make through sync_to_async. With REQUEST_INSTRUMENTATION
+    off the middleware removes itself from the stack, so it costs nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION or not (
+            settings.SERVER_TIMING_HEADER or settings.SLOW_REQUEST_THRESHOLD
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened later, in any thread.
+        connection_created.connect(install_wrapper)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_wrappers()
+        timing = request._timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        # The async ORM runs on the thread-sensitive sync thread.
+        await sync_to_async(install_wrappers)()
+        timing = request._timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        timing.finish_view()
+        total = time.perf_counter() - timing.started
+
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timing.server_timing(total)
+        threshold = settings.SLOW_REQUEST_THRESHOLD
+        if threshold and total >= threshold:
+            logger.warning(json.dumps(timing.slow_log_entry(request, response, total)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing.start_view()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that too.
+        timing = request._timing
+        timing.finish_view()
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            timing.render_time = time.perf_counter() - render_started
+
+        response.add_post_render_callback(rendered)
+        return response
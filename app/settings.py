@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # local_apps
     "users",
@@ -42,11 +43,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.middleware.RequestProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -86,6 +89,16 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a backend shared by all workers (e.g. filecache:///var/tmp/blog_cache
+# or a Redis URL) when running more than one process.
+
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://"),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -123,6 +136,20 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Resized copies of uploaded cover and profile photos (users.images), as
+# name: (max width, max height). Each is written as JPEG/PNG and as WebP.
+IMAGE_VARIANT_SIZES = {
+    "thumbnail": (200, 200),
+    "medium": (800, 800),
+}
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_VARIANT_WORKERS = env.int("IMAGE_VARIANT_WORKERS", default=2)
+# False generates the variants inline when the upload commits (tests).
+IMAGE_VARIANTS_IN_BACKGROUND = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -136,7 +163,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
      "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -149,6 +176,22 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# In-process LRU of users loaded by ClaimsUser.get_user()
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+
+# Password hashing for login and signup runs on a bounded pool (users.hashing)
+AUTH_HASHING_WORKERS = env.int("AUTH_HASHING_WORKERS", default=2)
+AUTH_HASHING_MAX_PENDING = env.int("AUTH_HASHING_MAX_PENDING", default=32)
+
+# Per-request SQL, view and render timings (app/instrumentation.py). When
+# off, the middleware is dropped at startup.
+REQUEST_INSTRUMENTATION = env.bool("REQUEST_INSTRUMENTATION", default=False)
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=True)
+# Requests slower than this many seconds are logged with their SQL to the
+# app.slow_requests logger (0 disables)
+SLOW_REQUEST_THRESHOLD = env.float("SLOW_REQUEST_THRESHOLD", default=0.5)
+
 
 
 SPECTACULAR_SETTINGS = {
@@ -156,4 +199,39 @@ SPECTACULAR_SETTINGS = {
     'DESCRIPTION': 'A simple blog API built with Django Rest Framework for interview',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
-}
\ No newline at end of file
+    'PREPROCESSING_HOOKS': ['users.schema.add_auth_endpoints'],
+}
+
+#blog
+# Number of latest comments embedded per post in posts_list/
+BLOG_COMMENTS_PREVIEW_SIZE = env.int("BLOG_COMMENTS_PREVIEW_SIZE", default=3)
+
+# Anonymous posts_list/ pages are cached for this many seconds (0 disables)
+BLOG_LIST_CACHE_TIMEOUT = env.int("BLOG_LIST_CACHE_TIMEOUT", default=60)
+BLOG_LIST_CACHE_ALIAS = "default"
+# How long a request waits for another worker to rebuild the same page
+BLOG_LIST_CACHE_LOCK_WAIT = 2
+
+# Buffer likes in memory and write them in batches every
+# BLOG_LIKES_FLUSH_INTERVAL seconds (see blog/like_buffer.py)
+BLOG_LIKES_WRITE_BEHIND = env.bool("BLOG_LIKES_WRITE_BEHIND", default=False)
+BLOG_LIKES_FLUSH_INTERVAL = env.float("BLOG_LIKES_FLUSH_INTERVAL", default=1.0)
+BLOG_LIKES_FLUSH_BATCH_SIZE = 500
+
+# Serve posts_list/ and comments-list/ JSON from values() rows (blog/api/fast.py)
+BLOG_FAST_SERIALIZERS = env.bool("BLOG_FAST_SERIALIZERS", default=True)
+
+# Posts read per server-side cursor fetch by posts/export/ and export_posts
+BLOG_EXPORT_CHUNK_SIZE = env.int("BLOG_EXPORT_CHUNK_SIZE", default=2000)
+
+# Typeahead (blog/autocomplete/): hard cap on results and cache lifetime
+BLOG_AUTOCOMPLETE_LIMIT = 10
+BLOG_AUTOCOMPLETE_CACHE_TIMEOUT = env.int("BLOG_AUTOCOMPLETE_CACHE_TIMEOUT", default=30)
+
+# Resumable cover photo uploads (blog/uploads/). Partial files are kept
+# outside MEDIA_ROOT and moved into place by blogpost-create/.
+BLOG_UPLOAD_DIR = Path(env("BLOG_UPLOAD_DIR", default=str(BASE_DIR / "uploads")))
+BLOG_UPLOAD_MAX_SIZE = env.int("BLOG_UPLOAD_MAX_SIZE", default=20 * 1024 * 1024)
+BLOG_UPLOAD_MAX_CHUNK_SIZE = env.int("BLOG_UPLOAD_MAX_CHUNK_SIZE", default=5 * 1024 * 1024)
+# Unfinished or unused sessions expire after this many seconds
+BLOG_UPLOAD_EXPIRY = env.int("BLOG_UPLOAD_EXPIRY", default=24 * 60 * 60)
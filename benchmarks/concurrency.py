@@ -0,0 +1,154 @@
+"""
+Compare how the sync (WSGI) and async (ASGI) blog views hold up as the
+number of concurrent clients grows.
+
+Start the same code twice, with the same number of worker processes:
+
+    BLOG_LIST_CACHE_TIMEOUT=0 gunicorn app.wsgi:application -w 2 --bind 127.0.0.1:8001
+    BLOG_LIST_CACHE_TIMEOUT=0 gunicorn app.asgi:application -w 2 \\
+        -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8002
+
+then point this script at one endpoint on each:
+
+    python benchmarks/concurrency.py \\
+        wsgi=http://127.0.0.1:8001/blog/posts_list/ \\
+        asgi=http://127.0.0.1:8002/blog/async/posts_list/ \\
+        --concurrency 1,8,32,128 --duration 10
+
+Every middleware in MIDDLEWARE must be async-capable for the ASGI numbers
+to mean anything: a sync-only one makes Django run each request through
+one shared thread, which serializes the async views.
+
+Only the standard library is used. Each client is a thread with its own
+keep-alive connection; the report shows throughput and latency percentiles
+per target and concurrency level, and `--json` writes the raw numbers.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Client:
+
+    def __init__(self, url, headers, timeout):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connect = lambda: connection_class(parts.netloc, timeout=timeout)
+        self.path = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.headers = headers
+        self.connection = self.connect()
+
+    def request(self):
+        try:
+            self.connection.request("GET", self.path, headers=self.headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = self.connect()
+            return None
+
+
+def run(url, concurrency, duration, headers, timeout):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def worker():
+        client = Client(url, headers, timeout)
+        local, failed = [], 0
+        start.wait()
+        while time.monotonic() < deadline[0]:
+            began = time.monotonic()
+            status = client.request()
+            if status is None or status >= 400:
+                failed += 1
+            else:
+                local.append(time.monotonic() - began)
+        client.connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.monotonic() + duration
+    start.wait()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": len(latencies) / duration,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+        "p50_ms": (percentile(latencies, 0.50) or 0) * 1000,
+        "p95_ms": (percentile(latencies, 0.95) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 0.99) or 0) * 1000,
+    }
+
+
+def parse_target(value):
+    label, sep, url = value.partition("=")
+    if not sep:
+        label, url = value, value
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise argparse.ArgumentTypeError(f"not an http(s) URL: {url}")
+    return label, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="+", type=parse_target, help="label=url pairs to compare")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load per target")
+    parser.add_argument("--token", help="send `Authorization: Bearer <token>`")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    headers = {"Accept": "application/json"}
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+
+    results = {}
+    print(f"{'target':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, url in args.targets:
+        if args.warmup > 0:
+            run(url, min(levels), args.warmup, headers, args.timeout)
+        results[label] = {"url": url, "levels": []}
+        for level in levels:
+            result = run(url, level, args.duration, headers, args.timeout)
+            results[label]["levels"].append(result)
+            print(
+                f"{label:<12}{level:>8}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}"
+                f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}"
+            )
+            sys.stdout.flush()
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
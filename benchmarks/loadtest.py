@@ -0,0 +1,325 @@
+"""
+Drive a realistic mix of API traffic against a running server and report
+throughput and latency percentiles per endpoint.
+
+Start the server the way it runs in production, for example
+
+    gunicorn app.wsgi:application -w 4 --bind 127.0.0.1:8000
+
+then run a mix for 60 seconds with 32 concurrent sessions, each logged in
+as one of the given users (or as users registered for the run):
+
+    python benchmarks/loadtest.py run http://127.0.0.1:8000 \\
+        --user alice:secret123 --user bob:secret123 --signup 8 \\
+        --clients 32 --duration 60 --json before.json
+
+and, after a change, compare two runs:
+
+    python benchmarks/loadtest.py compare before.json after.json
+
+The default mix is mostly reads: `posts_list` 50, `comments_list` 25,
+`like` 10, `comment_create` 10 and `login` 5 (relative weights, see
+--mix). `--anonymous` is the share of reads sent without a token, which
+are the ones the page cache serves. Likes and comments go to posts seen
+on the first pages of posts_list/.
+
+Only the standard library is used. Each session is a thread with its own
+keep-alive connection.
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from concurrency import percentile
+
+ENDPOINTS = ("posts_list", "comments_list", "like", "comment_create", "login")
+DEFAULT_MIX = "posts_list=50,comments_list=25,like=10,comment_create=10,login=5"
+
+
+class Session:
+    """One client: a keep-alive connection and, once logged in, a token."""
+
+    def __init__(self, base_url, credentials, timeout):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connect = lambda: connection_class(parts.netloc, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.connection = self.connect()
+        self.username, self.password = credentials
+        self.token = None
+
+    def request(self, method, path, data=None, authenticated=True):
+        headers = {"Accept": "application/json"}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers["Content-Type"] = "application/json"
+        if authenticated and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = self.connect()
+            return None, b""
+
+    def login(self):
+        status, body = self.request(
+            "POST", "/user_auth/login_user/", {"username": self.username, "password": self.password},
+            authenticated=False,
+        )
+        if status == 200:
+            self.token = json.loads(body)["data"]["access"]
+        return status, body
+
+    def close(self):
+        self.connection.close()
+
+
+class Traffic:
+    """Picks the next request of a session according to the mix."""
+
+    def __init__(self, mix, post_ids, pages, anonymous, seed):
+        self.endpoints, self.weights = zip(*mix.items())
+        self.post_ids = post_ids
+        self.pages = pages
+        self.anonymous = anonymous
+        self.random = random.Random(seed)
+
+    def next(self, session):
+        endpoint = self.random.choices(self.endpoints, self.weights)[0]
+        anonymous = self.random.random() < self.anonymous
+        if endpoint == "posts_list":
+            # Most readers stay on the first page.
+            page = min(1 + int(self.random.expovariate(1.5)), self.pages)
+            return endpoint, lambda: session.request("GET", f"/blog/posts_list/?page={page}", authenticated=not anonymous)
+        if endpoint == "comments_list":
+            return endpoint, lambda: session.request("GET", "/blog/comments-list/", authenticated=not anonymous)
+        if endpoint == "like":
+            pk = self.random.choice(self.post_ids)
+            return endpoint, lambda: session.request("POST", f"/blog/blogpost-like/{pk}/")
+        if endpoint == "comment_create":
+            data = {"blog_post": self.random.choice(self.post_ids), "body": "Load test comment"}
+            return endpoint, lambda: session.request("POST", "/blog/comments-create/", data)
+        return endpoint, session.login
+
+
+def signup(base_url, count, password, timeout):
+    run_id = uuid.uuid4().hex[:8]
+    credentials = []
+    for index in range(count):
+        username = f"loadtest_{run_id}_{index}"
+        session = Session(base_url, (username, password), timeout)
+        status, body = session.request("POST", "/user_auth/register_user/", {
+            "username": username,
+            "password": password,
+            "profile": {
+                "first_name": "Load",
+                "last_name": f"Test {index}",
+                "email": f"{username}@example.com",
+                "phone_number": f"+1{int(run_id, 16) % 10 ** 6:06d}{index:04d}",
+            },
+        }, authenticated=False)
+        session.close()
+        if status != 201:
+            raise SystemExit(f"Registering {username} failed with {status}: {body[:200]!r}")
+        credentials.append((username, password))
+    return credentials
+
+
+def discover_posts(base_url, timeout, max_pages=5):
+    """Return the ids of the posts on the first pages, and how many pages there are (up to `max_pages`)."""
+    session = Session(base_url, (None, None), timeout)
+    post_ids, pages = [], 0
+    while pages < max_pages:
+        status, body = session.request("GET", f"/blog/posts_list/?page={pages + 1}", authenticated=False)
+        if status != 200:
+            break
+        page = json.loads(body)
+        post_ids.extend(post["id"] for post in page["results"])
+        pages += 1
+        if not page["next"]:
+            break
+    session.close()
+    return post_ids, max(pages, 1)
+
+
+def run(base_url, credentials, mix, post_ids, pages, clients, duration, anonymous, seed, timeout):
+    latencies = {endpoint: [] for endpoint in mix}
+    errors = {endpoint: 0 for endpoint in mix}
+    lock = threading.Lock()
+    deadline = [0.0]
+    # Sessions log in first; the clock starts once all of them are ready.
+    ready = threading.Barrier(clients + 1, action=lambda: deadline.__setitem__(0, time.monotonic() + duration))
+    failed_logins = [0]
+
+    def worker(index):
+        session = Session(base_url, credentials[index % len(credentials)], timeout)
+        traffic = Traffic(mix, post_ids, pages, anonymous, seed + index)
+        if session.login()[0] != 200:
+            with lock:
+                failed_logins[0] += 1
+        local = {endpoint: [] for endpoint in mix}
+        failed = dict.fromkeys(mix, 0)
+        ready.wait()
+        while time.monotonic() < deadline[0]:
+            endpoint, send = traffic.next(session)
+            began = time.monotonic()
+            status, _ = send()
+            if status is None or status >= 400:
+                failed[endpoint] += 1
+            else:
+                local[endpoint].append(time.monotonic() - began)
+        session.close()
+        with lock:
+            for endpoint in mix:
+                latencies[endpoint].extend(local[endpoint])
+                errors[endpoint] += failed[endpoint]
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+
+    if failed_logins[0]:
+        print(f"warning: {failed_logins[0]} sessions could not log in", file=sys.stderr)
+    endpoints = {endpoint: summarize(latencies[endpoint], errors[endpoint], duration) for endpoint in mix}
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "base_url": base_url,
+        "clients": clients,
+        "duration": duration,
+        "mix": mix,
+        "endpoints": endpoints,
+        "total": summarize(everything, sum(errors.values()), duration),
+    }
+
+
+def summarize(latencies, errors, duration):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / duration,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+        "p50_ms": (percentile(latencies, 0.50) or 0) * 1000,
+        "p95_ms": (percentile(latencies, 0.95) or 0) * 1000,
+        "p99_ms": (percentile(latencies, 0.99) or 0) * 1000,
+    }
+
+
+def print_report(result):
+    print(f"{'endpoint':<16}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    rows = [*result["endpoints"].items(), ("total", result["total"])]
+    for endpoint, stats in rows:
+        print(
+            f"{endpoint:<16}{stats['requests']:>10}{stats['throughput']:>10.1f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['errors']:>8}"
+        )
+
+
+def change(before, after):
+    if not before:
+        return "     n/a"
+    return f"{(after - before) / before * 100:>+7.1f}%"
+
+
+def print_comparison(before, after):
+    print(f"{'endpoint':<16}{'req/s':>24}{'p50 ms':>24}{'p95 ms':>24}{'p99 ms':>24}")
+    names = [name for name in before["endpoints"] if name in after["endpoints"]] + ["total"]
+    for name in names:
+        old = before["total"] if name == "total" else before["endpoints"][name]
+        new = after["total"] if name == "total" else after["endpoints"][name]
+        cells = [
+            f"{old[key]:>7.1f} {new[key]:>7.1f} {change(old[key], new[key])}"
+            for key in ("throughput", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:<16}" + "".join(f"{cell:>24}" for cell in cells))
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        endpoint, sep, weight = part.partition("=")
+        if endpoint not in ENDPOINTS or not sep or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"expected endpoint=weight with endpoint in {', '.join(ENDPOINTS)}")
+        if int(weight):
+            mix[endpoint] = int(weight)
+    if not mix:
+        raise argparse.ArgumentTypeError("the mix needs at least one positive weight")
+    return mix
+
+
+def parse_credentials(value):
+    username, sep, password = value.partition(":")
+    if not sep or not username:
+        raise argparse.ArgumentTypeError("expected username:password")
+    return username, password
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="load a server and report per endpoint")
+    run_parser.add_argument("base_url", help="e.g. http://127.0.0.1:8000")
+    run_parser.add_argument("--user", dest="users", action="append", type=parse_credentials, default=[],
+                            help="username:password of an existing account (repeatable)")
+    run_parser.add_argument("--signup", type=int, default=0, help="register this many accounts for the run")
+    run_parser.add_argument("--password", default="loadtest-password", help="password of registered accounts")
+    run_parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default: {DEFAULT_MIX}")
+    run_parser.add_argument("--clients", type=int, default=16, help="concurrent sessions")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured load first")
+    run_parser.add_argument("--anonymous", type=float, default=0.5, help="share of reads sent without a token")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed of the request sequence")
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+
+    compare_parser = commands.add_parser("compare", help="compare two runs saved with --json")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.before) as fh:
+            before = json.load(fh)
+        with open(args.after) as fh:
+            after = json.load(fh)
+        print_comparison(before, after)
+        return
+
+    if urlsplit(args.base_url).scheme not in ("http", "https"):
+        parser.error(f"not an http(s) URL: {args.base_url}")
+    credentials = args.users + signup(args.base_url, args.signup, args.password, args.timeout)
+    if not credentials:
+        parser.error("give accounts with --user or let the run create some with --signup")
+    post_ids, pages = discover_posts(args.base_url, args.timeout)
+    if not post_ids and ({"like", "comment_create"} & set(args.mix)):
+        parser.error("posts_list/ returned no posts to like or comment on")
+
+    options = dict(
+        mix=args.mix, post_ids=post_ids, pages=pages, clients=args.clients, anonymous=args.anonymous,
+        seed=args.seed, timeout=args.timeout,
+    )
+    if args.warmup > 0:
+        run(args.base_url, credentials, duration=args.warmup, **options)
+    result = run(args.base_url, credentials, duration=args.duration, **options)
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import inspect
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from blog.models import BlogPost
+from .pagination import AsyncPageNumberPagination, KeysetCursorPagination
+from .serializers import BlogPostGetSerializer, BlogPostLikeToggleSerializer, CommentGetSerializer, blog_post_list_queryset, comment_list_queryset
+from .sparse import SparseFieldsViewMixin
+
+
+class AsyncAPIView(APIView):
+    """
+    DRF's APIView with coroutine handlers, for the hot endpoints when served
+    under ASGI. Authentication, permissions, throttling, content negotiation
+    and exception handling are DRF's own, run on the sync thread (they may
+    query the database or the cache); handlers return a Response and read
+    through the async ORM, so one worker keeps many requests in flight while
+    they wait on the database. They mirror the sync views and are left out
+    of the schema.
+    """
+
+    schema = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and 405 are answered by APIView's sync handlers.
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListView(SparseFieldsViewMixin, AsyncAPIView, ABC):
+    serializer_class = None
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    @abstractmethod
+    def get_queryset(self):
+        """The unpaginated queryset, with everything the serializer reads joined or prefetched."""
+
+    async def get(self, request, *args, **kwargs):
+        if KeysetCursorPagination.is_requested(request):
+            paginator = KeysetCursorPagination()
+        else:
+            paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(self.get_queryset(), request, view=self)
+        # Everything the serializer touches has been joined or prefetched; a
+        # lazy query here would raise SynchronousOnlyOperation.
+        data = self.serializer_class(
+            page,
+            many=True,
+            context={"request": request, "view": self},
+            fields=self.sparse_fields,
+            expand=self.sparse_expand,
+        ).data
+        return paginator.get_paginated_response(data)
+
+
+class AsyncBlogPostListView(AsyncListView):
+    serializer_class = BlogPostGetSerializer
+
+    def get_queryset(self):
+        return blog_post_list_queryset(self)
+
+
+class AsyncCommentListView(AsyncListView):
+    serializer_class = CommentGetSerializer
+
+    def get_queryset(self):
+        queryset = comment_list_queryset(self)
+        blog_post = self.request.query_params.get("blog_post")
+        if blog_post:
+            if not (blog_post.isascii() and blog_post.isdigit()):
+                raise exceptions.ValidationError({"blog_post": "A valid integer is required."})
+            queryset = queryset.filter(blog_post_id=blog_post)
+        return queryset
+
+
+class AsyncBlogPostLikeToggleView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    # POST toggles; PUT (like) and DELETE (unlike) are idempotent.
+    async def post(self, request, pk):
+        return await self.change_like(request, pk, "toggle")
+
+    async def put(self, request, pk):
+        return await self.change_like(request, pk, "like")
+
+    async def delete(self, request, pk):
+        return await self.change_like(request, pk, "unlike")
+
+    async def change_like(self, request, pk, action):
+        serializer = BlogPostLikeToggleSerializer(
+            context={
+                "request": request,
+                "blog_post_id": pk,
+                "action": action,
+            }
+        )
+
+        # Likes are single raw SQL statements (blog.likes), which Django has
+        # no async cursor for.
+        try:
+            return Response(await sync_to_async(serializer.save)())
+        except BlogPost.DoesNotExist:
+            raise exceptions.NotFound()
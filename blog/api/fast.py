@@ -0,0 +1,320 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from users.api.user_profile.serializers import ImageVariantsField
+from users.images import variants_field_name
+
+# Fields whose representation of a database value is the value itself.
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+# The columns __str__() reads, for StringRelatedField. Other models load
+# every column.
+STR_FIELDS = {
+    "users.UserProfile": ("first_name", "last_name"),
+}
+
+
+class Unsupported(Exception):
+    """The serializer uses a field the fast path cannot reproduce exactly."""
+
+
+class ReverseRelation:
+    """
+    How the fast path loads a SerializerMethodField that returns the rows of
+    `model` pointing at the object through `fk`, in `ordering`, at most
+    `limit` (a number or a callable returning one) per object.
+    """
+
+    def __init__(self, model, fk, serializer_class, ordering, limit=None):
+        self.model = model
+        self.fk = fk
+        self.serializer_class = serializer_class
+        self.ordering = ordering
+        self.limit = limit
+
+    def get_queryset(self, attname, ids):
+        queryset = self.model._default_manager.filter(**{f"{attname}__in": ids})
+        limit = self.limit() if callable(self.limit) else self.limit
+        if limit is not None:
+            queryset = queryset.annotate(
+                _row_number=Window(RowNumber(), partition_by=F(attname), order_by=list(self.ordering)),
+            ).filter(_row_number__lte=limit)
+        return queryset.order_by(*self.ordering)
+
+
+class Plan:
+    """The values() lookups of one query and the to-many relations loaded for its rows."""
+
+    def __init__(self):
+        self.lookups = []
+        self.relations = []
+
+    def lookup(self, path):
+        if path not in self.lookups:
+            self.lookups.append(path)
+        return path
+
+
+class Relation:
+    def __init__(self, parent_path, get_queryset):
+        self.parent_path = parent_path
+        self.get_queryset = get_queryset
+        self.plan = Plan()
+        self.parent_key = None
+        self.build = None
+
+    def fetch(self, ids):
+        return self.get_queryset(ids).values(*self.plan.lookups)
+
+
+class Context:
+    __slots__ = ("request", "groups")
+
+    def __init__(self, request):
+        self.request = request
+        self.groups = {}
+
+
+class FastSerializer:
+    """
+    A read-only serializer compiled from a DRF serializer. It produces the
+    same data as `serializer.data` from values() rows: every field becomes
+    a small extractor reading the row, and to-many relations are loaded
+    with one query per relation and page, like the prefetches they replace.
+    """
+
+    def __init__(self, serializer):
+        self.plan = Plan()
+        self.build = compile_serializer(serializer, "", self.plan)
+
+    def values(self, queryset, *lookups):
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.plan.lookups, *lookups]))
+
+    def serialize(self, rows, request=None):
+        context = Context(request)
+        load_relations(self.plan, rows, context)
+        build = self.build
+        return [build(row, context) for row in rows]
+
+
+def get_fast_serializer(serializer_class, **kwargs):
+    """The compiled form of `serializer_class(**kwargs)`, or None if it has no exact one."""
+    # The output order of sparse fields is the serializer's, so `?fields=a,b`
+    # and `?fields=b,a` share a compiled serializer.
+    options = tuple(sorted(
+        (name, None if value is None else frozenset(value)) for name, value in kwargs.items()
+    ))
+    return cached_fast_serializer(serializer_class, options)
+
+
+@lru_cache(maxsize=128)
+def cached_fast_serializer(serializer_class, options):
+    try:
+        return FastSerializer(serializer_class(**dict(options)))
+    except Unsupported:
+        return None
+
+
+def load_relations(plan, rows, context):
+    for relation in plan.relations:
+        ids = {row[relation.parent_path] for row in rows}
+        ids.discard(None)
+        children = list(relation.fetch(ids)) if ids else []
+        groups = {}
+        for child in children:
+            groups.setdefault(child[relation.parent_key], []).append(child)
+        context.groups[relation] = groups
+        load_relations(relation.plan, children, context)
+
+
+def compile_serializer(serializer, prefix, plan):
+    model = serializer.Meta.model
+    steps = [
+        (name, compile_field(field, serializer, model, prefix, plan))
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    ]
+
+    def build(row, context):
+        return {name: step(row, context) for name, step in steps}
+
+    return build
+
+
+def compile_field(field, serializer, model, prefix, plan):
+    if isinstance(field, ImageVariantsField):
+        return compile_image_variants(field, model, prefix, plan)
+    if isinstance(field, serializers.SerializerMethodField):
+        relation = getattr(serializer, "fast_method_fields", {}).get(field.field_name)
+        if not isinstance(relation, ReverseRelation):
+            raise Unsupported(f"{type(serializer).__name__}.{field.field_name}")
+        return compile_reverse_relation(relation, model, prefix, plan)
+
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise Unsupported(f"{type(serializer).__name__}.{field.field_name}")
+
+    if isinstance(field, serializers.ManyRelatedField):
+        return compile_many_to_many(field, model_field, model, prefix, plan)
+    if model_field.is_relation:
+        return compile_foreign_key(field, model_field, prefix, plan)
+    if isinstance(field, serializers.FileField):
+        return compile_file(field, model_field, plan.lookup(prefix + field.source))
+
+    path = plan.lookup(prefix + field.source)
+    if isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(field, serializers.ChoiceField):
+        return lambda row, context: row[path]
+
+    to_representation = field.to_representation
+
+    def represent(row, context):
+        value = row[path]
+        return None if value is None else to_representation(value)
+
+    return represent
+
+
+def compile_file(field, model_field, path):
+    storage = model_field.storage
+    use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+
+    def represent(row, context):
+        name = row[path]
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return context.request.build_absolute_uri(url) if context.request is not None else url
+
+    return represent
+
+
+def compile_image_variants(field, model, prefix, plan):
+    name_path = plan.lookup(prefix + field.image_field)
+    variants_path = plan.lookup(prefix + variants_field_name(field.image_field))
+    storage = model._meta.get_field(field.image_field).storage
+    urls = ImageVariantsField.urls
+    return lambda row, context: urls(row[name_path], row[variants_path], storage, context.request)
+
+
+def compile_foreign_key(field, model_field, prefix, plan):
+    if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+        raise Unsupported(model_field.name)
+    key = plan.lookup(prefix + model_field.name)
+    related_prefix = f"{prefix}{model_field.name}__"
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return lambda row, context: row[key]
+    if isinstance(field, serializers.StringRelatedField):
+        label = compile_label(model_field.related_model, related_prefix, plan)
+        return lambda row, context: None if row[key] is None else label(row)
+    if isinstance(field, serializers.ModelSerializer):
+        build = compile_serializer(field, related_prefix, plan)
+        return lambda row, context: None if row[key] is None else build(row, context)
+    raise Unsupported(model_field.name)
+
+
+def compile_label(model, prefix, plan):
+    names = STR_FIELDS.get(model._meta.label)
+    fields = [field for field in model._meta.concrete_fields if names is None or field.name in names]
+    attnames = [field.attname for field in fields]
+    paths = [plan.lookup(prefix + field.name) for field in fields]
+    # A deferred instance is enough for __str__(), and skips field defaults.
+    from_db = model.from_db
+    return lambda row: str(from_db(None, attnames, [row[path] for path in paths]))
+
+
+def compile_many_to_many(field, model_field, model, prefix, plan):
+    if not model_field.many_to_many or not model_field.concrete:
+        raise Unsupported(model_field.name)
+    child = field.child_relation
+    through = model_field.remote_field.through
+    source = model_field.m2m_field_name()
+    target = model_field.m2m_reverse_field_name()
+
+    parent_path = plan.lookup(prefix + model._meta.pk.name)
+    relation = Relation(
+        parent_path,
+        # In target id order, like the prefetches of the DRF path.
+        lambda ids: through._default_manager.filter(**{f"{source}_id__in": ids}).order_by(f"{target}_id"),
+    )
+    relation.parent_key = relation.plan.lookup(source)
+    if isinstance(child, serializers.PrimaryKeyRelatedField) and child.pk_field is None:
+        key = relation.plan.lookup(target)
+        relation.build = lambda row, context: row[key]
+    elif isinstance(child, serializers.StringRelatedField):
+        label = compile_label(model_field.related_model, f"{target}__", relation.plan)
+        relation.build = lambda row, context: label(row)
+    else:
+        raise Unsupported(model_field.name)
+    return compile_to_many(relation, plan)
+
+
+def compile_reverse_relation(spec, model, prefix, plan):
+    attname = spec.model._meta.get_field(spec.fk).attname
+    parent_path = plan.lookup(prefix + model._meta.pk.name)
+    relation = Relation(parent_path, lambda ids: spec.get_queryset(attname, ids))
+    # The field name, not the attname: the serializer may read it too, and
+    # values() must not select the same column twice.
+    relation.parent_key = relation.plan.lookup(spec.fk)
+    for field in spec.ordering:
+        relation.plan.lookup(field.lstrip("-"))
+    relation.build = compile_serializer(spec.serializer_class(), "", relation.plan)
+    return compile_to_many(relation, plan)
+
+
+def compile_to_many(relation, plan):
+    plan.relations.append(relation)
+    parent_path, build = relation.parent_path, relation.build
+
+    def represent(row, context):
+        children = context.groups[relation].get(row[parent_path], ())
+        return [build(child, context) for child in children]
+
+    return represent
+
+
+class FastListMixin:
+    """
+    Serve JSON list pages through a FastSerializer compiled from
+    `serializer_class` (with the view's `?fields=`/`?expand=`, if any). The
+    browsable API, BLOG_FAST_SERIALIZERS = False and serializers the fast
+    path cannot reproduce exactly go through the serializer as usual.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = fast.values(self.filter_queryset(self.get_queryset()), *self.get_fast_lookups())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(fast.serialize(list(queryset), request))
+        return self.get_paginated_response(fast.serialize(page, request))
+
+    def get_fast_serializer(self):
+        if not settings.BLOG_FAST_SERIALIZERS or self.request.accepted_renderer.format != "json":
+            return None
+        return get_fast_serializer(
+            self.serializer_class,
+            fields=getattr(self, "sparse_fields", None),
+            expand=getattr(self, "sparse_expand", None),
+        )
+
+    def get_fast_lookups(self):
+        # Read from the rows besides the serialized fields: the keyset
+        # pagination position and the ETag validator.
+        lookups = [field.lstrip("-") for field in getattr(self.paginator, "ordering", ())]
+        if hasattr(self, "get_etag_fields"):
+            lookups.extend(self.get_etag_fields())
+        return lookups
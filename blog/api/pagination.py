@@ -0,0 +1,251 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def parse_aware_datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None or not is_aware(parsed):
+        raise ValueError(f"Not an aware datetime: {value!r}")
+    return parsed
+
+
+def parse_int(value):
+    if type(value) is not int:
+        raise TypeError(f"Not an integer: {value!r}")
+    return value
+
+
+def parse_float(value):
+    if type(value) not in (int, float):
+        raise TypeError(f"Not a number: {value!r}")
+    return float(value)
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination over a fixed tuple of ordering fields.
+
+    The cursor carries the values of every ordering field for the boundary
+    row, so each page is a single indexed range scan: no COUNT(*) and no
+    OFFSET, and rows inserted while a client is scrolling never shift the
+    pages it has not seen yet. The last ordering field must be unique.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+    # Parses each ordering field's value back out of a cursor; they come
+    # from the client, so anything else is rejected before it reaches SQL.
+    position_parsers = (parse_aware_datetime, parse_int)
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        query_params = getattr(request, "query_params", None) or {}
+        return (
+            cls.cursor_query_param in query_params
+            or query_params.get("pagination") == "cursor"
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        ordering = self.get_ordering(reverse=self.reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_following = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = self.has_cursor, has_following
+        else:
+            self.has_next, self.has_previous = has_following, self.has_cursor
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                value = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if value > 0:
+                    return min(value, self.max_page_size)
+        return self.page_size
+
+    def get_ordering(self, reverse=False):
+        if not reverse:
+            return list(self.ordering)
+        return [
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        ]
+
+    def get_keyset_filter(self, ordering, position):
+        # Lexicographic "row comes after position" for mixed directions:
+        # (a > x) OR (a = x AND b > y) OR ...
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for previous, value in zip(ordering[:index], position[:index]):
+                term &= Q(**{previous.lstrip("-"): value})
+            condition |= term
+        return condition
+
+    def get_position(self, instance):
+        # Rows are model instances, or values() dicts (blog.api.fast).
+        if isinstance(instance, dict):
+            return [self.encode_value(instance[field.lstrip("-")]) for field in self.ordering]
+        return [
+            self.encode_value(getattr(instance, field.lstrip("-")))
+            for field in self.ordering
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = remove_query_param(self.base_url, self.cursor_query_param)
+            return replace_query_param(url, "pagination", "cursor")
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({"p": position, "r": int(reverse)}, separators=(",", ":"))
+        token = b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(b64decode(token.encode("ascii")).decode("utf-8"))
+            position = payload["p"]
+            reverse = bool(payload.get("r", 0))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [parse(value) for parse, value in zip(self.position_parsers, position)]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class SearchCursorPagination(KeysetCursorPagination):
+    # Best match first; `rank` is annotated by blog.search.search_posts().
+    ordering = ("-rank", "-id")
+    position_parsers = (parse_float, parse_int)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination that can also fetch its page with the async ORM.
+    Links and the response body are built exactly as by the parent class.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Seed the paginator's cached count so it never runs a sync query.
+        paginator.__dict__["count"] = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        results = [obj async for obj in queryset[bottom:bottom + page_size]]
+        self.page = Page(results, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return results
+
+
+class OptInCursorPaginationMixin:
+    """
+    Serve `cursor_pagination_class` when the client asks for it with
+    `?pagination=cursor` (or by following a `cursor` link), and the regular
+    page-number pagination otherwise.
+    """
+
+    cursor_pagination_class = KeysetCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.cursor_pagination_class.is_requested(self.request):
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,18 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets clients ask for application/x-ndjson. Streaming views return the
+    body themselves; this only renders errors, as a single line.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode(self.charset)
@@ -1,15 +1,77 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from users.api.user_profile.serializers import ImageVariantsField, UserProfileSerializer
+from users.middleware import get_profile_id
+import os
+from django.core.validators import RegexValidator, get_available_image_extensions
+from blog import likes, uploads
+from blog.models import BlogPost, Comment, Upload
 from users.models import UserProfile
-from users.api.user_profile.serializers import UserProfileSerializer
-from blog.models import BlogPost, Comment
+from .fast import ReverseRelation
+from .sparse import SparseFieldsMixin, compact_id, compact_name
+
+
+def latest_comments_prefetch(size=None):
+    # Django turns a sliced prefetch into one ROW_NUMBER() window query
+    # partitioned by post, so a page never loads more than `size` comments
+    # per post however long the thread is.
+    if size is None:
+        size = settings.BLOG_COMMENTS_PREVIEW_SIZE
+    return Prefetch(
+        "comments",
+        queryset=Comment.objects.select_related("author").order_by("-created_at", "-id")[:size],
+        to_attr="latest_comments",
+    )
+
+
+def likes_prefetch(lookup="likes"):
+    # A fixed order keeps responses identical to the fast path (blog.api.fast).
+    return Prefetch(lookup, queryset=UserProfile.objects.order_by("id"))
+
+
+def blog_post_list_queryset(view):
+    """
+    Posts for the list views, joining, prefetching and loading only what
+    the requested fields need (see SparseFieldsViewMixin).
+    """
+    queryset = BlogPost.objects.order_by("-created_at", "-id")
+    if view.wants("author"):
+        queryset = queryset.select_related("author")
+    if view.wants("comments"):
+        queryset = queryset.prefetch_related(latest_comments_prefetch())
+    if view.wants("likes"):
+        queryset = queryset.prefetch_related(likes_prefetch())
+    if not view.wants("body"):
+        queryset = queryset.defer("body")
+    return queryset
+
+
+def comment_list_queryset(view):
+    queryset = Comment.objects.order_by("-created_at", "-id")
+    if view.wants("author"):
+        queryset = queryset.select_related("author")
+    # A compact blog_post is just the id.
+    if view.expands("blog_post"):
+        queryset = (
+            queryset
+            .select_related("blog_post__author")
+            .prefetch_related(likes_prefetch("blog_post__likes"))
+            .defer("blog_post__search_vector")
+        )
+    if not view.wants("body"):
+        queryset = queryset.defer("body")
+    return queryset
 
 
 class JustBlogPostSerializer(serializers.ModelSerializer):
+    cover_photo_variants = ImageVariantsField('cover_photo')
     author = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'body', 'cover_photo', 'author', 'likes', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'body', 'cover_photo', 'cover_photo_variants', 'author', 'likes', 'created_at', 'updated_at']
 
 
 
@@ -20,31 +82,119 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'blog_post', 'body', 'author', 'created_at']
 
-class CommentGetSerializer(serializers.ModelSerializer):
+class CommentGetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = UserProfileSerializer(read_only=True)
     blog_post = JustBlogPostSerializer(read_only=True)
+    expandable_fields = {'author': compact_name, 'blog_post': compact_id}
 
     class Meta:
         model = Comment
         fields = ['id', 'blog_post', 'body', 'author', 'created_at']
 
 class BlogPostSerializer(serializers.ModelSerializer):
+    cover_photo_variants = ImageVariantsField('cover_photo')
+    # Id of a completed upload session (uploads/), used instead of an inline cover_photo.
+    cover_upload = serializers.UUIDField(write_only=True, required=False)
     author = serializers.StringRelatedField(read_only=True)
     likes = serializers.StringRelatedField(many=True, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
 
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'body', 'cover_photo', 'author', 'likes', 'comments', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'body', 'cover_photo', 'cover_upload', 'cover_photo_variants', 'author', 'likes', 'comments', 'likes_count', 'comments_count', 'created_at', 'updated_at']
+
+    def validate_cover_upload(self, value):
+        upload = (
+            uploads.active_sessions(get_profile_id(self.context["request"]))
+            .filter(pk=value, completed_at__isnull=False)
+            .first()
+        )
+        if upload is None:
+            raise serializers.ValidationError("No completed upload with this id.")
+        return upload
+
+    def validate(self, attrs):
+        if attrs.get('cover_photo') and attrs.get('cover_upload'):
+            raise serializers.ValidationError("Send either cover_photo or cover_upload, not both.")
+        return attrs
+
+    def create(self, validated_data):
+        upload = validated_data.pop('cover_upload', None)
+        if upload is None:
+            return super().create(validated_data)
+
+        # The finished file is moved into place, not copied.
+        with uploads.as_file(upload) as cover_photo:
+            validated_data['cover_photo'] = cover_photo
+            post = super().create(validated_data)
+        uploads.discard(upload)
+        return post
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    checksum = serializers.CharField(
+        required=False,
+        validators=[RegexValidator(r'^[0-9a-fA-F]{64}$', "Enter the SHA-256 hex digest of the file.")],
+    )
 
-class BlogPostGetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Upload
+        fields = ['id', 'filename', 'size', 'offset', 'checksum', 'completed_at', 'created_at']
+        read_only_fields = ['offset', 'completed_at']
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        extension = os.path.splitext(value)[1][1:].lower()
+        if extension not in get_available_image_extensions():
+            raise serializers.ValidationError(f'File extension "{extension}" is not an image extension.')
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.BLOG_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Uploads must be between 1 and {settings.BLOG_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+class BlogPostGetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    cover_photo_variants = ImageVariantsField('cover_photo')
     author = UserProfileSerializer(read_only=True)
+    expandable_fields = {'author': compact_name}
+    # How blog.api.fast loads `comments` without calling get_comments().
+    fast_method_fields = {
+        'comments': ReverseRelation(
+            Comment, 'blog_post', CommentSerializer, ordering=('-created_at', '-id'),
+            limit=lambda: settings.BLOG_COMMENTS_PREVIEW_SIZE,
+        ),
+    }
     likes = serializers.StringRelatedField(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogPost
-        fields = ['id', 'title', 'body', 'cover_photo', 'author', 'likes', 'comments', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'body', 'cover_photo', 'cover_photo_variants', 'author', 'likes', 'comments', 'likes_count', 'comments_count', 'created_at', 'updated_at']
+
+    @extend_schema_field(CommentSerializer(many=True))
+    def get_comments(self, obj):
+        # Only the latest comments are embedded; the full thread is paginated
+        # through posts/<id>/comments/.
+        comments = getattr(obj, "latest_comments", None)
+        if comments is None:
+            comments = (
+                obj.comments.select_related("author")
+                .order_by("-created_at", "-id")[:settings.BLOG_COMMENTS_PREVIEW_SIZE]
+            )
+        return CommentSerializer(comments, many=True, context=self.context).data
+
+
+class BlogPostSearchSerializer(serializers.ModelSerializer):
+    author = serializers.StringRelatedField(read_only=True)
+    headline = serializers.CharField(
+        read_only=True, help_text="Safe HTML: the escaped body, with the matches wrapped in <mark>.",
+    )
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = BlogPost
+        fields = ['id', 'title', 'headline', 'author', 'likes_count', 'comments_count', 'rank', 'created_at']
 
 
 class BlogPostLikeToggleSerializer(serializers.Serializer):
@@ -54,21 +204,22 @@ class BlogPostLikeToggleSerializer(serializers.Serializer):
 
     def save(self, **kwargs):
         request = self.context["request"]
-        blog_post = self.context["blog_post"]
-        user_profile = UserProfile.objects.get(user=request.user)
-        user_profile = user_profile
-
-        if blog_post.likes.filter(id=user_profile.id).exists():
-            blog_post.likes.remove(user_profile)
-            return {
-                "liked": False,
-                "message": "Post unliked",
-                "likes_count": blog_post.likes.count(),
-            }
-
-        blog_post.likes.add(user_profile)
+        if "blog_post_id" in self.context:
+            blog_post_id = self.context["blog_post_id"]
+        else:
+            blog_post_id = self.context["blog_post"].pk
+        action = self.context.get("action", "toggle")
+        user_profile_id = get_profile_id(request)
+
+        if action == "like":
+            liked, likes_count = True, likes.like(blog_post_id, user_profile_id)
+        elif action == "unlike":
+            liked, likes_count = False, likes.unlike(blog_post_id, user_profile_id)
+        else:
+            liked, likes_count = likes.toggle_like(blog_post_id, user_profile_id)
+
         return {
-            "liked": True,
-            "message": "Post liked",
-            "likes_count": blog_post.likes.count(),
-        }
\ No newline at end of file
+            "liked": liked,
+            "message": "Post liked" if liked else "Post unliked",
+            "likes_count": likes_count,
+        }
@@ -0,0 +1,106 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    """The distinct, non-empty names of a comma-separated list, in order."""
+    return list(dict.fromkeys(name for name in (part.strip() for part in value.split(",")) if name))
+
+
+class SparseFieldsMixin:
+    """
+    Serializer side of `?fields=` and `?expand=`.
+
+    `fields` limits the output to the named fields. Relations listed in
+    `expandable_fields` are rendered in the compact form given there (a
+    name or an id) unless they are named in `expand`. Without either
+    parameter the output is the full, expanded representation, as before.
+    """
+
+    # name: factory of the compact field used when not expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse = fields is not None or expand is not None
+        self.only_fields = fields
+        self.expand = set(expand or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.sparse:
+            return fields
+        if self.only_fields is not None:
+            fields = {name: field for name, field in fields.items() if name in self.only_fields}
+        for name, compact in self.expandable_fields.items():
+            if name in fields and name not in self.expand:
+                fields[name] = compact()
+        return fields
+
+    @classmethod
+    def parse_query(cls, query_params):
+        """Return the validated `(fields, expand)` of a request, None when absent."""
+        errors = {}
+        fields = expand = None
+        if "fields" in query_params:
+            fields = split_names(query_params["fields"])
+            unknown = [name for name in fields if name not in cls.Meta.fields]
+            if unknown or not fields:
+                errors["fields"] = f"Choose from {', '.join(cls.Meta.fields)}."
+        if "expand" in query_params:
+            expand = split_names(query_params["expand"])
+            if any(name not in cls.expandable_fields for name in expand):
+                errors["expand"] = f"Choose from {', '.join(cls.expandable_fields)}."
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+
+class SparseFieldsViewMixin:
+    """
+    View side of `?fields=` and `?expand=`: validates them, hands them to the
+    serializer and lets get_queryset() ask what to select and prefetch.
+    """
+
+    sparse_fields = None
+    sparse_expand = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.parse_sparse_fields(request)
+
+    def parse_sparse_fields(self, request):
+        self.sparse_fields, self.sparse_expand = self.serializer_class.parse_query(request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.sparse_fields)
+        kwargs.setdefault("expand", self.sparse_expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def wants(self, name):
+        return self.sparse_fields is None or name in self.sparse_fields
+
+    def expands(self, name):
+        if self.sparse_fields is None and self.sparse_expand is None:
+            return True
+        return self.wants(name) and name in (self.sparse_expand or ())
+
+    def embeds(self, name):
+        """Whether the output holds data of the related `name` row, not just its id."""
+        compact = self.serializer_class.expandable_fields.get(name)
+        return self.wants(name) and (compact is not compact_id or self.expands(name))
+
+    def get_etag_fields(self):
+        # Related rows only matter when the output embeds them.
+        return tuple(
+            field for field in super().get_etag_fields()
+            if "__" not in field or self.embeds(field.split("__", 1)[0])
+        )
+
+
+def compact_name():
+    return serializers.StringRelatedField(read_only=True)
+
+
+def compact_id():
+    return serializers.PrimaryKeyRelatedField(read_only=True)
@@ -1,10 +1,20 @@
 from django.urls import path
-from blog.api import views
+from blog.api import async_views, views
 
 urlpatterns = [
     path("blogpost-like/<int:pk>/", views.BlogPostLikeToggleAPIView.as_view(), name="blogpost-like"),
     path('blogpost-create/', views.BlogPostCreateAPIView.as_view(), name='blogpost-create'),
     path('posts_list/', views.BlogPostListAPIView.as_view(), name='blogpost-list'),
+    path('uploads/', views.UploadCreateAPIView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', views.UploadDetailAPIView.as_view(), name='upload-detail'),
     path('comments-create/', views.CommentCreateAPIView.as_view(), name='comment-create'),
     path('comments-list/', views.CommentListAPIView.as_view(), name='comment-list'),
+    path('autocomplete/', views.AutocompleteAPIView.as_view(), name='autocomplete'),
+    path('posts/export/', views.BlogPostExportAPIView.as_view(), name='blogpost-export'),
+    path('posts/search/', views.BlogPostSearchAPIView.as_view(), name='blogpost-search'),
+    path('posts/<int:pk>/comments/', views.BlogPostCommentListAPIView.as_view(), name='blogpost-comments'),
+    # Async variants for ASGI deployments
+    path("async/blogpost-like/<int:pk>/", async_views.AsyncBlogPostLikeToggleView.as_view(), name="async-blogpost-like"),
+    path("async/posts_list/", async_views.AsyncBlogPostListView.as_view(), name="async-blogpost-list"),
+    path("async/comments-list/", async_views.AsyncCommentListView.as_view(), name="async-comment-list"),
 ]
@@ -1,47 +1,198 @@
-from rest_framework.views import APIView
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, inline_serializer
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework import status, permissions, generics
-from blog.models import BlogPost, Comment
-from .serializers import BlogPostGetSerializer, BlogPostLikeToggleSerializer, BlogPostSerializer, CommentGetSerializer, CommentSerializer
-from users.models import UserProfile
-from django.shortcuts import get_object_or_404
+from rest_framework.views import APIView
 
+from blog import export, uploads
+from blog.cache import CachedPageMixin
+from blog.models import BlogPost, Comment, Upload
+from blog.search import SUGGESTERS, autocomplete, search_posts
+from users.middleware import get_profile_id
+from .conditional import ConditionalListMixin
+from .fast import FastListMixin
+from .pagination import KeysetCursorPagination, OptInCursorPaginationMixin, SearchCursorPagination
+from .renderers import NDJSONRenderer
+from .serializers import BlogPostGetSerializer, BlogPostLikeToggleSerializer, BlogPostSearchSerializer, BlogPostSerializer, CommentGetSerializer, CommentSerializer, UploadSerializer, blog_post_list_queryset, comment_list_queryset
+from .sparse import SparseFieldsViewMixin
 
 class BlogPostLikeToggleAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BlogPostLikeToggleSerializer
 
-
+    # POST toggles; PUT (like) and DELETE (unlike) are idempotent.
     def post(self, request, pk):
-        blog_post = get_object_or_404(BlogPost, pk=pk)
+        return self.change_like(request, pk, "toggle")
+
+    def put(self, request, pk):
+        return self.change_like(request, pk, "like")
 
+    def delete(self, request, pk):
+        return self.change_like(request, pk, "unlike")
+
+    def change_like(self, request, pk, action):
         serializer = BlogPostLikeToggleSerializer(
             context={
                 "request": request,
-                "blog_post": blog_post,
+                "blog_post_id": pk,
+                "action": action,
             }
         )
 
-        data = serializer.save()
+        try:
+            data = serializer.save()
+        except BlogPost.DoesNotExist:
+            raise Http404
         return Response(data, status=200)
 
-class BlogPostListAPIView(generics.ListAPIView):
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter("fields", str, description="Comma separated fields to return (default: all)"),
+    OpenApiParameter("expand", str, description="Comma separated relations to embed in full; "
+                                                "others are compact once fields or expand is given"),
+]
+
+
+@extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+class BlogPostListAPIView(CachedPageMixin, SparseFieldsViewMixin, ConditionalListMixin, FastListMixin, OptInCursorPaginationMixin, generics.ListAPIView):
     serializer_class = BlogPostGetSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    page_cache_namespace = "posts_list"
+    etag_fields = ("id", "updated_at", "likes_count", "comments_count", "author__updated_at")
+
+    def get_queryset(self):
+        return blog_post_list_queryset(self)
+
+
+@extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+class CommentListAPIView(SparseFieldsViewMixin, ConditionalListMixin, FastListMixin, OptInCursorPaginationMixin, generics.ListAPIView):
+    serializer_class = CommentGetSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    etag_fields = (
+        "id",
+        "author__updated_at",
+        "blog_post__updated_at",
+        "blog_post__likes_count",
+        "blog_post__author__updated_at",
+    )
+
+    def get_queryset(self):
+        queryset = comment_list_queryset(self)
+        blog_post = self.request.query_params.get("blog_post")
+        if blog_post:
+            if not (blog_post.isascii() and blog_post.isdigit()):
+                raise ValidationError({"blog_post": "A valid integer is required."})
+            queryset = queryset.filter(blog_post_id=blog_post)
+        return queryset
+
+
+class BlogPostCommentListAPIView(generics.ListAPIView):
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         return (
-            BlogPost.objects
+            Comment.objects
+            .filter(blog_post_id=self.kwargs["pk"])
             .select_related("author")
-            .prefetch_related("comments", "likes")
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # Only pay for the existence check when there is nothing to show.
+        if not page and not BlogPost.objects.filter(pk=self.kwargs["pk"]).exists():
+            raise Http404
+        return page
 
-class CommentListAPIView(generics.ListAPIView):
-    queryset = Comment.objects.all().order_by('-created_at')
-    serializer_class = CommentGetSerializer
+
+@extend_schema(parameters=[
+    OpenApiParameter("q", str, required=True, description='Web search syntax: words, "phrases", -word, OR'),
+])
+class BlogPostSearchAPIView(generics.ListAPIView):
+    serializer_class = BlogPostSearchSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = SearchCursorPagination
+    max_query_length = 200
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "This query parameter is required."})
+        if len(query) > self.max_query_length:
+            raise ValidationError({"q": f"Ensure this value has at most {self.max_query_length} characters."})
+        # The headline is computed in SQL, so the body itself is not loaded.
+        return search_posts(BlogPost.objects.select_related("author").defer("body"), query)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("q", str, required=True, description="At least 2 characters"),
+        OpenApiParameter("types", str, description="Comma separated subset of post,author (default: both)"),
+        OpenApiParameter("limit", int, description="Results per type, at most BLOG_AUTOCOMPLETE_LIMIT"),
+    ],
+    responses=inline_serializer("Autocomplete", {
+        "results": inline_serializer("AutocompleteSuggestion", {
+            "type": serializers.ChoiceField(choices=list(SUGGESTERS)),
+            "id": serializers.IntegerField(),
+            "label": serializers.CharField(),
+        }, many=True),
+    }),
+)
+class AutocompleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    min_query_length = 2
+    max_query_length = 100
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not self.min_query_length <= len(query) <= self.max_query_length:
+            raise ValidationError({
+                "q": f"Must be between {self.min_query_length} and {self.max_query_length} characters.",
+            })
+
+        kinds = [kind for kind in request.query_params.get("types", "post,author").split(",") if kind]
+        if not kinds or any(kind not in SUGGESTERS for kind in kinds):
+            raise ValidationError({"types": f"Choose from {', '.join(SUGGESTERS)}."})
+
+        limit = settings.BLOG_AUTOCOMPLETE_LIMIT
+        requested = request.query_params.get("limit", "")
+        # ASCII only: str.isdigit() also accepts "²", which int() rejects.
+        if requested.isascii() and requested.isdigit():
+            limit = max(1, min(int(requested), limit))
+
+        return Response({"results": autocomplete(query, list(dict.fromkeys(kinds)), limit)})
+
+
+@extend_schema(
+    parameters=[OpenApiParameter("after", int, description="Only posts with a greater id, to resume an export")],
+    responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+)
+class BlogPostExportAPIView(APIView):
+    """
+    Stream every post with its comments and like count as NDJSON, one post
+    per line in id order (see blog.export).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, JSONRenderer]
+
+    def get(self, request):
+        after = request.query_params.get("after")
+        if after is not None:
+            if not (after.isascii() and after.isdigit()):
+                raise ValidationError({"after": "A valid integer is required."})
+            after = int(after)
+        # Each server streams its own kind of iterator without buffering it.
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.andjson_chunks(after=after)
+        else:
+            chunks = export.ndjson_chunks(after=after)
+        return StreamingHttpResponse(chunks, content_type=NDJSONRenderer.media_type)
 
 
 class BlogPostCreateAPIView(APIView):
@@ -51,12 +202,91 @@ class BlogPostCreateAPIView(APIView):
     def post(self, request):
         serializer = self.serializer_class(data=request.data, context={'request': request})
         if serializer.is_valid():
-            author = UserProfile.objects.get(user=request.user)
-            serializer.save(author=author)
+            serializer.save(author=request.profile)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UploadCreateAPIView(APIView):
+    """
+    Start a resumable upload session. Chunks are then sent with PATCH to
+    uploads/<id>/ and the finished upload is passed to blogpost-create/ as
+    `cover_upload`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UploadSerializer
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if serializer.is_valid():
+            upload = uploads.start(get_profile_id(request), **serializer.validated_data)
+            return Response(self.serializer_class(upload).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadDetailAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UploadSerializer
+
+    def get_object(self, request, pk):
+        try:
+            return uploads.active_sessions(get_profile_id(request)).get(pk=pk)
+        except Upload.DoesNotExist:
+            raise Http404
+
+    def respond(self, upload, status_code=status.HTTP_200_OK):
+        return Response(
+            self.serializer_class(upload).data,
+            status=status_code,
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+
+    def get(self, request, pk):
+        # Where to resume after a dropped connection.
+        return self.respond(self.get_object(request, pk))
+
+    @extend_schema(
+        request={"application/offset+octet-stream": OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter("Upload-Offset", int, OpenApiParameter.HEADER, required=True,
+                             description="Bytes received so far, as reported by the session"),
+            OpenApiParameter("Upload-Checksum", str, OpenApiParameter.HEADER,
+                             description="sha256 <hex digest of this chunk>"),
+        ],
+    )
+    def patch(self, request, pk):
+        offset = request.headers.get("Upload-Offset", "")
+        if not (offset.isascii() and offset.isdigit()):
+            raise ValidationError({"Upload-Offset": "A non-negative integer header is required."})
+
+        checksum = None
+        if "Upload-Checksum" in request.headers:
+            algorithm, _, checksum = request.headers["Upload-Checksum"].partition(" ")
+            if algorithm.lower() != "sha256" or not checksum:
+                raise ValidationError({"Upload-Checksum": 'Use "sha256 <hex digest>".'})
+
+        # The body is streamed straight to disk; request.data is never parsed.
+        try:
+            upload = uploads.write_chunk(pk, get_profile_id(request), request.stream, int(offset), checksum)
+        except Upload.DoesNotExist:
+            raise Http404
+        except uploads.OffsetMismatch as exc:
+            return Response(
+                {"detail": str(exc), "offset": exc.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Upload-Offset": str(exc.offset)},
+            )
+        except uploads.ChunkTooLarge as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except uploads.UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.respond(upload)
+
+    def delete(self, request, pk):
+        uploads.discard(self.get_object(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # Get all comments or create a new one
 class CommentCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -66,7 +296,6 @@ class CommentCreateAPIView(APIView):
     def post(self, request):
         serializer = CommentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            author = UserProfile.objects.get(user=request.user)
-            serializer.save(author=author)
+            serializer.save(author=request.profile)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
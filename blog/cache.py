@@ -0,0 +1,149 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+CONTENT_VERSION_KEY = "blog:content-version"
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def get_cache():
+    return caches[settings.BLOG_LIST_CACHE_ALIAS]
+
+
+def _initial_version():
+    # Restarting from a clock-based value instead of 1 means an evicted
+    # version key can never resurrect pages cached under an old version.
+    return time.time_ns() // 1000
+
+
+def get_content_version():
+    cache = get_cache()
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, _initial_version(), None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.add(CONTENT_VERSION_KEY, _initial_version(), None)
+
+
+def bump_content_version():
+    """
+    Invalidate every cached page. Called right away and again once the
+    surrounding transaction commits, so a page rebuilt in between from
+    not-yet-committed state cannot outlive the write.
+    """
+    _bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(_bump)
+
+
+def is_cacheable(request):
+    # Only anonymous reads: they all see the same page, and authenticated
+    # requests still have to go through token validation.
+    return request.method == "GET" and "HTTP_AUTHORIZATION" not in request.META
+
+
+def page_key(namespace, request):
+    fingerprint = "\n".join([
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+    ])
+    digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+    return f"blog:page:{namespace}:v{get_content_version()}:{digest}"
+
+
+def etag_matches(etag, if_none_match):
+    candidates = parse_etags(if_none_match)
+    if "*" in candidates:
+        return True
+    # Weak comparison, as required for If-None-Match.
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in candidates}
+
+
+def _from_entry(entry, request):
+    etag = entry["headers"].get("ETag")
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH") if request is not None else None
+    if etag and if_none_match and etag_matches(etag, if_none_match):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+    else:
+        response = HttpResponse(entry["content"], status=entry["status"], headers=entry["headers"])
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def _to_entry(response):
+    if getattr(response, "render", None) and not response.is_rendered:
+        response.render()
+    if response.status_code != 200 or response.streaming:
+        return None
+    headers = {
+        name: value for name, value in response.items()
+        if name.lower() not in ("set-cookie", "x-cache")
+    }
+    return {"content": response.content, "status": response.status_code, "headers": headers}
+
+
+def fetch(key, build, request=None):
+    """
+    Return the cached page for `key`, or build it with `build()`.
+
+    Only the worker that wins the lock rebuilds a missing page; the others
+    poll for the result for up to BLOG_LIST_CACHE_LOCK_WAIT seconds before
+    giving up and rendering the page themselves.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        return _from_entry(entry, request)
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            response = build()
+            entry = _to_entry(response)
+            if entry is not None:
+                cache.set(key, entry, settings.BLOG_LIST_CACHE_TIMEOUT)
+            response["X-Cache"] = "MISS"
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + settings.BLOG_LIST_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return _from_entry(entry, request)
+    return build()
+
+
+class CachedPageMixin:
+    """
+    Serve anonymous GETs of a view from the page cache. Pages are keyed by
+    the content version, so any write that calls bump_content_version()
+    makes every previously cached page unreachable at once.
+    """
+
+    page_cache_namespace = None
+
+    def dispatch(self, request, *args, **kwargs):
+        build = partial(super().dispatch, request, *args, **kwargs)
+        if not settings.BLOG_LIST_CACHE_TIMEOUT or not is_cacheable(request):
+            return build()
+        return fetch(page_key(self.page_cache_namespace, request), build, request)
@@ -0,0 +1,198 @@
+import random
+import uuid
+import zlib
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from blog.cache import bump_content_version
+from blog.likes import insert_many
+from blog.models import BlogPost, Comment
+from users.fields import explicit_timestamps
+from users.models import User, UserProfile
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip "
+    "ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla "
+    "pariatur excepteur sint occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim "
+    "id est laborum python django query index cache latency throughput database server request"
+).split()
+FIRST_NAMES = ("Ada", "Ben", "Chloe", "Dami", "Emeka", "Femi", "Grace", "Hana", "Ife", "Joy", "Kofi", "Lara")
+LAST_NAMES = ("Adeyemi", "Brown", "Chen", "Diallo", "Eze", "Garcia", "Ito", "Khan", "Mensah", "Okafor", "Smith")
+
+
+class Zipf:
+    """
+    Draws from `population` with probability proportional to 1 / rank**s,
+    ranks being a seeded shuffle of the population: a few hot items and a
+    long tail of cold ones. s = 0 is uniform.
+    """
+
+    def __init__(self, population, s, rng):
+        self.items = list(population)
+        rng.shuffle(self.items)
+        self.cum_weights = list(accumulate(1 / rank ** s for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def sample(self, k):
+        if not self.items:
+            return []
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+
+class DatasetGenerator:
+    """
+    Generate `users` users with profiles, `posts` posts, about `comments`
+    comments and about `likes` likes with bulk inserts of `batch_size`
+    rows. Authors, commented posts and liked posts follow Zipf
+    distributions of exponent `skew`. Everything is drawn from one
+    random.Random(seed), so the same arguments, `prefix` and `until` give
+    the same dataset.
+
+    Usernames are `<prefix><n>`, and every account has `password`. It is
+    hashed once and shared, so generating a million users costs one
+    hash. Counters are written with the posts, so no repair is needed.
+    """
+
+    def __init__(self, users, posts, comments, likes, skew=1.0, seed=0, prefix="gen",
+                 password="password123", until=None, days=365, batch_size=5000, on_progress=None):
+        self.sizes = {"users": users, "posts": posts, "comments": comments, "likes": likes}
+        self.skew = skew
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.password = password
+        self.until = until
+        self.span = timedelta(days=days)
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.created = Counter()
+
+    def generate(self):
+        profile_ids = self.generate_users()
+        posts = self.generate_posts(profile_ids)
+        self.generate_comments(profile_ids, posts)
+        self.generate_likes(profile_ids, posts)
+        bump_content_version()
+        return self.created
+
+    def progress(self, kind):
+        if self.on_progress is not None:
+            self.on_progress(kind, self.created[kind])
+
+    def timestamps(self, count, start, end):
+        """`count` sorted datetimes between start and end, so ids follow time."""
+        seconds = (end - start).total_seconds()
+        return [start + timedelta(seconds=offset) for offset in sorted(self.rng.random() * seconds for _ in range(count))]
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return " ".join(words).capitalize()
+
+    def insert(self, kind, model, objects):
+        with transaction.atomic(), explicit_timestamps(model):
+            created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.created[kind] += len(objects)
+        self.progress(kind)
+        return created
+
+    def batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def generate_users(self):
+        password_hash = make_password(self.password)
+        # Phone numbers only need to be unique; derive a block from the prefix.
+        block = zlib.crc32(self.prefix.encode()) % 1000
+        joined = self.timestamps(self.sizes["users"], self.until - 2 * self.span, self.until - self.span)
+        profile_ids = []
+        for indexes in self.batches(range(self.sizes["users"])):
+            users, profiles = [], []
+            for index in indexes:
+                username = f"{self.prefix}{index}"
+                user = User(
+                    # Stable across runs, and unique per username.
+                    id=uuid.uuid5(uuid.NAMESPACE_URL, f"generate_dataset:{username}"),
+                    username=username,
+                    password=password_hash,
+                    date_joined=joined[index],
+                )
+                users.append(user)
+                profiles.append(UserProfile(
+                    user=user,
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    email=f"{username}@example.com",
+                    phone_number=f"+9{block:03d}{index:010d}",
+                    created_at=joined[index],
+                    updated_at=joined[index],
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+            profile_ids.extend(profile.pk for profile in self.insert("users", UserProfile, profiles))
+        return profile_ids
+
+    def generate_posts(self, profile_ids):
+        """Return `(id, created_at, comments_count, likes_count)` of every post."""
+        count = self.sizes["posts"]
+        authors = Zipf(profile_ids, self.skew, self.rng).sample(count)
+        popular = Zipf(range(count), self.skew, self.rng)
+        comments = Counter(popular.sample(self.sizes["comments"]))
+        # A profile likes a post at most once.
+        likes = {index: min(total, len(profile_ids)) for index, total in Counter(popular.sample(self.sizes["likes"])).items()}
+        created = self.timestamps(count, self.until - self.span, self.until)
+
+        posts = []
+        for indexes in self.batches(range(count)):
+            batch = [
+                BlogPost(
+                    title=self.text(3, 10),
+                    body=self.text(40, 400),
+                    author_id=authors[index],
+                    likes_count=likes.get(index, 0),
+                    comments_count=comments.get(index, 0),
+                    created_at=created[index],
+                    updated_at=created[index],
+                )
+                for index in indexes
+            ]
+            posts.extend(
+                (post.pk, post.created_at, post.comments_count, post.likes_count)
+                for post in self.insert("posts", BlogPost, batch)
+            )
+        return posts
+
+    def generate_comments(self, profile_ids, posts):
+        authors = Zipf(profile_ids, self.skew, self.rng)
+        batch = []
+        for post_id, created_at, comments_count, _ in posts:
+            if not comments_count:
+                continue
+            for author_id, timestamp in zip(
+                authors.sample(comments_count), self.timestamps(comments_count, created_at, self.until),
+            ):
+                batch.append(Comment(blog_post_id=post_id, author_id=author_id, body=self.text(3, 40), created_at=timestamp))
+            if len(batch) >= self.batch_size:
+                self.insert("comments", Comment, batch)
+                batch = []
+        if batch:
+            self.insert("comments", Comment, batch)
+
+    def generate_likes(self, profile_ids, posts):
+        # Plain multi-row INSERTs (blog.likes): no model instance per like.
+        pairs = []
+        for post_id, _, _, likes_count in posts:
+            pairs.extend((post_id, profile_id) for profile_id in self.rng.sample(profile_ids, likes_count))
+            if len(pairs) >= self.batch_size:
+                self.insert_likes(pairs)
+                pairs = []
+        if pairs:
+            self.insert_likes(pairs)
+
+    def insert_likes(self, pairs):
+        with transaction.atomic():
+            self.created["likes"] += sum(insert_many(pairs, self.batch_size).values())
+        self.progress("likes")
@@ -0,0 +1,89 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from blog.models import BlogPost, Comment
+
+POST_FIELDS = (
+    "id", "title", "body", "author__user__username", "cover_photo",
+    "likes_count", "comments_count", "created_at", "updated_at",
+)
+COMMENT_FIELDS = ("id", "blog_post_id", "body", "author__user__username", "created_at")
+
+
+def export_chunks(after=None, chunk_size=None):
+    """
+    Yield every post after id `after`, in id order, as lists of at most
+    `chunk_size` records holding the post, its like count and its comments
+    (oldest first). Posts are read through one server-side cursor and the
+    comments of each chunk with one query, so memory stays flat however
+    many posts there are.
+    """
+    chunk_size = chunk_size or settings.BLOG_EXPORT_CHUNK_SIZE
+    posts = BlogPost.objects.order_by("id")
+    if after is not None:
+        posts = posts.filter(id__gt=after)
+
+    chunk = []
+    for post in posts.values(*POST_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(post)
+        if len(chunk) == chunk_size:
+            yield with_comments(chunk)
+            chunk = []
+    if chunk:
+        yield with_comments(chunk)
+
+
+def with_comments(posts):
+    comments = {post["id"]: [] for post in posts}
+    rows = (
+        Comment.objects
+        .filter(blog_post_id__in=comments)
+        .order_by("blog_post_id", "created_at", "id")
+        .values_list(*COMMENT_FIELDS)
+    )
+    for pk, post_id, body, author, created_at in rows:
+        comments[post_id].append({"id": pk, "body": body, "author": author, "created_at": created_at})
+
+    storage = BlogPost._meta.get_field("cover_photo").storage
+    return [
+        {
+            "id": post["id"],
+            "title": post["title"],
+            "body": post["body"],
+            "author": post["author__user__username"],
+            "cover_photo": storage.url(post["cover_photo"]) if post["cover_photo"] else None,
+            "likes_count": post["likes_count"],
+            "comments_count": post["comments_count"],
+            "created_at": post["created_at"],
+            "updated_at": post["updated_at"],
+            "comments": comments[post["id"]],
+        }
+        for post in posts
+    ]
+
+
+def to_ndjson(records):
+    return "".join(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n" for record in records)
+
+
+def ndjson_chunks(after=None, chunk_size=None):
+    for chunk in export_chunks(after=after, chunk_size=chunk_size):
+        yield to_ndjson(chunk)
+
+
+async def andjson_chunks(after=None, chunk_size=None):
+    """
+    ndjson_chunks() for ASGI servers, which would otherwise buffer a
+    synchronous stream whole. Each chunk is read on the sync thread, where
+    the cursor lives, and sent before the next one is read.
+    """
+    chunks = ndjson_chunks(after=after, chunk_size=chunk_size)
+    read = sync_to_async(next)
+    try:
+        while (text := await read(chunks, None)) is not None:
+            yield text
+    finally:
+        await sync_to_async(chunks.close)()
@@ -0,0 +1,314 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog import likes
+from blog.cache import bump_content_version
+from blog.models import BlogPost, Comment
+from users.fields import explicit_timestamps
+from users.models import User, UserProfile
+
+# Flushed in this order, so records may reference anything added before them.
+RECORD_TYPES = ("user", "post", "comment", "like")
+
+PROFILE_FIELDS = (
+    "first_name", "last_name", "other_name", "email", "phone_number",
+    "gender", "date_of_birth", "address",
+)
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+class Importer:
+    """
+    Buffer records per type and write them with bulk_create() once any
+    buffer holds `batch_size` records, so memory stays constant however
+    large the input is. Every batch is validated with a handful of set-based
+    queries (existing keys, referenced users and posts) and written in one
+    transaction. Records that already exist (users by username, posts and
+    comments by explicit id, likes by post and user) are skipped, so an
+    interrupted import can simply be run again.
+
+    Users carry either `password_hash` (any hash Django can verify, written
+    as is) or a plaintext `password`, which is hashed on `hash_workers`
+    threads.
+    """
+
+    def __init__(self, batch_size=1000, hash_workers=4, strict=False, on_error=None):
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+        self.strict = strict
+        self.on_error = on_error
+        self.pending = {record_type: [] for record_type in RECORD_TYPES}
+        self.created = Counter()
+        self.skipped = Counter()
+        self.errors = 0
+        self.explicit_ids = set()
+
+    def add(self, record_type, record, source=None):
+        if record_type not in self.pending:
+            self.error(source, f"unknown record type {record_type!r}")
+            return
+        self.pending[record_type].append((source, record))
+        if len(self.pending[record_type]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for record_type in RECORD_TYPES:
+            batch, self.pending[record_type] = self.pending[record_type], []
+            if batch:
+                with transaction.atomic(), explicit_timestamps(UserProfile, BlogPost, Comment):
+                    getattr(self, f"import_{record_type}s")(batch)
+
+    def finish(self):
+        self.flush()
+        models = [model for model in (BlogPost, Comment) if model in self.explicit_ids]
+        if models:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+        if any(self.created.values()):
+            bump_content_version()
+
+    def error(self, source, message):
+        self.errors += 1
+        if self.on_error is not None:
+            self.on_error(source, message)
+        if self.strict:
+            raise InvalidRecord(f"{source}: {message}" if source else message)
+
+    def validate(self, batch, build):
+        objects = []
+        for source, record in batch:
+            try:
+                obj = build(record)
+            except (InvalidRecord, ValidationError, KeyError, TypeError, ValueError) as exc:
+                self.error(source, describe(exc))
+            else:
+                objects.append((source, obj))
+        return objects
+
+    def drop_existing(self, record_type, objects, key, existing):
+        kept, seen = [], set()
+        for source, obj in objects:
+            value = key(obj)
+            if value in existing:
+                self.skipped[record_type] += 1
+            elif value in seen:
+                self.error(source, f"duplicate {record_type} {value!r} in the same batch")
+            else:
+                seen.add(value)
+                kept.append((source, obj))
+        return kept
+
+    def profile_ids(self, usernames):
+        return dict(
+            UserProfile.objects
+            .filter(user__username__in=set(usernames))
+            .values_list("user__username", "id")
+        )
+
+    def import_users(self, batch):
+        now = timezone.now()
+
+        def build(record):
+            profile_data = record.get("profile") or {
+                name: record[name] for name in PROFILE_FIELDS if name in record
+            }
+            user = User(
+                username=required(record, "username"),
+                user_ref_uid=record.get("user_ref_uid") or None,
+                is_active=as_bool(record.get("is_active", True)),
+            )
+            if record.get("id"):
+                user.id = record["id"]
+            if record.get("password_hash"):
+                try:
+                    identify_hasher(record["password_hash"])
+                except ValueError:
+                    raise InvalidRecord("password_hash is not a recognised password hash")
+                user.password = record["password_hash"]
+            elif record.get("password"):
+                user.password = record["password"]
+                user._plaintext = True
+            else:
+                raise InvalidRecord("password_hash or password is required")
+            profile = UserProfile(
+                user=user,
+                created_at=as_datetime(record.get("created_at")) or now,
+                updated_at=now,
+                **{name: value for name, value in profile_data.items() if name in PROFILE_FIELDS},
+            )
+            user.full_clean(exclude=["password"], validate_unique=False, validate_constraints=False)
+            profile.full_clean(exclude=["user"], validate_unique=False, validate_constraints=False)
+            return user, profile
+
+        objects = self.validate(batch, build)
+        usernames = [user.username for _, (user, _) in objects]
+        existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        objects = self.drop_existing("user", objects, lambda obj: obj[0].username, existing)
+
+        # Other unique columns of new users must be free as well.
+        for field, model, get in [
+            ("user_ref_uid", User, lambda pair: pair[0].user_ref_uid),
+            ("email", UserProfile, lambda pair: pair[1].email),
+            ("phone_number", UserProfile, lambda pair: pair[1].phone_number),
+        ]:
+            values = [get(obj) for _, obj in objects if get(obj) is not None]
+            taken = set(model.objects.filter(**{f"{field}__in": values}).values_list(field, flat=True))
+            kept, seen = [], set()
+            for source, obj in objects:
+                value = get(obj)
+                if value is not None and (value in taken or value in seen):
+                    self.error(source, f"{field} {value!r} is already in use")
+                else:
+                    seen.add(value)
+                    kept.append((source, obj))
+            objects = kept
+
+        plaintext = [user for _, (user, _) in objects if getattr(user, "_plaintext", False)]
+        if plaintext:
+            with ThreadPoolExecutor(max_workers=self.hash_workers) as executor:
+                hashes = executor.map(make_password, [user.password for user in plaintext])
+                for user, encoded in zip(plaintext, hashes):
+                    user.password = encoded
+
+        User.objects.bulk_create([user for _, (user, _) in objects], batch_size=self.batch_size)
+        UserProfile.objects.bulk_create([profile for _, (_, profile) in objects], batch_size=self.batch_size)
+        self.created["user"] += len(objects)
+
+    def import_posts(self, batch):
+        now = timezone.now()
+        authors = self.profile_ids(record.get("author") for _, record in batch)
+
+        def build(record):
+            author = required(record, "author")
+            if author not in authors:
+                raise InvalidRecord(f"unknown author {author!r}")
+            created_at = as_datetime(record.get("created_at")) or now
+            post = BlogPost(
+                id=record.get("id") or None,
+                title=required(record, "title"),
+                body=required(record, "body"),
+                author_id=authors[author],
+                created_at=created_at,
+                updated_at=as_datetime(record.get("updated_at")) or created_at,
+            )
+            post.full_clean(exclude=["author", "likes", "cover_photo"], validate_unique=False)
+            return post
+
+        objects = self.validate(batch, build)
+        ids = [post.id for _, post in objects if post.id is not None]
+        existing = set(BlogPost.objects.filter(pk__in=ids).values_list("pk", flat=True)) if ids else set()
+        objects = self.drop_existing("post", objects, lambda post: post.id or id(post), existing)
+        if ids:
+            self.explicit_ids.add(BlogPost)
+
+        BlogPost.objects.bulk_create([post for _, post in objects], batch_size=self.batch_size)
+        self.created["post"] += len(objects)
+
+    def import_comments(self, batch):
+        now = timezone.now()
+        authors = self.profile_ids(record.get("author") for _, record in batch)
+        post_ids = existing_post_ids(record.get("blog_post") for _, record in batch)
+
+        def build(record):
+            author = required(record, "author")
+            if author not in authors:
+                raise InvalidRecord(f"unknown author {author!r}")
+            blog_post = int(required(record, "blog_post"))
+            if blog_post not in post_ids:
+                raise InvalidRecord(f"unknown blog_post {blog_post}")
+            comment = Comment(
+                id=record.get("id") or None,
+                blog_post_id=blog_post,
+                body=required(record, "body"),
+                author_id=authors[author],
+                created_at=as_datetime(record.get("created_at")) or now,
+            )
+            comment.full_clean(exclude=["blog_post", "author"], validate_unique=False)
+            return comment
+
+        objects = self.validate(batch, build)
+        ids = [comment.id for _, comment in objects if comment.id is not None]
+        existing = set(Comment.objects.filter(pk__in=ids).values_list("pk", flat=True)) if ids else set()
+        objects = self.drop_existing("comment", objects, lambda comment: comment.id or id(comment), existing)
+        if ids:
+            self.explicit_ids.add(Comment)
+
+        comments = [comment for _, comment in objects]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        for post_id, added in Counter(comment.blog_post_id for comment in comments).items():
+            BlogPost.objects.filter(pk=post_id).update(comments_count=F("comments_count") + added)
+        self.created["comment"] += len(comments)
+
+    def import_likes(self, batch):
+        profiles = self.profile_ids(record.get("user") for _, record in batch)
+        post_ids = existing_post_ids(record.get("blog_post") for _, record in batch)
+
+        def build(record):
+            user = required(record, "user")
+            if user not in profiles:
+                raise InvalidRecord(f"unknown user {user!r}")
+            blog_post = int(required(record, "blog_post"))
+            if blog_post not in post_ids:
+                raise InvalidRecord(f"unknown blog_post {blog_post}")
+            return blog_post, profiles[user]
+
+        pairs = list(dict.fromkeys(pair for _, pair in self.validate(batch, build)))
+        added = likes.insert_many(pairs, self.batch_size)
+        likes.apply_deltas(added)
+        total = sum(added.values())
+        self.created["like"] += total
+        self.skipped["like"] += len(pairs) - total
+
+
+def existing_post_ids(values):
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return set(BlogPost.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+def required(record, name):
+    value = record.get(name)
+    if value is None or value == "":
+        raise InvalidRecord(f"{name} is required")
+    return value
+
+
+def as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no")
+    return bool(value)
+
+
+def as_datetime(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise InvalidRecord(f"invalid datetime {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def describe(exc):
+    if isinstance(exc, ValidationError) and hasattr(exc, "message_dict"):
+        return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in exc.message_dict.items())
+    if isinstance(exc, KeyError):
+        return f"{exc.args[0]} is required"
+    return str(exc) if str(exc) else exc.__class__.__name__
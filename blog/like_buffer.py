@@ -0,0 +1,196 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+
+from blog import likes
+from blog.cache import bump_content_version
+from blog.models import BlogPost, Like
+from users.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """
+    Per-process write-behind buffer for likes (BLOG_LIKES_WRITE_BEHIND).
+
+    Requests only record the desired like state in memory; a background
+    thread writes the accumulated changes every BLOG_LIKES_FLUSH_INTERVAL
+    seconds with one multi-row INSERT and one multi-row DELETE per batch and
+    a single counter update per post. Pending changes are flushed once more
+    when the process exits.
+
+    Each pending entry maps (post_id, profile_id) to (persisted, liked): the
+    state the database had when the entry was created and the state the
+    user asked for. Entries whose two states agree are dropped, so a like
+    followed by an unlike never reaches the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushing = {}
+        self._deltas = Counter()
+        self._flushing_deltas = Counter()
+        # Bumped, under the lock, exactly when a flush commits. A request
+        # whose database read straddles a commit sees it change and re-reads.
+        self._generation = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._registered = False
+
+    def set(self, post_id, profile_id, liked=None):
+        """
+        Record a like (`liked=True`), unlike (`False`) or toggle (`None`).
+        Returns `(liked, likes_count)` as they will be once flushed.
+        """
+        key = (post_id, profile_id)
+        while True:
+            generation = self._generation
+            likes_count, liked_in_db = self._read(post_id, profile_id)
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                entry = self._pending.get(key)
+                if entry is None:
+                    flushing = self._flushing.get(key)
+                    current = flushing[1] if flushing else liked_in_db
+                    entry = (current, current)
+                persisted, current = entry
+                target = (not current) if liked is None else liked
+                if target != current:
+                    self._deltas[post_id] += 1 if target else -1
+                if target == persisted:
+                    self._pending.pop(key, None)
+                else:
+                    self._pending[key] = (persisted, target)
+                likes_count += self._flushing_deltas[post_id] + self._deltas[post_id]
+            break
+
+        self._ensure_flusher()
+        return target, likes_count
+
+    def _read(self, post_id, profile_id):
+        row = (
+            BlogPost.objects
+            .filter(pk=post_id)
+            .annotate(liked=Exists(Like.objects.filter(blogpost_id=OuterRef("pk"), userprofile_id=profile_id)))
+            .values_list("likes_count", "liked")
+            .first()
+        )
+        if row is None:
+            raise BlogPost.DoesNotExist("BlogPost matching query does not exist.")
+        return row
+
+    def flush(self):
+        """Write every pending change; returns the number of changes written."""
+        with self._lock:
+            if self._flushing or not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            self._flushing_deltas, self._deltas = self._deltas, Counter()
+
+        batch = self._flushing
+        locked = False
+        try:
+            with transaction.atomic():
+                deltas = self._write(batch)
+                # Hold the lock across the commit so that no request can
+                # observe the committed rows while still counting them as
+                # pending.
+                self._lock.acquire()
+                locked = True
+        except Exception:
+            if not locked:
+                self._lock.acquire()
+                locked = True
+            self._restore(batch)
+            raise
+        else:
+            self._flushing = {}
+            self._flushing_deltas = Counter()
+            self._generation += 1
+        finally:
+            if locked:
+                self._lock.release()
+
+        if any(deltas.values()):
+            bump_content_version()
+        return len(batch)
+
+    def _restore(self, batch):
+        # Put a failed batch back in front of whatever arrived meanwhile.
+        for key, (persisted, liked) in batch.items():
+            if key in self._pending:
+                liked = self._pending[key][1]
+            if liked == persisted:
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = (persisted, liked)
+        self._deltas.update(self._flushing_deltas)
+        self._flushing = {}
+        self._flushing_deltas = Counter()
+
+    def _write(self, batch):
+        post_ids = {post_id for post_id, _ in batch}
+        profile_ids = {profile_id for _, profile_id in batch}
+        # Likes of posts or profiles deleted in the meantime are dropped.
+        existing_posts = set(BlogPost.objects.filter(pk__in=post_ids).values_list("pk", flat=True))
+        existing_profiles = set(UserProfile.objects.filter(pk__in=profile_ids).values_list("pk", flat=True))
+
+        inserts, deletes = [], []
+        for (post_id, profile_id), (_, liked) in batch.items():
+            if post_id not in existing_posts or profile_id not in existing_profiles:
+                continue
+            (inserts if liked else deletes).append((post_id, profile_id))
+
+        batch_size = settings.BLOG_LIKES_FLUSH_BATCH_SIZE
+        deltas = likes.insert_many(inserts, batch_size)
+        deltas.subtract(likes.delete_many(deletes, batch_size))
+        # Counted from the rows that really changed, so likes written by
+        # other processes in the meantime cannot make the counter drift.
+        likes.apply_deltas(deltas)
+        return deltas
+
+    def _ensure_flusher(self):
+        interval = settings.BLOG_LIKES_FLUSH_INTERVAL
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name="like-buffer-flush", daemon=True
+            )
+            self._thread.start()
+            if not self._registered:
+                atexit.register(self.shutdown)
+                self._registered = True
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered likes failed; will retry")
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        """Stop the flusher thread and write whatever is still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.BLOG_LIKES_FLUSH_INTERVAL + 5)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final flush of buffered likes failed")
+
+
+buffer = LikeBuffer()
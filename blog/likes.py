@@ -0,0 +1,151 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from blog import like_buffer
+from blog.cache import bump_content_version
+from blog.models import BlogPost, Like
+
+# Likes are written with plain SQL so that each step is a single statement
+# whose RETURNING clause tells us whether a row really changed: no separate
+# exists() check that a concurrent request could race, and no COUNT(*).
+# Both PostgreSQL and SQLite (3.35+) support the syntax used here. The
+# m2m_changed handlers in blog.signals are bypassed, so the counter and the
+# content version are maintained here.
+#
+# With BLOG_LIKES_WRITE_BEHIND enabled, all three operations go through the
+# per-process buffer in blog.like_buffer instead and are written in batches.
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(Like._meta.db_table), quote(BlogPost._meta.db_table)
+
+
+def _insert(cursor, likes_table, post_id, profile_id):
+    cursor.execute(
+        f"INSERT INTO {likes_table} (blogpost_id, userprofile_id) VALUES (%s, %s) "
+        "ON CONFLICT DO NOTHING RETURNING id",
+        [post_id, profile_id],
+    )
+    return cursor.fetchone() is not None
+
+
+def _delete(cursor, likes_table, post_id, profile_id):
+    cursor.execute(
+        f"DELETE FROM {likes_table} WHERE blogpost_id = %s AND userprofile_id = %s RETURNING id",
+        [post_id, profile_id],
+    )
+    return cursor.fetchone() is not None
+
+
+def _apply(cursor, posts_table, post_id, delta):
+    if delta:
+        # Floored at 0, so a counter that has drifted low never goes
+        # negative (CASE rather than GREATEST, which SQLite lacks).
+        cursor.execute(
+            f"UPDATE {posts_table} SET likes_count = CASE WHEN likes_count + %s < 0 THEN 0 "
+            "ELSE likes_count + %s END WHERE id = %s RETURNING likes_count",
+            [delta, delta, post_id],
+        )
+    else:
+        cursor.execute(f"SELECT likes_count FROM {posts_table} WHERE id = %s", [post_id])
+    row = cursor.fetchone()
+    if row is None:
+        # Rolls back a like inserted against a missing post (the foreign key
+        # is only checked at commit).
+        raise BlogPost.DoesNotExist("BlogPost matching query does not exist.")
+    return row[0]
+
+
+def _execute_many(sql, pairs, batch_size):
+    table, _ = _tables()
+    changed = Counter()
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), batch_size):
+            rows = pairs[start:start + batch_size]
+            values = ", ".join(["(%s, %s)"] * len(rows))
+            cursor.execute(sql.format(table=table, values=values), [value for row in rows for value in row])
+            changed.update(post_id for post_id, in cursor.fetchall())
+    return changed
+
+
+def insert_many(pairs, batch_size):
+    """
+    Insert `(post_id, profile_id)` likes, skipping existing ones, with one
+    multi-row statement per batch. Returns the number of new likes per post;
+    counters are left to the caller (see apply_deltas()).
+    """
+    return _execute_many(
+        "INSERT INTO {table} (blogpost_id, userprofile_id) VALUES {values} "
+        "ON CONFLICT DO NOTHING RETURNING blogpost_id",
+        pairs,
+        batch_size,
+    )
+
+
+def delete_many(pairs, batch_size):
+    """Delete `(post_id, profile_id)` likes; returns the number removed per post."""
+    return _execute_many(
+        "DELETE FROM {table} WHERE (blogpost_id, userprofile_id) IN (VALUES {values}) "
+        "RETURNING blogpost_id",
+        pairs,
+        batch_size,
+    )
+
+
+def apply_deltas(deltas):
+    """Add `{post_id: delta}` to the posts' likes_count, one UPDATE per post."""
+    for post_id, delta in deltas.items():
+        if delta:
+            BlogPost.objects.filter(pk=post_id).update(likes_count=Greatest(F("likes_count") + delta, 0))
+
+
+def _change(post_id, profile_id, liked):
+    likes_table, posts_table = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if liked:
+            changed = _insert(cursor, likes_table, post_id, profile_id)
+        else:
+            changed = _delete(cursor, likes_table, post_id, profile_id)
+        delta = (1 if liked else -1) if changed else 0
+        likes_count = _apply(cursor, posts_table, post_id, delta)
+    if changed:
+        bump_content_version()
+    return likes_count
+
+
+def like(post_id, profile_id):
+    """Idempotently like a post; returns the new likes count."""
+    if settings.BLOG_LIKES_WRITE_BEHIND:
+        return like_buffer.buffer.set(post_id, profile_id, liked=True)[1]
+    return _change(post_id, profile_id, liked=True)
+
+
+def unlike(post_id, profile_id):
+    """Idempotently unlike a post; returns the new likes count."""
+    if settings.BLOG_LIKES_WRITE_BEHIND:
+        return like_buffer.buffer.set(post_id, profile_id, liked=False)[1]
+    return _change(post_id, profile_id, liked=False)
+
+
+def toggle_like(post_id, profile_id):
+    """Flip the like state; returns `(liked, likes_count)`."""
+    if settings.BLOG_LIKES_WRITE_BEHIND:
+        return like_buffer.buffer.set(post_id, profile_id)
+    likes_table, posts_table = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        liked = not _delete(cursor, likes_table, post_id, profile_id)
+        if liked:
+            # A concurrent toggle may have inserted the row since our delete;
+            # the like stands either way but is only counted once.
+            delta = 1 if _insert(cursor, likes_table, post_id, profile_id) else 0
+        else:
+            delta = -1
+        likes_count = _apply(cursor, posts_table, post_id, delta)
+    if delta:
+        bump_content_version()
+    return liked, likes_count
@@ -0,0 +1,108 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.importer import RECORD_TYPES, Importer, InvalidRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users, posts, comments and likes from JSONL or CSV files into the "
+        "database with bulk inserts. JSONL records name their type in a `type` "
+        "field; CSV files hold one type each, given with --type."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Input files, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Input format (default: from the file extension, jsonl for stdin).",
+        )
+        parser.add_argument(
+            "--type",
+            choices=RECORD_TYPES,
+            dest="record_type",
+            help="Record type of every row; required for CSV input.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of records validated and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--hash-workers",
+            type=int,
+            default=4,
+            help="Threads used to hash plaintext passwords.",
+        )
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Stop at the first invalid record instead of reporting and skipping it.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        importer = Importer(
+            batch_size=options["batch_size"],
+            hash_workers=options["hash_workers"],
+            strict=options["strict"],
+            on_error=lambda source, message: self.stderr.write(f"{source}: {message}"),
+        )
+        try:
+            for path in options["paths"]:
+                fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+                if fmt == "csv" and not options["record_type"]:
+                    raise CommandError("--type is required for CSV input")
+                with self.open(path) as fh:
+                    for source, record_type, record in self.read(fh, path, fmt, options["record_type"], importer):
+                        importer.add(record_type, record, source)
+            importer.finish()
+        except InvalidRecord as exc:
+            raise CommandError(f"Import stopped: {exc}")
+
+        for record_type in RECORD_TYPES:
+            created, skipped = importer.created[record_type], importer.skipped[record_type]
+            if created or skipped:
+                self.stdout.write(f"{record_type}s: {created} created, {skipped} already present")
+        message = f"Import finished with {importer.errors} invalid records"
+        if importer.errors:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def open(self, path):
+        if path == "-":
+            return open(sys.stdin.fileno(), encoding="utf-8", newline="", closefd=False)
+        try:
+            return open(path, encoding="utf-8", newline="")
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+    def read(self, fh, path, fmt, record_type, importer):
+        if fmt == "csv":
+            # Row 1 is the header.
+            for line, row in enumerate(csv.DictReader(fh), start=2):
+                record = {name: value for name, value in row.items() if value != ""}
+                yield f"{path}:{line}", record_type, record
+            return
+
+        for line, text in enumerate(fh, start=1):
+            if not text.strip():
+                continue
+            source = f"{path}:{line}"
+            try:
+                record = json.loads(text)
+            except ValueError as exc:
+                importer.error(source, f"invalid JSON: {exc}")
+                continue
+            if not isinstance(record, dict):
+                importer.error(source, "expected a JSON object")
+                continue
+            yield source, record.pop("type", record_type), record
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import export
+
+
+class Command(BaseCommand):
+    help = "Write every post with its comments and like count as NDJSON, one post per line in id order."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="Output file, or - for stdout (default).")
+        parser.add_argument("--after", type=int, help="Only export posts with a greater id, to resume an export.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Posts fetched per round trip (default: BLOG_EXPORT_CHUNK_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        exported = 0
+        with self.open(options["output"]) as fh:
+            for chunk in export.export_chunks(after=options["after"], chunk_size=options["chunk_size"]):
+                fh.write(export.to_ndjson(chunk))
+                exported += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {exported} posts"))
+
+    def open(self, path):
+        if path == "-":
+            return open(sys.stdout.fileno(), "w", encoding="utf-8", closefd=False)
+        try:
+            return open(path, "w", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Cannot write {path}: {exc}")
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog.dataset import DatasetGenerator
+from blog.importer import as_datetime, InvalidRecord
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset of users, posts, comments and likes with bulk "
+        "inserts. Authors and post popularity follow Zipf distributions, and the same "
+        "--seed, --prefix and --until always give the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--likes", type=int, default=100000, help="Likes to draw; a profile likes a post at most once.")
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of authors and post popularity; 0 is uniform, higher is more skewed.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="gen", help="Usernames are <prefix><n>.")
+        parser.add_argument("--password", default="password123", help="Password of every generated account.")
+        parser.add_argument("--until", help="Latest timestamp, ISO 8601 (default: now).")
+        parser.add_argument("--days", type=int, default=365, help="Posts and comments span this many days.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert.")
+
+    def handle(self, *args, **options):
+        if min(options["users"], options["posts"], options["comments"], options["likes"]) < 0:
+            raise CommandError("Sizes cannot be negative")
+        if options["users"] < 1 and options["posts"]:
+            raise CommandError("Posts need at least one user")
+        if options["batch_size"] < 1 or options["days"] < 1:
+            raise CommandError("--batch-size and --days must be positive")
+        if User.objects.filter(username=f"{options['prefix']}0").exists():
+            raise CommandError(f"Users named {options['prefix']}<n> exist already; choose another --prefix")
+        try:
+            until = as_datetime(options["until"]) or timezone.now()
+        except InvalidRecord as exc:
+            raise CommandError(f"--until: {exc}")
+
+        generator = DatasetGenerator(
+            users=options["users"],
+            posts=options["posts"],
+            comments=options["comments"],
+            likes=options["likes"],
+            skew=options["skew"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+            password=options["password"],
+            until=until,
+            days=options["days"],
+            batch_size=options["batch_size"],
+            on_progress=self.progress if options["verbosity"] > 1 else None,
+        )
+        started = time.monotonic()
+        created = generator.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {created['users']} users, {created['posts']} posts, {created['comments']} comments "
+            f"and {created['likes']} likes in {time.monotonic() - started:.1f}s"
+        ))
+
+    def progress(self, kind, count):
+        self.stdout.write(f"{kind}: {count}")
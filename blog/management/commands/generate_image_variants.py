@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import BlogPost
+from users.images import generate_variants, needs_variants
+from users.models import UserProfile
+
+IMAGE_FIELDS = [(BlogPost, "cover_photo"), (UserProfile, "profile_photo")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized variants of cover and profile photos uploaded before "
+        "the variant pipeline existed, or whose background job failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            dest="regenerate",
+            help="Regenerate every variant, e.g. after changing IMAGE_VARIANT_SIZES.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS:
+            queryset = (
+                model._default_manager
+                .exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .only("pk", field_name, f"{field_name}_variants")
+                .order_by("pk")
+            )
+            generated = failed = 0
+            for instance in queryset.iterator(chunk_size=500):
+                if not options["regenerate"] and not needs_variants(instance, field_name):
+                    continue
+                try:
+                    generated += generate_variants(model, instance.pk, field_name)
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {instance.pk}: {exc}")
+            message = f"{model.__name__}.{field_name}: {generated} generated, {failed} failed"
+            self.stdout.write(self.style.WARNING(message) if failed else self.style.SUCCESS(message))
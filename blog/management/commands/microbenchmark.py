@@ -0,0 +1,110 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from blog import microbenchmarks
+from blog.dataset import DatasetGenerator
+from blog.models import BlogPost, Comment
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list serializers and the post list queryset in process, with their "
+        "peak memory (tracemalloc) and query counts, on a generated dataset that is "
+        "rolled back afterwards. Needs a database without posts, comments or profiles. "
+        "With --baseline, fail on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,1000", help="Comma separated numbers of objects per run.")
+        parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case; the best one is compared.")
+        parser.add_argument(
+            "--case",
+            action="append",
+            dest="cases",
+            choices=list(microbenchmarks.CASES),
+            help="Only run this case (can be repeated).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated dataset.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="JSON file of an earlier run to compare against.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed increase of time and memory over the baseline, as a fraction.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options["sizes"].split(",") if size})
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers")
+        if not sizes or sizes[0] < 1 or options["repeat"] < 1:
+            raise CommandError("--sizes and --repeat must be positive")
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as fh:
+                    baseline = json.load(fh)["results"]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        # The cases read whole tables, newest first, so existing rows would be
+        # measured instead of the generated ones.
+        for model in (BlogPost, Comment, UserProfile):
+            if model.objects.exists():
+                raise CommandError(
+                    f"The database already has {model._meta.verbose_name_plural}; "
+                    "run the microbenchmarks on an empty one."
+                )
+
+        self.stdout.write(f"{'case':<36}{'size':>6}{'best ms':>10}{'median ms':>11}{'queries':>9}{'peak KiB':>10}")
+        with transaction.atomic():
+            self.generate(max(sizes), options["seed"])
+            results = microbenchmarks.run_suite(sizes, options["repeat"], options["cases"], self.report)
+            transaction.set_rollback(True)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({"environment": self.environment(options), "results": results}, fh, indent=2)
+
+        if baseline is not None:
+            found = microbenchmarks.regressions(baseline, results, options["tolerance"])
+            for regression in found:
+                self.stderr.write(self.style.ERROR(regression))
+            if found:
+                raise CommandError(f"{len(found)} regressions against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def generate(self, size, seed):
+        # Enough rows for the largest size of every case, always the same ones.
+        DatasetGenerator(
+            users=max(size, 20),
+            posts=size,
+            comments=size * 5,
+            likes=size * 10,
+            seed=seed,
+            prefix="microbenchmark",
+            until=parse_datetime("2026-01-01T00:00:00Z"),
+        ).generate()
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['case']:<36}{result['size']:>6}{result['best_ms']:>10.2f}{result['median_ms']:>11.2f}"
+            f"{result['queries']:>9}{result['peak_kib']:>10.1f}"
+        )
+
+    def environment(self, options):
+        return {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "seed": options["seed"],
+        }
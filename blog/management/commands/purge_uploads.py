@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions older than BLOG_UPLOAD_EXPIRY seconds, and their partial files."
+
+    def handle(self, *args, **options):
+        purged = 0
+        for upload in list(uploads.expired_sessions().only("pk")):
+            uploads.discard(upload)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired uploads"))
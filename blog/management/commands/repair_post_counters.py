@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = "Recompute BlogPost.likes_count and BlogPost.comments_count from the source rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts updated per transaction.",
+        )
+        parser.add_argument(
+            "--post",
+            type=int,
+            action="append",
+            dest="post_ids",
+            help="Only repair the given post id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = BlogPost.objects.order_by("pk")
+        if options["post_ids"]:
+            queryset = queryset.filter(pk__in=options["post_ids"])
+
+        repaired = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                repaired += BlogPost.objects.filter(pk__in=pks).refresh_counters()
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {repaired} posts"))
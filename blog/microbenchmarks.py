@@ -0,0 +1,149 @@
+import gc
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from blog.api.fast import get_fast_serializer
+from blog.api.serializers import (
+    BlogPostGetSerializer,
+    CommentGetSerializer,
+    blog_post_list_queryset,
+    comment_list_queryset,
+)
+from blog.api.views import BlogPostListAPIView, CommentListAPIView
+from users.api.user_profile.serializers import UserProfileSerializer
+from users.models import UserProfile
+
+# name: setup(size) returning the function to measure. Setup runs
+# outside the measurement. Serializer cases load their rows in the
+# measured function, queries included, as a list page does, so the DRF
+# and fast path cases compare like for like.
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def list_view(view_class, path):
+    """A view instance set up as if it were answering an anonymous GET of `path`."""
+    view = view_class()
+    request = RequestFactory().get(path)
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    return view
+
+
+@case("BlogPostGetSerializer")
+def post_serializer(size):
+    view = list_view(BlogPostListAPIView, "/blog/posts_list/")
+    context = view.get_serializer_context()
+    return lambda: BlogPostGetSerializer(blog_post_list_queryset(view)[:size], many=True, context=context).data
+
+
+@case("BlogPostGetSerializer (fast path)")
+def fast_post_serializer(size):
+    view = list_view(BlogPostListAPIView, "/blog/posts_list/")
+    fast = get_fast_serializer(BlogPostGetSerializer, fields=None, expand=None)
+    return lambda: fast.serialize(list(fast.values(blog_post_list_queryset(view))[:size]), view.request)
+
+
+@case("CommentGetSerializer")
+def comment_serializer(size):
+    view = list_view(CommentListAPIView, "/blog/comments-list/")
+    context = view.get_serializer_context()
+    return lambda: CommentGetSerializer(comment_list_queryset(view)[:size], many=True, context=context).data
+
+
+@case("UserProfileSerializer")
+def profile_serializer(size):
+    view = list_view(BlogPostListAPIView, "/blog/posts_list/")
+    context = view.get_serializer_context()
+    return lambda: UserProfileSerializer(UserProfile.objects.order_by("id")[:size], many=True, context=context).data
+
+
+@case("BlogPostListAPIView.get_queryset")
+def post_list_queryset(size):
+    view = list_view(BlogPostListAPIView, "/blog/posts_list/")
+    # The page query and its prefetches, as the view evaluates them.
+    return lambda: list(view.get_queryset()[:size])
+
+
+def measure(run, repeat):
+    """
+    Time `run` `repeat` times after one warm-up call (with the garbage
+    collector off, like timeit), then count its queries and trace its
+    peak memory in two more calls.
+    """
+    run()
+    timings = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+
+    with CaptureQueriesContext(connection) as queries:
+        run()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "best_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_suite(sizes, repeat, names=None, on_result=None):
+    results = []
+    for name, setup in CASES.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            result = {"case": name, "size": size, **measure(setup(size), repeat)}
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def regressions(baseline, results, tolerance):
+    """
+    Describe every result that is worse than its baseline entry: more
+    queries at all, or a best time or peak memory more than `tolerance`
+    (a fraction) above it.
+    """
+    previous = {(entry["case"], entry["size"]): entry for entry in baseline}
+    found = []
+    for result in results:
+        before = previous.get((result["case"], result["size"]))
+        if before is None:
+            continue
+        label = f"{result['case']} [{result['size']}]"
+        if result["queries"] > before["queries"]:
+            found.append(f"{label}: {before['queries']} -> {result['queries']} queries")
+        for key, unit in (("best_ms", "ms"), ("peak_kib", "KiB")):
+            if result[key] > before[key] * (1 + tolerance):
+                found.append(f"{label}: {before[key]} -> {result[key]} {unit}")
+    return found
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0001_initial"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(fields=["-created_at", "-id"], name="blogpost_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["-created_at", "-id"], name="comment_created_id_idx"),
+        ),
+    ]
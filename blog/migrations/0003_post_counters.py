@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    BlogPost = apps.get_model("blog", "BlogPost")
+    Comment = apps.get_model("blog", "Comment")
+    likes = (
+        BlogPost.likes.through.objects.filter(blogpost_id=OuterRef("pk"))
+        .order_by()
+        .values("blogpost_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    comments = (
+        Comment.objects.filter(blog_post_id=OuterRef("pk"))
+        .order_by()
+        .values("blog_post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    BlogPost.objects.update(
+        likes_count=Coalesce(Subquery(likes), 0),
+        comments_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0002_created_id_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
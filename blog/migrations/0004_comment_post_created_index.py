@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0003_post_counters"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["blog_post", "-created_at", "-id"],
+                name="comment_post_created_id_idx",
+            ),
+        ),
+        # The composite index above covers blog_post_id lookups on its own.
+        migrations.AlterField(
+            model_name="comment",
+            name="blog_post",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="blog.blogpost",
+            ),
+        ),
+    ]
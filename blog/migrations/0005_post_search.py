@@ -0,0 +1,72 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_SQL = """
+CREATE FUNCTION blog_blogpost_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER blog_blogpost_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, body ON blog_blogpost
+    FOR EACH ROW EXECUTE FUNCTION blog_blogpost_search_vector_update();
+
+UPDATE blog_blogpost SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'B');
+
+CREATE INDEX blogpost_search_idx ON blog_blogpost USING gin (search_vector);
+"""
+
+DROP_SEARCH_SQL = """
+DROP INDEX IF EXISTS blogpost_search_idx;
+DROP TRIGGER IF EXISTS blog_blogpost_search_vector_trigger ON blog_blogpost;
+DROP FUNCTION IF EXISTS blog_blogpost_search_vector_update();
+"""
+
+
+def create_search(apps, schema_editor):
+    # Other backends (SQLite in tests) fall back to substring matching.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SEARCH_SQL)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_comment_post_created_index"),
+        ("users", "0002_user_token_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="blogpost",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="blogpost_search_idx"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search, drop_search),
+            ],
+        ),
+    ]
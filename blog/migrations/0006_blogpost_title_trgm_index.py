@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["title"], name="blogpost_title_trgm_idx", opclasses=["gin_trgm_ops"]
+)
+
+
+def add_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("blog", "BlogPost"), INDEX)
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("blog", "BlogPost"), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0005_post_search"),
+        # Creates the pg_trgm extension.
+        ("users", "0003_profile_name_trgm_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="blogpost", index=INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_index, remove_index),
+            ],
+        ),
+    ]
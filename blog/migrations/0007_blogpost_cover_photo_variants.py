@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_blogpost_title_trgm_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="cover_photo_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,23 +1,136 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+import uuid
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.fields import TimestampField
 from users.models import UserProfile
 
+
+class BlogPostQuerySet(models.QuerySet):
+    def refresh_counters(self):
+        # Recompute the denormalized counters from the source rows.
+        likes = (
+            BlogPost.likes.through.objects
+            .filter(blogpost_id=OuterRef('pk'))
+            .order_by()
+            .values('blogpost_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        comments = (
+            Comment.objects
+            .filter(blog_post_id=OuterRef('pk'))
+            .order_by()
+            .values('blog_post_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        return self.update(
+            likes_count=Coalesce(Subquery(likes), 0),
+            comments_count=Coalesce(Subquery(comments), 0),
+        )
+
+
+class BlogPostManager(models.Manager.from_queryset(BlogPostQuerySet)):
+    def get_queryset(self):
+        # The search vector is only ever read by PostgreSQL itself.
+        return super().get_queryset().defer('search_vector')
+
+
 class BlogPost(models.Model):
     title = models.CharField(max_length=255)
     body = models.TextField()
     cover_photo = models.ImageField(upload_to='blog_covers/', blank=True, null=True)
+    # Resized copies of cover_photo, written in the background by users.images.
+    cover_photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     author = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='blog_posts')
     likes = models.ManyToManyField(UserProfile, related_name='liked_posts', blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by blog.signals; run `manage.py repair_post_counters` to rebuild.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted title + body, maintained by a PostgreSQL trigger (see blog.search).
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_at = TimestampField(auto_now_add=True)
+    updated_at = TimestampField(auto_now=True)
+
+    objects = BlogPostManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='blogpost_created_id_idx'),
+            # Created on PostgreSQL only, by migrations 0005 and 0006.
+            GinIndex(fields=['search_vector'], name='blogpost_search_idx'),
+            GinIndex(fields=['title'], name='blogpost_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Never write back counters read earlier; they move underneath us.
+        # Neither the search vector, which only the database computes, nor
+        # the image variants, which a background job records.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (
+                    'likes_count', 'comments_count', 'search_vector', 'cover_photo_variants',
+                )
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 class Comment(models.Model):
-    blog_post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments')
+    # Indexed through comment_post_created_id_idx, whose leading column it is.
+    blog_post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments', db_index=False)
     body = models.TextField()
     author = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='comments')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = TimestampField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+            models.Index(fields=['blog_post', '-created_at', '-id'], name='comment_post_created_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the insert and the post_save counter update in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Comment by {self.author.first_name} {self.author.last_name} on {self.blog_post.title}'
+
+
+class Upload(models.Model):
+    """
+    A resumable upload session (see blog.uploads). Chunks are appended to
+    a file under BLOG_UPLOAD_DIR until `offset` reaches `size`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    # Optional SHA-256 of the whole file, checked once the last chunk is in.
+    checksum = models.CharField(max_length=64, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = TimestampField(auto_now_add=True)
+    updated_at = TimestampField(auto_now=True)
+
+    @property
+    def path(self):
+        return settings.BLOG_UPLOAD_DIR / str(self.id)
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+
+Like = BlogPost.likes.through
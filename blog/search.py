@@ -0,0 +1,122 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Concat, Greatest, Left, Length, Replace
+
+from blog.cache import get_cache
+from blog.models import BlogPost
+from users.models import UserProfile
+
+# Must match the text search configuration used by the trigger in migration
+# blog/0005_post_search.
+SEARCH_CONFIG = "english"
+HEADLINE_OPTIONS = {
+    "start_sel": "<mark>",
+    "stop_sel": "</mark>",
+    "max_fragments": 2,
+    "max_words": 30,
+    "min_words": 10,
+}
+FALLBACK_HEADLINE_LENGTH = 200
+# Like django.utils.html.escape(), "&" first.
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def escape_html(expression):
+    """`expression` with the HTML special characters escaped, in SQL."""
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+def search_posts(queryset, query):
+    """
+    Filter `queryset` to the posts matching `query` (web search syntax:
+    words, "quoted phrases", -exclusions, OR) and annotate a `rank` and a
+    highlighted `headline` of the body. The headline is safe HTML: the body
+    is escaped before the matches are wrapped in <mark>.
+
+    On PostgreSQL this uses the trigger-maintained `search_vector` and its
+    GIN index. Other backends get a degraded substring match on title and
+    body with a constant rank, enough for tests and local development.
+    """
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        return queryset.filter(search_vector=search_query).annotate(
+            # double precision, so the rank round-trips exactly through cursors
+            rank=Cast(SearchRank(F("search_vector"), search_query), FloatField()),
+            headline=SearchHeadline(escape_html("body"), search_query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+        )
+
+    condition = Q()
+    for term in query.split():
+        condition &= Q(title__icontains=term) | Q(body__icontains=term)
+    return queryset.filter(condition).annotate(
+        rank=Value(0.0, output_field=FloatField()),
+        headline=escape_html(Left("body", FALLBACK_HEADLINE_LENGTH)),
+    )
+
+
+def suggest_posts(query, limit):
+    if connection.vendor == "postgresql":
+        # `%>` (word similarity) is served by the title's trigram index and
+        # matches prefixes as well as typos.
+        queryset = (
+            BlogPost.objects
+            .filter(title__trigram_word_similar=query)
+            .annotate(similarity=TrigramWordSimilarity(query, "title"))
+            .order_by("-similarity", Length("title"), "-id")
+        )
+    else:
+        queryset = BlogPost.objects.filter(title__icontains=query).order_by(Length("title"), "-id")
+    return [
+        {"type": "post", "id": pk, "label": title}
+        for pk, title in queryset.values_list("id", "title")[:limit]
+    ]
+
+
+def suggest_authors(query, limit):
+    if connection.vendor == "postgresql":
+        queryset = (
+            UserProfile.objects
+            .filter(Q(first_name__trigram_word_similar=query) | Q(last_name__trigram_word_similar=query))
+            .annotate(similarity=Greatest(
+                TrigramWordSimilarity(query, "first_name"),
+                TrigramWordSimilarity(query, "last_name"),
+            ))
+            .order_by("-similarity", "last_name", "id")
+        )
+    else:
+        queryset = (
+            UserProfile.objects
+            .filter(Q(first_name__icontains=query) | Q(last_name__icontains=query))
+            .order_by("last_name", "id")
+        )
+    queryset = queryset.annotate(label=Concat("first_name", Value(" "), "last_name"))
+    return [
+        {"type": "author", "id": pk, "label": label}
+        for pk, label in queryset.values_list("id", "label")[:limit]
+    ]
+
+
+SUGGESTERS = {"post": suggest_posts, "author": suggest_authors}
+
+
+def autocomplete(query, kinds, limit):
+    """
+    Return at most `limit` `{type, id, label}` suggestions per kind, cached
+    for BLOG_AUTOCOMPLETE_CACHE_TIMEOUT seconds: typeahead clients send the
+    same few prefixes over and over, and slightly stale labels are fine.
+    """
+    query = " ".join(query.split()).lower()
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+    key = f"blog:autocomplete:{','.join(kinds)}:{limit}:{digest}"
+    cache = get_cache()
+    results = cache.get(key)
+    if results is None:
+        results = [item for kind in kinds for item in SUGGESTERS[kind](query, limit)]
+        cache.set(key, results, settings.BLOG_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
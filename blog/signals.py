@@ -0,0 +1,96 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from blog.cache import bump_content_version
+from blog.models import BlogPost, Comment, Like
+from users.images import needs_variants, schedule_variants, variants_ready
+from users.models import UserProfile
+
+
+@receiver(post_save, sender=BlogPost)
+def generate_cover_photo_variants(sender, instance, **kwargs):
+    if needs_variants(instance, "cover_photo"):
+        schedule_variants(instance, "cover_photo")
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        BlogPost.objects.filter(pk=instance.blog_post_id).update(
+            comments_count=F("comments_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    BlogPost.objects.filter(pk=instance.blog_post_id, comments_count__gt=0).update(
+        comments_count=F("comments_count") - 1
+    )
+
+
+@receiver(m2m_changed, sender=Like)
+def update_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    # Django only reports the rows that were really inserted for post_add,
+    # but reports the requested (not the removed) rows for remove, so the
+    # rows that actually exist are looked up in pre_remove/pre_clear.
+    if reverse:
+        likes = Like.objects.filter(userprofile_id=instance.pk)
+        liked_post_ids = likes.values_list("blogpost_id", flat=True)
+    else:
+        likes = Like.objects.filter(blogpost_id=instance.pk)
+
+    if action == "pre_remove":
+        if reverse:
+            instance._unliked_post_ids = list(liked_post_ids.filter(blogpost_id__in=pk_set))
+        else:
+            instance._removed_likes = likes.filter(userprofile_id__in=pk_set).count()
+    elif action == "pre_clear":
+        if reverse:
+            instance._unliked_post_ids = list(liked_post_ids)
+        else:
+            instance._removed_likes = likes.count()
+    elif action == "post_add" and pk_set:
+        if reverse:
+            BlogPost.objects.filter(pk__in=pk_set).update(likes_count=F("likes_count") + 1)
+        else:
+            BlogPost.objects.filter(pk=instance.pk).update(
+                likes_count=F("likes_count") + len(pk_set)
+            )
+    elif action in ("post_remove", "post_clear"):
+        if reverse:
+            unliked = instance.__dict__.pop("_unliked_post_ids", [])
+            if unliked:
+                BlogPost.objects.filter(pk__in=unliked, likes_count__gt=0).update(
+                    likes_count=F("likes_count") - 1
+                )
+        else:
+            removed = instance.__dict__.pop("_removed_likes", 0)
+            if removed:
+                BlogPost.objects.filter(pk=instance.pk).update(
+                    likes_count=Greatest(F("likes_count") - removed, 0)
+                )
+
+
+@receiver(pre_delete, sender=UserProfile)
+def release_profile_likes(sender, instance, **kwargs):
+    # The cascade deletes the like rows without sending m2m_changed.
+    BlogPost.objects.filter(likes=instance, likes_count__gt=0).update(
+        likes_count=F("likes_count") - 1
+    )
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(variants_ready)  # pages embed cover and author photo variants
+def invalidate_cached_pages(sender, **kwargs):
+    bump_content_version()
+
+
+@receiver(m2m_changed, sender=Like)
+def invalidate_cached_pages_on_like(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_content_version()
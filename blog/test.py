@@ -1,6 +1,36 @@
-from django.test import TestCase
-from users.models import User, UserProfile
-from blog.models import BlogPost, Comment
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import warnings
+from base64 import b64encode
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.http import Http404
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from blog import export, likes, uploads
+from blog.api.async_views import AsyncBlogPostListView
+from blog.api.fast import cached_fast_serializer
 from blog.api.serializers import (
     JustBlogPostSerializer,
     CommentSerializer,
@@ -9,7 +39,13 @@ from blog.api.serializers import (
     BlogPostGetSerializer,
     BlogPostLikeToggleSerializer,
 )
-from rest_framework.test import APIRequestFactory
+from blog.cache import page_key
+from blog.like_buffer import LikeBuffer
+from blog.microbenchmarks import CASES
+from blog.models import BlogPost, Comment, Like, Upload
+from blog.test_query_budget import POST_LIST_BUDGET
+from users import images
+from users.models import User, UserProfile
 
 
 
@@ -244,3 +280,1665 @@ class BlogPostLikeToggleSerializerTest(BaseSerializerTest):
         self.assertFalse(result["liked"])
         self.assertEqual(result["likes_count"], 0)
         self.assertFalse(self.blog_post.likes.filter(id=self.profile.id).exists())
+
+
+class CursorPaginationAPITest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cursoruser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Cursor",
+            last_name="User",
+            email="cursor@example.com",
+            phone_number="+1000000001"
+        )
+
+        # Pairs of posts share a timestamp so the id tie-breaker is exercised.
+        base = timezone.now() - timedelta(hours=1)
+        for index in range(7):
+            post = BlogPost.objects.create(
+                title=f"Post {index}",
+                body="Body",
+                author=self.profile
+            )
+            BlogPost.objects.filter(pk=post.pk).update(
+                created_at=base + timedelta(seconds=index // 2)
+            )
+            Comment.objects.create(blog_post=post, body=f"Comment {index}", author=self.profile)
+
+        self.expected_ids = list(
+            BlogPost.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def collect(self, url):
+        ids, previous_links = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            previous_links.append(response.data["previous"])
+            url = response.data["next"]
+        return ids, previous_links
+
+    def test_page_number_pagination_is_the_default(self):
+        response = self.client.get(reverse("blogpost-list"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 7)
+
+    def test_cursor_pages_cover_every_post_once(self):
+        ids, previous_links = self.collect(reverse("blogpost-list") + "?pagination=cursor&page_size=3")
+
+        self.assertEqual(ids, self.expected_ids)
+        self.assertIsNone(previous_links[0])
+        self.assertTrue(all(previous_links[1:]))
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get(reverse("blogpost-list") + "?pagination=cursor&page_size=3")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+
+        self.assertEqual(
+            [item["id"] for item in back.data["results"]],
+            [item["id"] for item in first.data["results"]],
+        )
+
+    def test_new_posts_do_not_shift_later_pages(self):
+        first = self.client.get(reverse("blogpost-list") + "?pagination=cursor&page_size=3")
+        BlogPost.objects.create(title="Fresh", body="Body", author=self.profile)
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(
+            [item["id"] for item in second.data["results"]],
+            self.expected_ids[3:6],
+        )
+
+    def test_comment_list_cursor_pagination(self):
+        ids, _ = self.collect(reverse("comment-list") + "?pagination=cursor&page_size=4")
+
+        self.assertEqual(
+            ids,
+            list(Comment.objects.order_by("-created_at", "-id").values_list("id", flat=True)),
+        )
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("blogpost-list") + "?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_positions_return_404(self):
+        positions = (["garbage", 1], [{"a": 1}, 1], ["2026-01-01T00:00:00", "x"], ["2026-01-01T00:00:00", 1])
+        names = ("blogpost-list", "comment-list", "async-blogpost-list", "async-comment-list")
+        for name in names:
+            for position in positions:
+                payload = json.dumps({"p": position, "r": 0}).encode()
+                with self.subTest(name=name, position=position):
+                    response = self.client.get(reverse(name), {"cursor": b64encode(payload).decode()})
+                    self.assertEqual(response.status_code, 404)
+
+
+class BlogPostCounterTest(BaseSerializerTest):
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create_user(username="counteruser", password="pass12345")
+        self.other_profile = UserProfile.objects.create(
+            user=self.other_user,
+            first_name="Jane",
+            last_name="Smith",
+            email="jane@example.com",
+            phone_number="+1987654321"
+        )
+
+    def counters(self):
+        self.blog_post.refresh_from_db(fields=["likes_count", "comments_count"])
+        return self.blog_post.likes_count, self.blog_post.comments_count
+
+    def test_comment_create_and_delete(self):
+        self.assertEqual(self.counters(), (0, 1))
+
+        comment = Comment.objects.create(blog_post=self.blog_post, body="Second", author=self.other_profile)
+        self.assertEqual(self.counters(), (0, 2))
+
+        comment.delete()
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_like_add_remove_and_clear(self):
+        self.blog_post.likes.add(self.profile, self.other_profile)
+        self.blog_post.likes.add(self.profile)
+        self.assertEqual(self.counters(), (2, 1))
+
+        self.blog_post.likes.remove(self.profile, self.profile)
+        self.blog_post.likes.remove(self.profile)
+        self.assertEqual(self.counters(), (1, 1))
+
+        self.blog_post.likes.clear()
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_bulk_remove_never_goes_below_zero(self):
+        self.blog_post.likes.add(self.profile, self.other_profile)
+        # A counter that drifted below the real number of likes.
+        BlogPost.objects.filter(pk=self.blog_post.pk).update(likes_count=1)
+
+        self.blog_post.likes.remove(self.profile, self.other_profile)
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_likes_from_the_profile_side(self):
+        self.other_profile.liked_posts.add(self.blog_post)
+        self.assertEqual(self.counters(), (1, 1))
+
+        self.other_profile.liked_posts.remove(self.blog_post)
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_deleting_a_profile_releases_its_likes(self):
+        self.blog_post.likes.add(self.other_profile)
+        self.other_profile.delete()
+
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_saving_a_stale_instance_keeps_counters(self):
+        stale = BlogPost.objects.get(pk=self.blog_post.pk)
+        self.blog_post.likes.add(self.other_profile)
+        stale.title = "Edited"
+        stale.save()
+
+        self.assertEqual(self.counters(), (1, 1))
+
+    def test_serializer_exposes_counters(self):
+        self.blog_post.likes.add(self.other_profile)
+        self.blog_post.refresh_from_db()
+        data = BlogPostGetSerializer(self.blog_post).data
+
+        self.assertEqual(data["likes_count"], 1)
+        self.assertEqual(data["comments_count"], 1)
+
+    def test_repair_command(self):
+        self.blog_post.likes.add(self.other_profile)
+        BlogPost.objects.update(likes_count=42, comments_count=42)
+
+        call_command("repair_post_counters", stdout=StringIO())
+
+        self.assertEqual(self.counters(), (1, 1))
+
+
+@override_settings(BLOG_COMMENTS_PREVIEW_SIZE=3)
+class LatestCommentsPreviewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="previewuser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Preview",
+            last_name="User",
+            email="preview@example.com",
+            phone_number="+1000000002"
+        )
+        self.busy_post = BlogPost.objects.create(title="Busy", body="Body", author=self.profile)
+        self.quiet_post = BlogPost.objects.create(title="Quiet", body="Body", author=self.profile)
+        self.busy_comments = [
+            Comment.objects.create(blog_post=self.busy_post, body=f"Busy {index}", author=self.profile)
+            for index in range(5)
+        ]
+        Comment.objects.create(blog_post=self.quiet_post, body="Only one", author=self.profile)
+
+    def test_list_embeds_only_the_latest_comments(self):
+        response = self.client.get(reverse("blogpost-list"))
+        posts = {post["id"]: post for post in response.data["results"]}
+
+        self.assertEqual(
+            [comment["id"] for comment in posts[self.busy_post.id]["comments"]],
+            [comment.id for comment in reversed(self.busy_comments)][:3],
+        )
+        self.assertEqual(posts[self.busy_post.id]["comments_count"], 5)
+        self.assertEqual(len(posts[self.quiet_post.id]["comments"]), 1)
+
+    def test_serializer_without_prefetch_is_bounded(self):
+        data = BlogPostGetSerializer(self.busy_post).data
+
+        self.assertEqual(len(data["comments"]), 3)
+
+    def test_full_thread_through_comment_list(self):
+        response = self.client.get(reverse("comment-list"), {"blog_post": self.busy_post.id})
+
+        self.assertEqual(response.data["count"], 5)
+        self.assertTrue(
+            all(comment["blog_post"]["id"] == self.busy_post.id for comment in response.data["results"])
+        )
+
+    def test_comment_list_rejects_invalid_post_filter(self):
+        for blog_post in ("abc", "²"):
+            response = self.client.get(reverse("comment-list"), {"blog_post": blog_post})
+
+            self.assertEqual(response.status_code, 400)
+
+
+class BlogPostCommentListAPITest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="threaduser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Thread",
+            last_name="User",
+            email="thread@example.com",
+            phone_number="+1000000003"
+        )
+        self.blog_post = BlogPost.objects.create(title="Thread", body="Body", author=self.profile)
+        self.other_post = BlogPost.objects.create(title="Other", body="Body", author=self.profile)
+        self.comments = [
+            Comment.objects.create(blog_post=self.blog_post, body=f"Comment {index}", author=self.profile)
+            for index in range(5)
+        ]
+        Comment.objects.create(blog_post=self.other_post, body="Elsewhere", author=self.profile)
+
+    def test_pages_through_one_post_newest_first(self):
+        url = reverse("blogpost-comments", args=[self.blog_post.id]) + "?page_size=2"
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(comment["id"] for comment in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(ids, [comment.id for comment in reversed(self.comments)])
+
+    def test_post_without_comments(self):
+        Comment.objects.filter(blog_post=self.other_post).delete()
+        response = self.client.get(reverse("blogpost-comments", args=[self.other_post.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+    def test_unknown_post_returns_404(self):
+        response = self.client.get(reverse("blogpost-comments", args=[999999]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "blog-page-cache"}},
+    BLOG_LIST_CACHE_TIMEOUT=60,
+    BLOG_LIST_CACHE_LOCK_WAIT=0.2,
+)
+class PostListPageCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cacheuser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Cache",
+            last_name="User",
+            email="cache@example.com",
+            phone_number="+1000000004"
+        )
+        self.blog_post = BlogPost.objects.create(title="Cached", body="Body", author=self.profile)
+        self.url = reverse("blogpost-list")
+
+    def authenticate(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_second_anonymous_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, {"pagination": "cursor"})
+
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.authenticate()
+        response = self.client.get(self.url)
+
+        self.assertNotIn("X-Cache", response)
+
+    def test_writes_through_the_api_invalidate_pages(self):
+        self.client.get(self.url)
+        self.authenticate()
+        self.client.post(reverse("blogpost-create"), {"title": "Fresh", "body": "Body"})
+        self.client.post(reverse("blogpost-like", args=[self.blog_post.id]))
+        self.client.post(reverse("comment-create"), {"blog_post": self.blog_post.id, "body": "Hi"})
+        self.client.credentials()
+
+        response = self.client.get(self.url)
+        posts = {post["title"]: post for post in response.data["results"]}
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(posts["Cached"]["likes_count"], 1)
+        self.assertEqual(posts["Cached"]["comments_count"], 1)
+        self.assertIn("Fresh", posts)
+
+    def test_waits_for_the_worker_holding_the_rebuild_lock(self):
+        self.client.get(self.url)
+        key = page_key("posts_list", RequestFactory().get(self.url))
+        entry = cache.get(key)
+        cache.delete(key)
+        cache.add(f"{key}:lock", 1)
+        threading.Timer(0.05, cache.set, args=(key, entry)).start()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_rebuilds_itself_when_the_lock_holder_is_too_slow(self):
+        key = page_key("posts_list", RequestFactory().get(self.url))
+        cache.add(f"{key}:lock", 1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Cache", response)
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches_setting = {
+                "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+            }
+            with override_settings(CACHES=caches_setting):
+                first = self.client.get(self.url)
+                second = self.client.get(self.url)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+
+
+@override_settings(BLOG_LIST_CACHE_TIMEOUT=0)
+class ConditionalListTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="etaguser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Etag",
+            last_name="User",
+            email="etag@example.com",
+            phone_number="+1000000005"
+        )
+        self.blog_post = BlogPost.objects.create(title="Tagged", body="Body", author=self.profile)
+        Comment.objects.create(blog_post=self.blog_post, body="First", author=self.profile)
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        for url in (reverse("blogpost-list"), reverse("comment-list")):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertIn("ETag", first)
+
+                # count and a narrow window query instead of the full page
+                with self.assertNumQueries(2):
+                    second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second["ETag"], first["ETag"])
+                self.assertEqual(second.content, b"")
+
+    def test_cursor_pages_support_conditional_requests(self):
+        url = reverse("blogpost-list") + "?pagination=cursor"
+        first = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 304)
+
+    def test_changes_produce_a_new_etag(self):
+        url = reverse("blogpost-list")
+        etag = self.client.get(url)["ETag"]
+
+        changes = [
+            lambda: self.blog_post.likes.add(self.profile),
+            lambda: Comment.objects.create(blog_post=self.blog_post, body="More", author=self.profile),
+            lambda: BlogPost.objects.filter(pk=self.blog_post.pk).update(title="Renamed", updated_at=timezone.now()),
+            lambda: BlogPost.objects.create(title="Another", body="Body", author=self.profile),
+        ]
+        for change in changes:
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            etag = response["ETag"]
+
+    def test_cached_page_answers_conditional_requests(self):
+        with override_settings(BLOG_LIST_CACHE_TIMEOUT=60):
+            cache.clear()
+            etag = self.client.get(reverse("blogpost-list"))["ETag"]
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse("blogpost-list"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+
+class BlogPostLikeAPITest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="likeuser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Like",
+            last_name="User",
+            email="like@example.com",
+            phone_number="+1000000006"
+        )
+        self.blog_post = BlogPost.objects.create(title="Likeable", body="Body", author=self.profile)
+        self.url = reverse("blogpost-like", args=[self.blog_post.id])
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def likes(self):
+        self.blog_post.refresh_from_db(fields=["likes_count"])
+        return self.blog_post.likes_count, self.blog_post.likes.count()
+
+    def test_toggle(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {"liked": True, "message": "Post liked", "likes_count": 1})
+        self.assertEqual(self.likes(), (1, 1))
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {"liked": False, "message": "Post unliked", "likes_count": 0})
+        self.assertEqual(self.likes(), (0, 0))
+
+    def test_unlike_never_makes_the_counter_negative(self):
+        self.client.put(self.url)
+        # A counter that has drifted below the real number of likes.
+        BlogPost.objects.filter(pk=self.blog_post.pk).update(likes_count=0)
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.data["likes_count"], 0)
+        self.assertEqual(self.likes(), (0, 0))
+
+        likes.apply_deltas({self.blog_post.id: -3})
+        self.assertEqual(self.likes(), (0, 0))
+
+    def test_put_and_delete_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.url)
+            self.assertTrue(response.data["liked"])
+            self.assertEqual(self.likes(), (1, 1))
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertFalse(response.data["liked"])
+            self.assertEqual(self.likes(), (0, 0))
+
+    def test_counter_includes_other_likes(self):
+        other = User.objects.create_user(username="otherliker", password="pass12345")
+        other_profile = UserProfile.objects.create(
+            user=other,
+            first_name="Other",
+            last_name="Liker",
+            email="other@example.com",
+            phone_number="+1000000007"
+        )
+        self.blog_post.likes.add(other_profile)
+
+        response = self.client.put(self.url)
+
+        self.assertEqual(response.data["likes_count"], 2)
+        self.assertEqual(self.likes(), (2, 2))
+
+    def test_unknown_post_returns_404_and_writes_nothing(self):
+        url = reverse("blogpost-like", args=[999999])
+
+        for method in ("post", "put", "delete"):
+            response = getattr(self.client, method)(url)
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(BlogPost.likes.through.objects.exists())
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(BLOG_LIKES_WRITE_BEHIND=True, BLOG_LIKES_FLUSH_INTERVAL=0)
+class LikeWriteBehindTest(TestCase):
+
+    def setUp(self):
+        self.buffer = LikeBuffer()
+        patcher = mock.patch("blog.like_buffer.buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.profiles = []
+        for index in range(3):
+            user = User.objects.create_user(username=f"buffered{index}", password="pass12345")
+            self.profiles.append(UserProfile.objects.create(
+                user=user,
+                first_name="Buffered",
+                last_name=str(index),
+                email=f"buffered{index}@example.com",
+                phone_number=f"+100000010{index}"
+            ))
+        self.blog_post = BlogPost.objects.create(title="Hot", body="Body", author=self.profiles[0])
+        self.blog_post.likes.add(self.profiles[2])
+
+    def stored(self):
+        self.blog_post.refresh_from_db(fields=["likes_count"])
+        return self.blog_post.likes_count, set(self.blog_post.likes.values_list("id", flat=True))
+
+    def test_responses_reflect_buffered_state_before_any_write(self):
+        first, second, liked_already = self.profiles
+
+        self.assertEqual(likes.toggle_like(self.blog_post.id, first.id), (True, 2))
+        self.assertEqual(likes.like(self.blog_post.id, second.id), 3)
+        self.assertEqual(likes.like(self.blog_post.id, second.id), 3)
+        self.assertEqual(likes.toggle_like(self.blog_post.id, liked_already.id), (False, 2))
+
+        self.assertEqual(self.stored(), (1, {liked_already.id}))
+
+    def test_flush_writes_the_batch(self):
+        first, second, liked_already = self.profiles
+        likes.like(self.blog_post.id, first.id)
+        likes.like(self.blog_post.id, second.id)
+        likes.unlike(self.blog_post.id, liked_already.id)
+
+        with self.assertNumQueries(7):
+            # existing posts and profiles, insert, delete, counter (savepoint)
+            self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(self.stored(), (2, {first.id, second.id}))
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_changes_that_cancel_out_are_never_written(self):
+        first = self.profiles[0]
+        likes.toggle_like(self.blog_post.id, first.id)
+        likes.toggle_like(self.blog_post.id, first.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.stored(), (1, {self.profiles[2].id}))
+
+    def test_counter_only_counts_rows_that_changed(self):
+        first = self.profiles[0]
+        likes.like(self.blog_post.id, first.id)
+        # Written by another process after we buffered the like.
+        Like.objects.create(blogpost_id=self.blog_post.id, userprofile_id=first.id)
+        BlogPost.objects.filter(pk=self.blog_post.pk).update(likes_count=2)
+
+        self.buffer.flush()
+
+        self.assertEqual(self.stored(), (2, {first.id, self.profiles[2].id}))
+
+    def test_likes_of_deleted_posts_are_dropped(self):
+        likes.like(self.blog_post.id, self.profiles[0].id)
+        self.blog_post.delete()
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertFalse(Like.objects.exists())
+
+    def test_failed_flush_keeps_the_batch(self):
+        first = self.profiles[0]
+        likes.like(self.blog_post.id, first.id)
+
+        with mock.patch.object(LikeBuffer, "_write", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertEqual(likes.like(self.blog_post.id, first.id), 2)
+
+        self.buffer.flush()
+        self.assertEqual(self.stored(), (2, {first.id, self.profiles[2].id}))
+
+    def test_shutdown_flushes_pending_likes(self):
+        likes.like(self.blog_post.id, self.profiles[0].id)
+
+        self.buffer.shutdown()
+
+        self.assertEqual(self.stored()[0], 2)
+
+    def test_unknown_post(self):
+        with self.assertRaises(BlogPost.DoesNotExist):
+            likes.like(999999, self.profiles[0].id)
+
+
+class AsyncViewsTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="asyncuser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Async",
+            last_name="User",
+            email="async@example.com",
+            phone_number="+1000000020"
+        )
+        for index in range(12):
+            post = BlogPost.objects.create(title=f"Post {index}", body="Body", author=self.profile)
+            post.likes.add(self.profile)
+            Comment.objects.create(blog_post=post, body=f"Comment {index}", author=self.profile)
+        self.blog_post = BlogPost.objects.first()
+
+    def assertSameAsSync(self, sync_name, async_name, params=None):
+        expected = self.client.get(reverse(sync_name), params)
+        response = self.client.get(reverse(async_name), params)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response["Content-Type"], "application/json")
+        body = response.json()
+        for key in ("next", "previous"):
+            if body.get(key):
+                body[key] = body[key].replace("/async/", "/")
+        self.assertEqual(body, expected.json())
+        return body
+
+    def test_lists_match_sync_views(self):
+        for sync_name, async_name in [
+            ("blogpost-list", "async-blogpost-list"),
+            ("comment-list", "async-comment-list"),
+        ]:
+            body = self.assertSameAsSync(sync_name, async_name)
+            self.assertEqual(body["count"], 12)
+            self.assertSameAsSync(sync_name, async_name, {"page": 2})
+            self.assertSameAsSync(sync_name, async_name, {"pagination": "cursor", "page_size": 5})
+
+        self.assertSameAsSync("comment-list", "async-comment-list", {"blog_post": self.blog_post.id})
+
+    def test_errors(self):
+        response = self.client.get(reverse("async-blogpost-list"), {"page": 99})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", response.json())
+
+        self.assertSameAsSync("comment-list", "async-comment-list", {"blog_post": "abc"})
+        self.assertSameAsSync("comment-list", "async-comment-list", {"blog_post": "²"})
+
+        # Permissions first, then the method, as in DRF.
+        response = self.client.post(reverse("async-blogpost-list"))
+        self.assertEqual(response.status_code, self.client.post(reverse("blogpost-list")).status_code)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse("async-blogpost-list"))
+        self.assertEqual(response.status_code, 405)
+        self.client.force_authenticate(None)
+
+        response = self.client.get(reverse("async-blogpost-list"), HTTP_ACCEPT="application/xml")
+        self.assertEqual(response.status_code, 406)
+
+    def test_throttling(self):
+        class Closed(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 30
+
+        with mock.patch.object(AsyncBlogPostListView, "throttle_classes", [Closed]):
+            response = self.client.get(reverse("async-blogpost-list"))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_http404_is_translated(self):
+        with mock.patch.object(AsyncBlogPostListView, "get_queryset", side_effect=Http404):
+            response = self.client.get(reverse("async-blogpost-list"))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", response.json())
+
+    def test_like_toggle(self):
+        url = reverse("async-blogpost-like", args=[self.blog_post.id])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {"liked": False, "message": "Post unliked", "likes_count": 0})
+        response = self.client.put(url)
+        self.assertEqual(response.json(), {"liked": True, "message": "Post liked", "likes_count": 1})
+
+        response = self.client.delete(reverse("async-blogpost-like", args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkImportCommandTest(TestCase):
+
+    def write(self, suffix, lines):
+        fh = tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8")
+        fh.write("\n".join(lines) + "\n")
+        fh.close()
+        self.addCleanup(os.unlink, fh.name)
+        return fh.name
+
+    def run_import(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command("bulk_import", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def jsonl(self):
+        records = [
+            {"type": "user", "username": "legacy1", "password_hash": make_password("secret-one"),
+             "profile": {"first_name": "Ada", "last_name": "One", "email": "one@example.com", "phone_number": "+1200000001"}},
+            {"type": "user", "username": "legacy2", "password": "secret-two",
+             "first_name": "Bob", "last_name": "Two", "email": "two@example.com", "phone_number": "+1200000002"},
+            {"type": "post", "id": 500, "title": "Old post", "body": "Body", "author": "legacy1",
+             "created_at": "2015-03-01T12:00:00Z"},
+            {"type": "post", "title": "Newer post", "body": "Body", "author": "legacy2"},
+            {"type": "comment", "id": 700, "blog_post": 500, "body": "First", "author": "legacy2"},
+            {"type": "comment", "id": 701, "blog_post": 500, "body": "Second", "author": "legacy1"},
+            {"type": "like", "blog_post": 500, "user": "legacy1"},
+            {"type": "like", "blog_post": 500, "user": "legacy2"},
+            {"type": "like", "blog_post": 500, "user": "legacy2"},
+            {"type": "post", "title": "Orphan", "body": "Body", "author": "nobody"},
+            {"type": "comment", "blog_post": 999, "body": "Lost", "author": "legacy1"},
+        ]
+        return self.write(".jsonl", [json.dumps(record) for record in records] + ["{not json"])
+
+    def test_imports_jsonl_in_batches(self):
+        path = self.jsonl()
+        stdout, stderr = self.run_import(path, "--batch-size", "2")
+
+        self.assertIn("unknown author 'nobody'", stderr)
+        self.assertIn("unknown blog_post 999", stderr)
+        self.assertIn("invalid JSON", stderr)
+        self.assertIn("3 invalid records", stdout)
+
+        self.assertTrue(User.objects.get(username="legacy1").check_password("secret-one"))
+        self.assertTrue(User.objects.get(username="legacy2").check_password("secret-two"))
+        self.assertEqual(UserProfile.objects.get(user__username="legacy2").first_name, "Bob")
+
+        post = BlogPost.objects.get(pk=500)
+        self.assertEqual(post.created_at.year, 2015)
+        self.assertEqual((post.likes_count, post.comments_count), (2, 2))
+        self.assertEqual(post.likes.count(), 2)
+        self.assertEqual(BlogPost.objects.count(), 2)
+
+        # Running it again skips everything that is already there; posts and
+        # comments are only recognised by an explicit id.
+        stdout, _ = self.run_import(path)
+        self.assertIn("users: 0 created, 2 already present", stdout)
+        self.assertIn("posts: 1 created, 1 already present", stdout)
+        self.assertIn("comments: 0 created, 2 already present", stdout)
+        self.assertIn("likes: 0 created, 2 already present", stdout)
+        post.refresh_from_db()
+        self.assertEqual((post.likes_count, post.comments_count), (2, 2))
+
+    def test_imports_csv(self):
+        users = self.write(".csv", [
+            "username,password_hash,first_name,last_name,email,phone_number,gender",
+            f"csvuser,{make_password('pw')},Csv,User,csv@example.com,+1200000010,",
+            f"csvuser2,{make_password('pw')},Csv,Two,csv@example.com,+1200000011,",
+            f"csvuser3,{make_password('pw')},Csv,Three,csv3@example.com,+1200000012,Other",
+        ])
+        posts = self.write(".csv", ["title,body,author", "From CSV,Body,csvuser"])
+
+        _, stderr = self.run_import(users, "--type", "user")
+        self.run_import(posts, "--type", "post")
+
+        self.assertIn("email 'csv@example.com' is already in use", stderr)
+        self.assertIn("gender", stderr)
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["csvuser"])
+        self.assertEqual(BlogPost.objects.get().author.user.username, "csvuser")
+
+    def test_strict_stops_at_first_error(self):
+        path = self.write(".jsonl", [json.dumps({"type": "post", "title": "T", "body": "B", "author": "nobody"})])
+        with self.assertRaises(CommandError):
+            self.run_import(path, "--strict")
+        self.assertFalse(BlogPost.objects.exists())
+
+    def test_csv_requires_type(self):
+        path = self.write(".csv", ["title,body,author"])
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+
+
+class BlogPostSearchAPITest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="searchuser", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Search",
+            last_name="User",
+            email="search@example.com",
+            phone_number="+1000000030"
+        )
+        self.url = reverse("blogpost-search")
+        self.title_match = BlogPost.objects.create(
+            title="Sourdough baking", body="Flour and water.", author=self.profile
+        )
+        self.body_match = BlogPost.objects.create(
+            title="Weekend notes", body="I tried baking sourdough bread on Sunday.", author=self.profile
+        )
+        BlogPost.objects.create(title="Gardening", body="Tomatoes everywhere.", author=self.profile)
+        for index in range(5):
+            BlogPost.objects.create(title=f"Sourdough {index}", body="Starter", author=self.profile)
+
+    def search(self, q, **params):
+        return self.client.get(self.url, {"q": q, **params})
+
+    def test_finds_posts_by_title_and_body(self):
+        response = self.search("sourdough baking")
+
+        self.assertEqual(response.status_code, 200)
+        ids = {post["id"] for post in response.data["results"]}
+        self.assertEqual(ids, {self.title_match.id, self.body_match.id})
+        result = response.data["results"][0]
+        self.assertEqual(
+            set(result),
+            {"id", "title", "headline", "author", "likes_count", "comments_count", "rank", "created_at"},
+        )
+
+    def test_cursor_pagination(self):
+        ids, url = [], self.url + "?q=sourdough&page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [post["id"] for post in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_query_is_required(self):
+        self.assertEqual(self.search("  ").status_code, 400)
+        self.assertEqual(self.search("x" * 201).status_code, 400)
+
+    def test_headline_escapes_the_body(self):
+        post = BlogPost.objects.create(
+            title="Unsafe", body="Sourdough <script>alert('x')</script> & more", author=self.profile
+        )
+
+        headline = next(result["headline"] for result in self.search("sourdough").data["results"] if result["id"] == post.id)
+        self.assertNotIn("<script>", headline)
+        self.assertIn("&lt;script&gt;", headline)
+        self.assertIn("&amp;", headline)
+
+    def test_search_vector_is_never_loaded(self):
+        self.assertNotIn("search_vector", str(BlogPost.objects.all().query))
+        self.assertNotIn("search_vector", str(Comment.objects.select_related("blog_post").defer("blog_post__search_vector").query))
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_ranking_and_highlighting(self):
+        response = self.search("sourdough baking")
+        results = response.data["results"]
+
+        # Title matches weigh more than body matches.
+        self.assertEqual(results[0]["id"], self.title_match.id)
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+        self.assertIn("<mark>", results[1]["headline"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_vector_follows_edits(self):
+        self.title_match.title = "Rye loaves"
+        self.title_match.save()
+
+        ids = {post["id"] for post in self.search("rye").data["results"]}
+        self.assertEqual(ids, {self.title_match.id})
+
+
+class AutocompleteAPITest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = User.objects.create_user(username="typeahead", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=user,
+            first_name="Sourav",
+            last_name="Typeahead",
+            email="typeahead@example.com",
+            phone_number="+1000000040"
+        )
+        self.post = BlogPost.objects.create(title="Sourdough baking", body="Body", author=self.profile)
+        BlogPost.objects.create(title="Gardening", body="Body", author=self.profile)
+        self.url = reverse("autocomplete")
+
+    def test_suggests_posts_and_authors(self):
+        response = self.client.get(self.url, {"q": "sour"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [
+            {"type": "post", "id": self.post.id, "label": "Sourdough baking"},
+            {"type": "author", "id": self.profile.id, "label": "Sourav Typeahead"},
+        ])
+
+        response = self.client.get(self.url, {"q": "sour", "types": "author"})
+        self.assertEqual([item["type"] for item in response.data["results"]], ["author"])
+
+    def test_results_are_capped(self):
+        for index in range(15):
+            BlogPost.objects.create(title=f"Sourdough {index}", body="Body", author=self.profile)
+
+        response = self.client.get(self.url, {"q": "sourdough", "types": "post", "limit": 50})
+        self.assertEqual(len(response.data["results"]), 10)
+        response = self.client.get(self.url, {"q": "sourdough", "types": "post", "limit": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+        response = self.client.get(self.url, {"q": "sourdough", "types": "post", "limit": "²"})
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_schema_documents_results(self):
+        schema = self.client.get(reverse("schema"), {"format": "json"}).json()
+        response = schema["paths"]["/blog/autocomplete/"]["get"]["responses"]["200"]
+        self.assertEqual(response["content"]["application/json"]["schema"], {"$ref": "#/components/schemas/Autocomplete"})
+        suggestion = schema["components"]["schemas"]["AutocompleteSuggestion"]
+        self.assertEqual(set(suggestion["properties"]), {"type", "id", "label"})
+
+    def test_results_are_cached_briefly(self):
+        self.client.get(self.url, {"q": "garden"})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"q": " Garden "})
+        self.assertEqual(response.data["results"][0]["label"], "Gardening")
+
+        with override_settings(BLOG_AUTOCOMPLETE_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.client.get(self.url, {"q": "garden"})
+            with self.assertNumQueries(2):
+                self.client.get(self.url, {"q": "garden"})
+
+    @skipUnless(connection.vendor == "postgresql", "trigram matching needs PostgreSQL")
+    def test_tolerates_typos(self):
+        response = self.client.get(self.url, {"q": "sourdogh"})
+        self.assertEqual(response.data["results"][0]["id"], self.post.id)
+
+    def test_validates_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"q": "s"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "sour", "types": "comment"}).status_code, 400)
+
+
+def image_upload(name="cover.jpg", size=(1200, 600), mode="RGB", fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{fmt.lower()}")
+
+
+@override_settings(IMAGE_VARIANTS_IN_BACKGROUND=False, BLOG_LIST_CACHE_TIMEOUT=0)
+class ImageVariantsTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        user = User.objects.create_user(username="photographer", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=user,
+            first_name="Photo",
+            last_name="Grapher",
+            email="photo@example.com",
+            phone_number="+1000000050"
+        )
+        self.client.force_authenticate(user=user)
+
+    def open_variant(self, url):
+        name = url.split(settings.MEDIA_URL, 1)[1]
+        return Image.open(os.path.join(settings.MEDIA_ROOT, name))
+
+    def test_upload_generates_variants_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("blogpost-create"),
+                {"title": "Sunset", "body": "Body", "cover_photo": image_upload()},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+        # The response does not wait for the variants.
+        self.assertEqual(response.data["cover_photo_variants"], {})
+
+        post = self.client.get(reverse("blogpost-list")).data["results"][0]
+        variants = post["cover_photo_variants"]
+        self.assertEqual(set(variants), {"thumbnail", "thumbnail_webp", "medium", "medium_webp"})
+        self.assertTrue(variants["thumbnail"].startswith("http://testserver/media/blog_covers/variants/"))
+
+        with self.open_variant(variants["thumbnail"]) as image:
+            self.assertEqual((image.format, image.size), ("JPEG", (200, 100)))
+        with self.open_variant(variants["medium_webp"]) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (800, 400)))
+
+    def test_variants_are_generated_off_the_request_thread(self):
+        with override_settings(IMAGE_VARIANTS_IN_BACKGROUND=True), \
+                mock.patch.object(images.pool, "submit") as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("blogpost-create"),
+                {"title": "Sunset", "body": "Body", "cover_photo": image_upload()},
+                format="multipart",
+            )
+
+        submit.assert_called_once_with(BlogPost, response.data["id"], "cover_photo")
+        self.assertEqual(BlogPost.objects.get().cover_photo_variants, {})
+
+    def test_transparent_images_keep_their_alpha_channel(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = BlogPost.objects.create(
+                title="Logo", body="Body", author=self.profile,
+                cover_photo=image_upload("logo.png", (100, 50), "RGBA", "PNG"),
+            )
+
+        post.refresh_from_db()
+        # Small images are not scaled up.
+        with Image.open(os.path.join(settings.MEDIA_ROOT, post.cover_photo_variants["thumbnail"])) as image:
+            self.assertEqual((image.format, image.mode, image.size), ("PNG", "RGBA", (100, 50)))
+
+    def test_replaced_image_hides_and_removes_stale_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = BlogPost.objects.create(title="Sunset", body="Body", author=self.profile, cover_photo=image_upload())
+        post.refresh_from_db()
+        old_variants = post.cover_photo_variants
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.cover_photo = image_upload("second.jpg")
+            post.save()
+        self.assertEqual(JustBlogPostSerializer(post).data["cover_photo_variants"], {})
+
+        for callback in callbacks:
+            callback()
+        post.refresh_from_db()
+        self.assertEqual(post.cover_photo_variants["source"], post.cover_photo.name)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, old_variants["thumbnail"])))
+
+    def test_generate_image_variants_command_backfills(self):
+        post = BlogPost.objects.create(title="Old", body="Body", author=self.profile)
+        BlogPost.objects.filter(pk=post.pk).update(cover_photo=post.cover_photo.storage.save(
+            "blog_covers/old.jpg", image_upload()
+        ))
+        out = StringIO()
+
+        call_command("generate_image_variants", stdout=out)
+        call_command("generate_image_variants", stdout=out)
+
+        post.refresh_from_db()
+        self.assertEqual(post.cover_photo_variants["source"], "blog_covers/old.jpg")
+        self.assertIn("BlogPost.cover_photo: 1 generated, 0 failed", out.getvalue())
+        self.assertIn("BlogPost.cover_photo: 0 generated, 0 failed", out.getvalue())
+
+
+@override_settings(IMAGE_VARIANTS_IN_BACKGROUND=False)
+class UploadSessionTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        upload_settings = override_settings(
+            MEDIA_ROOT=os.path.join(directory.name, "media"),
+            BLOG_UPLOAD_DIR=Path(directory.name) / "uploads",
+        )
+        upload_settings.enable()
+        self.addCleanup(upload_settings.disable)
+
+        self.client = APIClient()
+        self.profile = self.create_profile("uploader", "+1000000070")
+        self.client.force_authenticate(user=self.profile.user)
+        self.content = image_upload().read()
+
+    def create_profile(self, username, phone_number):
+        user = User.objects.create_user(username=username, password="pass12345")
+        return UserProfile.objects.create(
+            user=user,
+            first_name="Up",
+            last_name="Loader",
+            email=f"{username}@example.com",
+            phone_number=phone_number,
+        )
+
+    def start(self, **data):
+        data = {"filename": "cover.jpg", "size": len(self.content), **data}
+        response = self.client.post(reverse("upload-create"), data, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def send(self, upload_id, offset, chunk, checksum=None):
+        headers = {"HTTP_UPLOAD_OFFSET": str(offset)}
+        if checksum is not None:
+            headers["HTTP_UPLOAD_CHECKSUM"] = f"sha256 {checksum}"
+        return self.client.patch(
+            reverse("upload-detail", args=[upload_id]),
+            chunk,
+            content_type="application/offset+octet-stream",
+            **headers,
+        )
+
+    def test_chunked_upload_becomes_the_cover_photo(self):
+        upload_id = self.start(checksum=hashlib.sha256(self.content).hexdigest())
+        half = len(self.content) // 2
+        first, second = self.content[:half], self.content[half:]
+
+        response = self.send(upload_id, 0, first, hashlib.sha256(first).hexdigest())
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (200, str(half)))
+        self.assertIsNone(response.data["completed_at"])
+
+        response = self.client.get(reverse("upload-detail", args=[upload_id]))
+        self.assertEqual(response.data["offset"], half)
+
+        response = self.send(upload_id, half, second)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data["completed_at"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("blogpost-create"),
+                {"title": "Chunked", "body": "Body", "cover_upload": upload_id},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        post = BlogPost.objects.get()
+        self.assertTrue(post.cover_photo.name.startswith("blog_covers/cover"))
+        with post.cover_photo.open("rb") as fh:
+            self.assertEqual(fh.read(), self.content)
+        self.assertEqual(post.cover_photo_variants["source"], post.cover_photo.name)
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(os.listdir(settings.BLOG_UPLOAD_DIR), [])
+
+    def test_rejects_a_non_integer_offset(self):
+        upload_id = self.start()
+        for offset in ("", "x", "²"):
+            response = self.send(upload_id, offset, self.content)
+            self.assertEqual(response.status_code, 400)
+
+    def test_resumes_from_the_recorded_offset(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:100])
+
+        # A retried chunk that already arrived is refused with the offset.
+        response = self.send(upload_id, 0, self.content[:100])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 100)
+
+        response = self.send(upload_id, 100, self.content[100:200], checksum="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(os.path.getsize(settings.BLOG_UPLOAD_DIR / upload_id), 100)
+
+        response = self.send(upload_id, 100, self.content[100:])
+        self.assertIsNotNone(response.data["completed_at"])
+
+    def test_chunks_are_received_without_locking_the_session(self):
+        upload_id = self.start()
+        owner_id = self.profile.id
+        test = self
+        depth = len(connection.atomic_blocks)
+
+        class RacingStream:
+            # While this chunk is still arriving, another one is accepted.
+            def __init__(self, data):
+                self.body = BytesIO(data)
+
+            def read(self, size):
+                if self.body.tell() == 0:
+                    test.assertEqual(len(connection.atomic_blocks), depth)
+                    uploads.write_chunk(upload_id, owner_id, BytesIO(test.content[:50]), 0)
+                return self.body.read(size)
+
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(upload_id, owner_id, RacingStream(self.content[:100]), 0)
+        self.assertEqual(Upload.objects.get(pk=upload_id).offset, 50)
+        self.assertEqual(os.path.getsize(settings.BLOG_UPLOAD_DIR / upload_id), 50)
+        self.assertEqual(os.listdir(settings.BLOG_UPLOAD_DIR), [upload_id])
+
+    def test_rejects_oversized_chunks(self):
+        upload_id = self.start(size=10)
+        self.assertEqual(self.send(upload_id, 0, self.content[:11]).status_code, 413)
+
+        with override_settings(BLOG_UPLOAD_MAX_CHUNK_SIZE=4):
+            self.assertEqual(self.send(upload_id, 0, self.content[:5]).status_code, 413)
+            self.assertEqual(self.send(upload_id, 0, self.content[:4]).status_code, 200)
+
+    def test_rejects_invalid_files(self):
+        upload_id = self.start(size=10)
+        response = self.send(upload_id, 0, b"not a jpeg")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Upload.objects.exists())
+
+        upload_id = self.start(checksum="0" * 64)
+        response = self.send(upload_id, 0, self.content)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Upload.objects.exists())
+
+        response = self.client.post(reverse("upload-create"), {"filename": "x.exe", "size": 0}, format="json")
+        self.assertEqual(set(response.data), {"filename", "size"})
+
+    def test_sessions_are_private_and_must_be_complete(self):
+        upload_id = self.start()
+        response = self.client.post(
+            reverse("blogpost-create"),
+            {"title": "Early", "body": "Body", "cover_upload": upload_id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cover_upload", response.data)
+
+        self.client.force_authenticate(user=self.create_profile("intruder", "+1000000071").user)
+        self.assertEqual(self.client.get(reverse("upload-detail", args=[upload_id])).status_code, 404)
+        self.assertEqual(self.send(upload_id, 0, self.content).status_code, 404)
+
+    def test_purge_uploads_removes_expired_sessions(self):
+        upload_id = self.start()
+        self.start()
+        Upload.objects.filter(pk=upload_id).update(created_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("purge_uploads", stdout=out)
+
+        self.assertIn("Purged 1 expired uploads", out.getvalue())
+        self.assertEqual(Upload.objects.count(), 1)
+        self.assertEqual(len(os.listdir(settings.BLOG_UPLOAD_DIR)), 1)
+
+
+@override_settings(BLOG_LIST_CACHE_TIMEOUT=0)
+class SparseFieldsTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        user = User.objects.create_user(username="sparse", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=user,
+            first_name="Sparse",
+            last_name="Fields",
+            email="sparse@example.com",
+            phone_number="+1000000080"
+        )
+        self.post = BlogPost.objects.create(title="Sparse", body="Body", author=self.profile)
+        self.comment = Comment.objects.create(blog_post=self.post, body="Comment", author=self.profile)
+
+    def test_fields_limit_post_output(self):
+        response = self.client.get(reverse("blogpost-list"), {"fields": "id,title,author,likes_count"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0], {
+            "id": self.post.id,
+            "title": "Sparse",
+            "author": "Sparse Fields",
+            "likes_count": 0,
+        })
+
+    def test_expand_embeds_the_full_relation(self):
+        response = self.client.get(reverse("blogpost-list"), {"fields": "id,author", "expand": "author"})
+        self.assertEqual(response.data["results"][0]["author"]["email"], "sparse@example.com")
+
+        response = self.client.get(reverse("comment-list"), {"fields": "id,blog_post,author"})
+        self.assertEqual(response.data["results"][0], {
+            "id": self.comment.id,
+            "blog_post": self.post.id,
+            "author": "Sparse Fields",
+        })
+
+        response = self.client.get(reverse("comment-list"), {"expand": "blog_post"})
+        result = response.data["results"][0]
+        self.assertEqual(result["blog_post"]["title"], "Sparse")
+        self.assertEqual(result["author"], "Sparse Fields")
+        self.assertEqual(result["body"], "Comment")
+
+    def test_default_output_is_unchanged(self):
+        request = APIRequestFactory().get("/")
+        self.post.refresh_from_db()
+        response = self.client.get(reverse("blogpost-list"))
+        expected = BlogPostGetSerializer(self.post, context={"request": request}).data
+        self.assertEqual(response.data["results"][0], expected)
+
+    def test_async_views_accept_the_same_parameters(self):
+        url_params = {"fields": "id,title,author"}
+        self.assertEqual(
+            json.loads(self.client.get(reverse("async-blogpost-list"), url_params).content),
+            self.client.get(reverse("blogpost-list"), url_params).json(),
+        )
+
+    def test_unknown_names_are_rejected(self):
+        response = self.client.get(reverse("blogpost-list"), {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data)
+
+        response = self.client.get(reverse("comment-list"), {"expand": "likes"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expand", response.data)
+
+        response = self.client.get(reverse("async-comment-list"), {"fields": ""})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BLOG_LIST_CACHE_TIMEOUT=0)
+class FastSerializerTest(TestCase):
+    """The fast path must render exactly the bytes the serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = []
+        for index in range(4):
+            user = User.objects.create_user(username=f"fast{index}", password="pass12345")
+            cls.profiles.append(UserProfile.objects.create(
+                user=user,
+                first_name=f"Fäst{index}",
+                last_name="Ünicode  ",
+                other_name="Other" if index % 2 else None,
+                email=f"fast{index}@example.com",
+                phone_number=f"+100000009{index}",
+                gender="Female" if index % 2 else None,
+                date_of_birth=timezone.now().date() if index % 2 else None,
+                address='Quotes " and \\ backslashes',
+                profile_photo="staff/photos/me.jpg" if index == 1 else None,
+                profile_photo_variants={"source": "staff/photos/me.jpg", "thumbnail": "staff/photos/variants/me_thumbnail.jpg"},
+            ))
+        for index in range(12):
+            post = BlogPost.objects.create(
+                title=f"Post {index} ✓",
+                body="Body\n" * index,
+                author=cls.profiles[index % 4],
+                cover_photo=f"blog_covers/{index}.jpg" if index % 3 == 0 else None,
+            )
+            if index % 3 == 0:
+                BlogPost.objects.filter(pk=post.pk).update(cover_photo_variants={
+                    "source": f"blog_covers/{index}.jpg",
+                    "medium_webp": f"blog_covers/variants/{index}_medium.webp",
+                })
+            post.likes.add(*cls.profiles[index % 4:])
+            for comment_index in range(index % 5):
+                Comment.objects.create(
+                    blog_post=post, body=f"Comment {comment_index}", author=cls.profiles[comment_index % 4]
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertSameResponse(self, url, params=None):
+        with override_settings(BLOG_FAST_SERIALIZERS=False):
+            expected = self.client.get(url, params)
+        actual = self.client.get(url, params)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual["ETag"], expected["ETag"])
+        return actual
+
+    def test_post_list_is_byte_identical(self):
+        url = reverse("blogpost-list")
+        response = self.assertSameResponse(url)
+        self.assertIn(b'"cover_photo_variants":{"medium_webp":"http://testserver/media/', response.content)
+
+        self.assertSameResponse(url, {"page": 2})
+        first = self.assertSameResponse(url, {"pagination": "cursor", "page_size": 5})
+        self.assertSameResponse(first.json()["next"])
+        self.assertSameResponse(url, {"fields": "id,title,author,likes_count,comments_count"})
+        self.assertSameResponse(url, {"fields": "id,likes,comments", "expand": "author"})
+
+    def test_comment_list_is_byte_identical(self):
+        url = reverse("comment-list")
+        self.assertSameResponse(url)
+        self.assertSameResponse(url, {"page": 2, "page_size": 7})
+        self.assertSameResponse(url, {"blog_post": BlogPost.objects.order_by("id").last().id})
+        self.assertSameResponse(url, {"pagination": "cursor"})
+        self.assertSameResponse(url, {"expand": "blog_post"})
+        self.assertSameResponse(url, {"fields": "id,blog_post,author"})
+
+    def test_preview_size_is_respected(self):
+        with override_settings(BLOG_COMMENTS_PREVIEW_SIZE=1):
+            response = self.assertSameResponse(reverse("blogpost-list"))
+        self.assertTrue(all(len(post["comments"]) <= 1 for post in response.json()["results"]))
+
+    def test_field_order_and_repeats_share_a_compiled_serializer(self):
+        cached_fast_serializer.cache_clear()
+        url = reverse("blogpost-list")
+        self.assertSameResponse(url, {"fields": "id,title"})
+        self.assertSameResponse(url, {"fields": "title,id,title,id"})
+        self.assertEqual(cached_fast_serializer.cache_info().currsize, 1)
+        self.assertIsNotNone(cached_fast_serializer.cache_info().maxsize)
+
+    def test_browsable_api_uses_the_serializers(self):
+        with mock.patch("blog.api.fast.FastSerializer.serialize") as serialize:
+            response = self.client.get(reverse("blogpost-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, 200)
+        serialize.assert_not_called()
+
+
+class PostExportTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.profiles = [
+            UserProfile.objects.create(
+                user=User.objects.create_user(username=f"exporter{index}", password="pass12345"),
+                first_name="Ex", last_name=f"Porter{index}",
+                email=f"exporter{index}@example.com", phone_number=f"+100000008{index}",
+            )
+            for index in range(2)
+        ]
+        self.posts = [
+            BlogPost.objects.create(title=f"Post {index} ✓", body="Body", author=self.profiles[index % 2])
+            for index in range(5)
+        ]
+        self.posts[0].likes.add(*self.profiles)
+        for index in range(3):
+            Comment.objects.create(blog_post=self.posts[1], body=f"Comment {index}", author=self.profiles[index % 2])
+        Comment.objects.create(blog_post=self.posts[4], body="Last", author=self.profiles[0])
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    def test_streams_posts_with_comments_and_likes(self):
+        self.client.force_authenticate(user=self.profiles[0].user)
+        response = self.client.get(reverse("blogpost-export"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        records = self.read(response)
+        self.assertEqual([record["id"] for record in records], [post.id for post in self.posts])
+        self.assertEqual(records[0]["likes_count"], 2)
+        self.assertEqual(records[0]["author"], "exporter0")
+        self.assertEqual(records[0]["title"], "Post 0 ✓")
+        self.assertEqual([comment["body"] for comment in records[1]["comments"]], ["Comment 0", "Comment 1", "Comment 2"])
+        self.assertEqual(records[1]["comments"][1]["author"], "exporter1")
+        self.assertEqual(records[1]["comments_count"], 3)
+        self.assertEqual(records[2]["comments"], [])
+
+    async def test_streams_without_buffering_under_asgi(self):
+        token = str(RefreshToken.for_user(self.profiles[0].user).access_token)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            response = await AsyncClient().get(reverse("blogpost-export"), headers={"Authorization": f"Bearer {token}"})
+            self.assertTrue(response.is_async)
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([warning for warning in caught if "StreamingHttpResponse" in str(warning.message)])
+        self.assertEqual(len(content.splitlines()), len(self.posts))
+
+    def test_resumes_after_an_id(self):
+        self.client.force_authenticate(user=self.profiles[0].user)
+        response = self.client.get(reverse("blogpost-export"), {"after": self.posts[2].id})
+        self.assertEqual([record["id"] for record in self.read(response)], [self.posts[3].id, self.posts[4].id])
+
+        for after in ("x", "²"):
+            response = self.client.get(reverse("blogpost-export"), {"after": after})
+            self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse("blogpost-export"), HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(response.status_code, 401)
+
+    def test_fetches_comments_once_per_chunk(self):
+        # One cursor over the posts and one comment query per chunk of 2.
+        with self.assertNumQueries(4):
+            chunks = list(export.export_chunks(chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(chunks[2][0]["comments"][0]["body"], "Last")
+
+    def test_command_writes_ndjson(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "posts.ndjson")
+            stderr = StringIO()
+            call_command("export_posts", "--output", path, "--chunk-size", "3", "--after", str(self.posts[0].id), stderr=stderr)
+            with open(path, encoding="utf-8") as fh:
+                records = [json.loads(line) for line in fh]
+        self.assertEqual([record["id"] for record in records], [post.id for post in self.posts[1:]])
+        self.assertIn("Exported 4 posts", stderr.getvalue())
+
+
+@override_settings(BLOG_LIST_CACHE_TIMEOUT=0)
+class RequestTimingMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        user = User.objects.create_user(username="timed", password="pass12345")
+        self.profile = UserProfile.objects.create(
+            user=user, first_name="Tim", last_name="Ed", email="timed@example.com", phone_number="+1000000090",
+        )
+        for index in range(3):
+            post = BlogPost.objects.create(title=f"Post {index}", body="Body", author=self.profile)
+            Comment.objects.create(blog_post=post, body="Comment", author=self.profile)
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_THRESHOLD=0)
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("blogpost-list"))
+        self.assertEqual(response.status_code, 200)
+        metrics = dict(
+            (part.split(";", 1)[0], part) for part in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(list(metrics), ["db", "view", "render", "total"])
+        self.assertIn(f'desc="{len(queries)} queries"', metrics["db"])
+        self.assertRegex(metrics["render"], r"^render;dur=\d+\.\d$")
+
+        response = self.client.get(reverse("comment-list"))
+        self.assertIn("Server-Timing", response)
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_THRESHOLD=0)
+    async def test_async_orm_queries_are_counted(self):
+        response = await AsyncClient().get(reverse("async-blogpost-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'desc="{POST_LIST_BUDGET} queries"', response["Server-Timing"])
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=False, SLOW_REQUEST_THRESHOLD=1e-9)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs("app.slow_requests", "WARNING") as logs:
+            response = self.client.get(reverse("blogpost-list"))
+        self.assertNotIn("Server-Timing", response)
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry["method"], entry["path"], entry["status"]), ("GET", reverse("blogpost-list"), 200))
+        self.assertGreater(entry["queries"], 0)
+        self.assertEqual(sum(statement["count"] for statement in entry["sql"]), entry["queries"])
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        response = self.client.get(reverse("blogpost-list"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertFalse(any(
+            "RequestTimingMiddleware" in repr(handler) for handler in self.client.handler._view_middleware
+        ))
+
+
+class GenerateDatasetCommandTest(TestCase):
+
+    def generate(self, prefix, **options):
+        options = {"users": 30, "posts": 40, "comments": 120, "likes": 300, "until": "2026-01-01T00:00:00Z", **options}
+        stdout = StringIO()
+        call_command("generate_dataset", prefix=prefix, batch_size=25, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def posts(self, prefix):
+        return list(
+            BlogPost.objects.filter(author__user__username__startswith=prefix)
+            .order_by("id")
+            .values_list("title", "created_at", "likes_count", "comments_count")
+        )
+
+    def test_generates_consistent_rows(self):
+        output = self.generate("a")
+        self.assertIn("Generated 30 users, 40 posts, 120 comments", output)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith="a").count(), 30)
+        self.assertEqual(Comment.objects.count(), 120)
+        self.assertTrue(self.client.login(username="a7", password="password123"))
+
+        counters = list(BlogPost.objects.order_by("id").values_list("likes_count", "comments_count"))
+        BlogPost.objects.refresh_counters()
+        self.assertEqual(list(BlogPost.objects.order_by("id").values_list("likes_count", "comments_count")), counters)
+        self.assertEqual(Like.objects.count(), sum(count for count, _ in counters))
+        # Posts are created in time order and comments follow their post.
+        created = [row[1] for row in self.posts("a")]
+        self.assertEqual(created, sorted(created))
+        self.assertFalse(Comment.objects.filter(created_at__lt=F("blog_post__created_at")).exists())
+
+    def test_same_seed_gives_the_same_dataset(self):
+        self.generate("a", seed=7)
+        self.generate("b", seed=7)
+        self.generate("c", seed=8)
+        self.assertEqual(self.posts("a"), self.posts("b"))
+        self.assertNotEqual(self.posts("a"), self.posts("c"))
+
+    def test_skew(self):
+        self.generate("flat", skew=0, likes=0, comments=2000)
+        self.generate("hot", skew=1.5, likes=0, comments=2000)
+        hottest = {
+            prefix: max(count for _, _, _, count in self.posts(prefix))
+            for prefix in ("flat", "hot")
+        }
+        self.assertGreater(hottest["hot"], 3 * hottest["flat"])
+
+    def test_refuses_an_existing_prefix(self):
+        self.generate("a", users=1, posts=0, comments=0, likes=0)
+        with self.assertRaises(CommandError):
+            self.generate("a")
+
+
+class MicrobenchmarkCommandTest(TestCase):
+
+    def run_command(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command("microbenchmark", "--sizes", "2,5", "--repeat", "1", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_writes_results_and_rolls_back_its_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            stdout, _ = self.run_command("--output", path)
+            with open(path) as fh:
+                results = json.load(fh)["results"]
+
+        self.assertEqual({(result["case"], result["size"]) for result in results}, {(name, size) for name in CASES for size in (2, 5)})
+        queries = {(result["case"], result["size"]): result["queries"] for result in results}
+        # Every case loads its rows in a fixed number of queries, whatever the size.
+        for name in CASES:
+            self.assertEqual(queries[(name, 2)], queries[(name, 5)], name)
+        # The serializer cases include the queries of the page they serialize.
+        self.assertEqual(queries[("BlogPostGetSerializer", 5)], queries[("BlogPostListAPIView.get_queryset", 5)])
+        self.assertGreater(queries[("BlogPostGetSerializer (fast path)", 5)], 0)
+        self.assertTrue(all(result["best_ms"] > 0 and result["peak_kib"] > 0 for result in results))
+        self.assertIn("UserProfileSerializer", stdout)
+        self.assertFalse(User.objects.filter(username__startswith="microbenchmark").exists())
+
+    def test_fails_on_regressions(self):
+        case = "BlogPostListAPIView.get_queryset"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            self.run_command("--case", case, "--output", path)
+            with open(path) as fh:
+                baseline = json.load(fh)
+
+            stdout, _ = self.run_command("--case", case, "--baseline", path, "--tolerance", "1000")
+            self.assertIn("No regressions", stdout)
+
+            for result in baseline["results"]:
+                result["queries"] -= 1
+            with open(path, "w") as fh:
+                json.dump(baseline, fh)
+            with self.assertRaisesMessage(CommandError, "2 regressions"):
+                self.run_command("--case", case, "--baseline", path, "--tolerance", "1000")
+
+    def test_refuses_a_database_with_posts(self):
+        user = User.objects.create_user(username="existing", password="existingpass123")
+        author = UserProfile.objects.create(
+            user=user, first_name="Existing", last_name="Author", email="existing@example.com", phone_number="+1555000990",
+        )
+        BlogPost.objects.create(title="Existing", body="Already here", author=author)
+        with self.assertRaisesMessage(CommandError, "run the microbenchmarks on an empty one"):
+            self.run_command()
@@ -0,0 +1,230 @@
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from blog.models import BlogPost, Comment
+from users.authentication import ClaimsUser, tokens_for_user
+from users.models import User, UserProfile
+
+# Hashing once keeps seeding fast; no test here logs in with these users.
+PASSWORD_HASH = make_password("budgetpass123")
+
+# count, page, author (joined), latest comments (one window query), likes;
+# also what the request instrumentation reports for the post list.
+POST_LIST_BUDGET = 4
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Every endpoint must issue the same number of queries whatever the page
+    size and however many likes and comments the listed rows carry.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.profiles = []
+
+    def create_profile(self, index):
+        user = User.objects.create(username=f"budget{index}", password=PASSWORD_HASH)
+        profile = UserProfile.objects.create(
+            user=user,
+            first_name=f"First{index}",
+            last_name=f"Last{index}",
+            email=f"budget{index}@example.com",
+            phone_number=f"+1555{index:07d}",
+        )
+        self.profiles.append(profile)
+        return profile
+
+    def seed(self, posts, comments_per_post=4, likes_per_post=3):
+        start = len(self.profiles)
+        for index in range(start, start + max(likes_per_post, 2)):
+            self.create_profile(index)
+
+        for index in range(posts):
+            author = self.profiles[index % len(self.profiles)]
+            post = BlogPost.objects.create(title=f"Post {index}", body="Body", author=author)
+            post.likes.add(*self.profiles[:likes_per_post])
+            for comment_index in range(comments_per_post):
+                Comment.objects.create(
+                    blog_post=post,
+                    body=f"Comment {comment_index}",
+                    author=self.profiles[(index + comment_index) % len(self.profiles)],
+                )
+
+    def authenticate(self, profile):
+        token = tokens_for_user(profile.user).access_token
+        # Budgets are for a warm process: the revocation check is a cache hit.
+        ClaimsUser(token).get_user()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def assertBudget(self, budget, method, url, data=None, status_code=200):
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status_code, getattr(response, "data", None))
+        return response
+
+
+class BlogPostListQueryBudgetTest(QueryBudgetTestCase):
+    budget = POST_LIST_BUDGET
+    cursor_budget = 3
+
+    def test_page_number_budget_does_not_grow_with_rows(self):
+        self.seed(posts=2)
+        self.assertBudget(self.budget, "get", reverse("blogpost-list"))
+
+        self.seed(posts=12, comments_per_post=8, likes_per_post=6)
+        response = self.assertBudget(self.budget, "get", reverse("blogpost-list"))
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_cursor_budget_does_not_grow_with_page_size(self):
+        self.seed(posts=12)
+        url = reverse("blogpost-list")
+
+        self.assertBudget(self.cursor_budget, "get", url, {"pagination": "cursor", "page_size": 2})
+        response = self.assertBudget(self.cursor_budget, "get", url, {"pagination": "cursor", "page_size": 12})
+        self.assertEqual(len(response.data["results"]), 12)
+
+    def test_authenticated_budget(self):
+        self.seed(posts=12)
+        self.authenticate(self.profiles[0])
+
+        # the user and profile come from the token claims
+        self.assertBudget(self.budget, "get", reverse("blogpost-list"))
+
+    def test_sparse_fields_skip_unused_prefetches(self):
+        self.seed(posts=12, comments_per_post=8, likes_per_post=6)
+        url = reverse("blogpost-list")
+
+        # count, page with author joined
+        fields = "id,title,author,likes_count,comments_count"
+        self.assertBudget(2, "get", url, {"fields": fields})
+        # count, page
+        self.assertBudget(2, "get", url, {"fields": "id,title"})
+        # count, page, likes
+        self.assertBudget(3, "get", url, {"fields": "id,likes", "expand": "author"})
+
+
+class CommentListQueryBudgetTest(QueryBudgetTestCase):
+    # count, page with author and post author joined, post likes
+    budget = 3
+    cursor_budget = 2
+
+    def test_page_number_budget_does_not_grow_with_rows(self):
+        self.seed(posts=1, comments_per_post=2)
+        self.assertBudget(self.budget, "get", reverse("comment-list"))
+
+        self.seed(posts=6, comments_per_post=4, likes_per_post=6)
+        response = self.assertBudget(self.budget, "get", reverse("comment-list"))
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_cursor_budget_does_not_grow_with_page_size(self):
+        self.seed(posts=6)
+        url = reverse("comment-list")
+
+        self.assertBudget(self.cursor_budget, "get", url, {"pagination": "cursor", "page_size": 2})
+        response = self.assertBudget(self.cursor_budget, "get", url, {"pagination": "cursor", "page_size": 20})
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_filtered_by_post_budget(self):
+        self.seed(posts=3, comments_per_post=12)
+        post = BlogPost.objects.first()
+
+        self.assertBudget(self.budget, "get", reverse("comment-list"), {"blog_post": post.id})
+
+    def test_compact_post_is_not_joined(self):
+        self.seed(posts=6, comments_per_post=4, likes_per_post=6)
+
+        # count, page with author joined
+        self.assertBudget(2, "get", reverse("comment-list"), {"expand": "author"})
+        self.assertBudget(2, "get", reverse("async-comment-list"), {"fields": "id,body,blog_post"})
+
+
+class BlogWriteQueryBudgetTest(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.seed(posts=2, likes_per_post=2)
+        self.profile = self.create_profile(99)
+        self.authenticate(self.profile)
+        self.post = BlogPost.objects.first()
+
+    def test_like_toggle_budget(self):
+        url = reverse("blogpost-like", args=[self.post.id])
+
+        # delete + insert + counter (inside a savepoint here)
+        self.assertBudget(5, "post", url)
+        # delete + counter
+        self.assertBudget(4, "post", url)
+
+    def test_idempotent_like_and_unlike_budget(self):
+        url = reverse("blogpost-like", args=[self.post.id])
+
+        # insert + counter
+        self.assertBudget(4, "put", url)
+        # insert + counter read
+        self.assertBudget(4, "put", url)
+        # delete + counter
+        self.assertBudget(4, "delete", url)
+
+    def test_blogpost_create_budget(self):
+        # profile, insert, response likes and comments
+        self.assertBudget(4, "post", reverse("blogpost-create"), {"title": "New", "body": "Body"}, 201)
+
+    def test_comment_create_budget(self):
+        # post validation, profile, then insert + counter (inside a savepoint here)
+        self.assertBudget(
+            6, "post", reverse("comment-create"), {"blog_post": self.post.id, "body": "Hi"}, 201,
+        )
+
+
+class BlogPostCommentListQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_budget_does_not_grow_with_page_size(self):
+        self.seed(posts=2, comments_per_post=25)
+        url = reverse("blogpost-comments", args=[BlogPost.objects.first().id])
+
+        # page with authors joined
+        self.assertBudget(1, "get", url, {"page_size": 2})
+        response = self.assertBudget(1, "get", url, {"page_size": 25})
+        self.assertEqual(len(response.data["results"]), 25)
+
+
+class AsyncListQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_same_budgets_as_sync_views(self):
+        self.seed(posts=12, comments_per_post=4, likes_per_post=3)
+
+        self.assertBudget(BlogPostListQueryBudgetTest.budget, "get", reverse("async-blogpost-list"))
+        self.assertBudget(
+            BlogPostListQueryBudgetTest.cursor_budget, "get", reverse("async-blogpost-list"), {"pagination": "cursor"},
+        )
+        self.assertBudget(CommentListQueryBudgetTest.budget, "get", reverse("async-comment-list"))
+        self.assertBudget(
+            CommentListQueryBudgetTest.cursor_budget, "get", reverse("async-comment-list"), {"pagination": "cursor"},
+        )
+
+
+class BlogPostSearchQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_budget_does_not_grow_with_page_size(self):
+        self.seed(posts=12)
+
+        # page with authors joined
+        self.assertBudget(1, "get", reverse("blogpost-search"), {"q": "post", "page_size": 2})
+        response = self.assertBudget(1, "get", reverse("blogpost-search"), {"q": "post", "page_size": 12})
+        self.assertEqual(len(response.data["results"]), 12)
+
+
+class AutocompleteQueryBudgetTest(QueryBudgetTestCase):
+
+    def test_one_query_per_type_then_cached(self):
+        cache.clear()
+        self.seed(posts=12, comments_per_post=0, likes_per_post=0)
+
+        url = reverse("autocomplete")
+        self.assertBudget(1, "get", url, {"q": "post", "types": "post"})
+        self.assertBudget(2, "get", url, {"q": "first"})
+        self.assertBudget(0, "get", url, {"q": "first"})
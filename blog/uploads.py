@@ -0,0 +1,180 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Upload
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f"Expected Upload-Offset {offset}")
+        self.offset = offset
+
+
+class ChunkTooLarge(UploadError):
+    pass
+
+
+class ChecksumMismatch(UploadError):
+    pass
+
+
+class InvalidImage(UploadError):
+    pass
+
+
+class UploadedFile(File):
+    # FileSystemStorage moves files that have a temporary_file_path()
+    # instead of copying them.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def active_sessions(owner_id):
+    cutoff = timezone.now() - timedelta(seconds=settings.BLOG_UPLOAD_EXPIRY)
+    return Upload.objects.filter(owner_id=owner_id, created_at__gte=cutoff)
+
+
+def expired_sessions():
+    cutoff = timezone.now() - timedelta(seconds=settings.BLOG_UPLOAD_EXPIRY)
+    return Upload.objects.filter(created_at__lt=cutoff)
+
+
+def start(owner_id, filename, size, checksum=""):
+    upload = Upload.objects.create(owner_id=owner_id, filename=filename, size=size, checksum=checksum)
+    os.makedirs(settings.BLOG_UPLOAD_DIR, exist_ok=True)
+    open(upload.path, "wb").close()
+    return upload
+
+
+def write_chunk(upload_id, owner_id, stream, offset, chunk_checksum=None):
+    """
+    Append the chunk read from `stream` at `offset`, which must be the
+    number of bytes received so far; a client that lost track asks for the
+    session and resumes from its `offset`. The chunk is streamed to a part
+    file in BLOCK_SIZE pieces and only appended once it is complete and, if
+    given, matches `chunk_checksum` (SHA-256 hex). The session row is locked
+    only for the append, never while the client is still sending. The last
+    chunk completes the upload. Returns the updated Upload.
+    """
+    upload = active_sessions(owner_id).get(pk=upload_id)
+    if upload.is_complete or offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+
+    limit = min(upload.size - upload.offset, settings.BLOG_UPLOAD_MAX_CHUNK_SIZE)
+    part = tempfile.NamedTemporaryFile(dir=settings.BLOG_UPLOAD_DIR, prefix=f"{upload.pk}.", suffix=".part", delete=False)
+    try:
+        with part:
+            written = receive(stream, part, limit, chunk_checksum)
+
+        with transaction.atomic():
+            # Serializes concurrent chunks of the same session; the loser
+            # of a race finds the offset moved.
+            upload = active_sessions(owner_id).select_for_update().get(pk=upload_id)
+            if upload.is_complete or offset != upload.offset:
+                raise OffsetMismatch(upload.offset)
+            append(upload.path, upload.offset, part.name)
+            upload.offset += written
+            upload.save(update_fields=["offset", "updated_at"])
+    finally:
+        remove_file(part.name)
+
+    # Checked in a transaction of its own, so that a bad file can be
+    # discarded. A retried empty chunk at the end finishes a session whose
+    # check was interrupted.
+    if upload.offset == upload.size:
+        complete(upload)
+    return upload
+
+
+def receive(stream, fh, limit, chunk_checksum):
+    """Copy `stream` to `fh`, at most `limit` bytes; returns how many were written."""
+    digest = hashlib.sha256()
+    written = 0
+    while stream is not None:
+        block = stream.read(BLOCK_SIZE)
+        if not block:
+            break
+        written += len(block)
+        if written > limit:
+            raise ChunkTooLarge(f"A chunk may hold at most {limit} bytes here")
+        digest.update(block)
+        fh.write(block)
+    if chunk_checksum is not None and digest.hexdigest() != chunk_checksum.lower():
+        raise ChecksumMismatch("Chunk checksum does not match")
+    return written
+
+
+def append(path, offset, part_path):
+    with open(path, "r+b") as fh, open(part_path, "rb") as part:
+        fh.seek(offset)
+        try:
+            shutil.copyfileobj(part, fh, BLOCK_SIZE)
+        except BaseException:
+            # Drop the partial copy; the client resends the chunk.
+            fh.truncate(offset)
+            raise
+        fh.truncate()
+
+
+def complete(upload):
+    error = verify(upload)
+    if error is not None:
+        discard(upload)
+        raise error
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=["completed_at", "updated_at"])
+
+
+def verify(upload):
+    if upload.checksum and file_checksum(upload.path) != upload.checksum.lower():
+        return ChecksumMismatch("File checksum does not match; start a new upload")
+    try:
+        with Image.open(upload.path) as image:
+            image.verify()
+    except Exception:
+        return InvalidImage(
+            "Upload a valid image. The file you uploaded was either not an image or a corrupted image."
+        )
+    return None
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard(upload):
+    # Deleted on commit, so that a rollback never leaves a row without its file.
+    path = upload.path
+    transaction.on_commit(lambda: remove_file(path))
+    Upload.objects.filter(pk=upload.pk).delete()
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def as_file(upload):
+    """The completed upload as a File to assign to an ImageField."""
+    return UploadedFile(open(upload.path, "rb"), name=upload.filename)
@@ -1,10 +1,49 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 from users.models import User, UserProfile
-from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import tokens_for_user
+from users.images import variants_field_name
+
+
+@extend_schema_field({"type": "object", "additionalProperties": {"type": "string", "format": "uri"}})
+class ImageVariantsField(serializers.Field):
+    """
+    URLs of the resized copies of `image_field`, keyed by variant name
+    (`thumbnail`, `thumbnail_webp`, ...). Empty until they are generated.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        variants = getattr(instance, variants_field_name(self.image_field))
+        return self.urls(image.name, variants, image.storage, self.context.get("request"))
+
+    @staticmethod
+    def urls(name, variants, storage, request=None):
+        variants = variants or {}
+        # Variants of a replaced image are stale until the new ones are ready.
+        if not name or variants.get("source") != name:
+            return {}
+
+        urls = {}
+        for variant, path in variants.items():
+            if variant == "source":
+                continue
+            url = storage.url(path)
+            urls[variant] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_photo_variants = ImageVariantsField("profile_photo")
+
     class Meta:
         model = UserProfile
         exclude = ("id", "user", "created_at", "updated_at")
@@ -30,10 +69,16 @@ class UserSignupSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         profile_data = validated_data.pop("profile")
 
-        user = User.objects.create_user(
-            username=validated_data["username"],
-            password=validated_data["password"],
-        )
+        # SignupView hashes the password off the request thread and passes
+        # the result in as `password_hash`.
+        password_hash = validated_data.get("password_hash")
+        if password_hash is not None:
+            user = User.objects.create(username=validated_data["username"], password=password_hash)
+        else:
+            user = User.objects.create_user(
+                username=validated_data["username"],
+                password=validated_data["password"],
+            )
 
         UserProfile.objects.create(user=user, **profile_data)
 
@@ -41,10 +86,24 @@ class UserSignupSerializer(serializers.ModelSerializer):
 
 
 
-class LoginSerializer(serializers.Serializer):
+def login_payload(user):
+    refresh = tokens_for_user(user)
+
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }
+
+
+class LoginCredentialsSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
+
+class LoginSerializer(LoginCredentialsSerializer):
+
     def validate(self, attrs):
         user = authenticate(
             username=attrs.get("username"),
@@ -57,14 +116,7 @@ class LoginSerializer(serializers.Serializer):
         if not user.is_active:
             raise serializers.ValidationError("Account disabled")
 
-        refresh = RefreshToken.for_user(user)
-
-        return {
-            "user_id": user.id,
-            "username": user.username,
-            "access": str(refresh.access_token),
-            "refresh": str(refresh),
-        }
+        return login_payload(user)
 
 
 
@@ -5,4 +5,5 @@ urlpatterns = [
     path("register_user/", views.SignupView.as_view(), name="register user"),
     path("login_user/", views.LoginView.as_view(), name="login user"),
     path("logout_user/", views.LogoutView.as_view(), name="logout user"),
+    path("hashing_stats/", views.HashingStatsView.as_view(), name="hashing stats"),
 ]
\ No newline at end of file
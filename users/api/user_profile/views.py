@@ -1,26 +1,84 @@
+import json
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.signals import user_login_failed
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from users import hashing
+from users.authentication import recent_users, tokens_for_user
+from users.hashing import PoolBusy
+from users.models import User
 from .serializers import (
     UserSignupSerializer,
-    LoginSerializer
+    LoginCredentialsSerializer,
+    login_payload,
 )
 
 
-class SignupView(APIView):
-    permission_classes = [permissions.AllowAny]
-    serializer_class = UserSignupSerializer
+def parse_body(request):
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
 
-    def post(self, request):
-        serializer = self.serializer_class(data=request.data)
-        serializer.is_valid(raise_exception=True)
 
-        user = serializer.save()
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAuthView(ABC, View):
+    """
+    Base for the auth endpoints that hash passwords. They are plain async
+    Django views rather than DRF views so that, under ASGI, waiting for the
+    hashing pool (users.hashing) does not hold a worker thread. The schema
+    documents them through users.schema.AUTH_SCHEMA_VIEWS.
+    """
 
-        refresh = RefreshToken.for_user(user)
+    http_method_names = ["post", "options"]
 
-        return Response(
+    async def post(self, request):
+        try:
+            data = parse_body(request)
+        except ValueError:
+            return JsonResponse({"detail": "JSON parse error"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return await self.handle(request, data)
+        except PoolBusy:
+            return JsonResponse(
+                {
+                    "success": False,
+                    "message": "Too many authentication requests, please retry shortly",
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
+    @abstractmethod
+    async def handle(self, request, data):
+        """Answer a POST whose body parsed to `data`."""
+
+
+class SignupView(AsyncAuthView):
+
+    async def handle(self, request, data):
+        serializer = UserSignupSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        password_hash = await hashing.amake_password(serializer.validated_data["password"])
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+
+        refresh = tokens_for_user(user)
+
+        return JsonResponse(
             {
                 "success": True,
                 "message": "User registered successfully",
@@ -36,25 +94,54 @@ class SignupView(APIView):
 
 
 
-class LoginView(APIView):
-    permission_classes = [permissions.AllowAny]
-    serializer_class = LoginSerializer
+class LoginView(AsyncAuthView):
 
-    def post(self, request):
-        serializer = self.serializer_class(data=request.data)
-        serializer.is_valid(raise_exception=True)
+    async def handle(self, request, data):
+        serializer = LoginCredentialsSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        username = serializer.validated_data["username"]
+        password = serializer.validated_data["password"]
 
-        return Response(
+        try:
+            user = await User.objects.select_related("user_profile").aget(username=username)
+        except User.DoesNotExist:
+            # Hash anyway, like ModelBackend, so that response times do not
+            # reveal which usernames exist.
+            await hashing.amake_password(password)
+            user = None
+
+        if user is None or not await hashing.acheck_user_password(user, password) or not user.is_active:
+            # As django.contrib.auth.authenticate() does for failed logins.
+            await user_login_failed.asend(
+                sender="django.contrib.auth", credentials={"username": username}, request=request,
+            )
+            return JsonResponse(
+                {"non_field_errors": ["Invalid credentials"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return JsonResponse(
             {
                 "success": True,
                 "message": "Login successful",
-                "data": serializer.validated_data,
+                "data": login_payload(user),
             },
             status=status.HTTP_200_OK,
         )
 
 
 
+class HashingStatsView(APIView):
+    """The counters of this process's password hashing pool (users.hashing)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(hashing.pool.stats())
+
+
 class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -62,20 +149,34 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data["refresh"]
             token = RefreshToken(refresh_token)
-            token.blacklist()
-
-            return Response(
-                {
-                    "success": True,
-                    "message": "Logout successful",
-                },
-                status=status.HTTP_200_OK,
-            )
         except Exception:
-            return Response(
-                {
-                    "success": False,
-                    "message": "Invalid refresh token",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.invalid_refresh_token()
+        if str(token.get(api_settings.USER_ID_CLAIM)) != str(request.user.id):
+            return self.invalid_refresh_token()
+
+        # Bumping token_version revokes every token issued to the user, so
+        # issued tokens need not be recorded. A refresh token from before
+        # the last bump is already revoked.
+        users = User.objects.filter(pk=request.user.id)
+        if "token_version" in token:
+            users = users.filter(token_version=token["token_version"])
+        if not users.update(token_version=F("token_version") + 1):
+            return self.invalid_refresh_token()
+        recent_users.discard((token[api_settings.USER_ID_CLAIM], token.get("token_version")))
+
+        return Response(
+            {
+                "success": True,
+                "message": "Logout successful",
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def invalid_refresh_token(self):
+        return Response(
+            {
+                "success": False,
+                "message": "Invalid refresh token",
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+
+CLAIMS = ("profile_id", "is_active", "token_version")
+
+
+def tokens_for_user(user):
+    """
+    Issue a refresh token (and, through it, access tokens) that carries the
+    claims ClaimsJWTAuthentication needs to authenticate without a query.
+    """
+    try:
+        profile_id = user.user_profile.id
+    except ObjectDoesNotExist:
+        profile_id = None
+
+    refresh = RefreshToken.for_user(user)
+    refresh["profile_id"] = profile_id
+    refresh["is_active"] = user.is_active
+    refresh["token_version"] = user.token_version
+    return refresh
+
+
+class RecentUserCache:
+    """Small thread-safe LRU of recently loaded users, with a TTL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._users.get(key)
+            if item is None:
+                return None
+            user, expires_at = item
+            if expires_at < time.monotonic():
+                del self._users[key]
+                return None
+            self._users.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self._lock:
+            self._users[key] = (user, time.monotonic() + settings.AUTH_USER_CACHE_TTL)
+            self._users.move_to_end(key)
+            while len(self._users) > settings.AUTH_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._users.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+recent_users = RecentUserCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user materialized from the signed claims of an access token.
+    `get_user()` returns the real model through an in-process LRU and
+    rejects users that have been deactivated or whose `token_version` has
+    since been bumped; ClaimsJWTAuthentication calls it on every request.
+    `is_staff` and `is_superuser` are not claims, so they are read from that
+    cached model and a change of role needs no new token.
+    """
+
+    @cached_property
+    def is_active(self):
+        return self.token.get("is_active", False)
+
+    @cached_property
+    def profile_id(self):
+        return self.token.get("profile_id")
+
+    @cached_property
+    def token_version(self):
+        return self.token.get("token_version")
+
+    @cached_property
+    def is_staff(self):
+        return self.get_user().is_staff
+
+    @cached_property
+    def is_superuser(self):
+        return self.get_user().is_superuser
+
+    def get_user(self):
+        key = (self.id, self.token_version)
+        user = recent_users.get(key)
+        if user is not None:
+            return user
+
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: self.id})
+        except User.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if user.token_version != self.token_version:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        recent_users.set(key, user)
+        return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the claims embedded by
+    `tokens_for_user` instead of loading the user row on every request.
+    Revocation is still enforced: the row is checked through the
+    `recent_users` LRU, so it costs one query per user and process every
+    AUTH_USER_CACHE_TTL seconds, and deactivating a user or bumping their
+    `token_version` takes effect within that time. Tokens issued before
+    those claims existed fall back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token or not all(
+            claim in validated_token for claim in CLAIMS
+        ):
+            return super().get_user(validated_token)
+
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        user = ClaimsUser(validated_token)
+        user.get_user()
+        return user
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+
+# Models whose timestamps are taken as set, in the current context only.
+_explicit_models = ContextVar("explicit_timestamps", default=frozenset())
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Within the block, TimestampFields of `models` keep the values set on
+    instances instead of stamping now(): bulk_create() would otherwise
+    overwrite imported created_at/updated_at values. Other threads and
+    requests are unaffected.
+    """
+    token = _explicit_models.set(_explicit_models.get() | set(models))
+    try:
+        yield
+    finally:
+        _explicit_models.reset(token)
+
+
+class TimestampField(models.DateTimeField):
+    """An auto_now/auto_now_add DateTimeField that explicit_timestamps() can suspend."""
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if value is not None and self.model in _explicit_models.get():
+            return value
+        return super().pre_save(model_instance, add)
+
+    def deconstruct(self):
+        # Stored exactly like a DateTimeField, so migrations need not know.
+        name, _, args, kwargs = super().deconstruct()
+        return name, "django.db.models.DateTimeField", args, kwargs
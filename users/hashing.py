@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(Exception):
+    """Raised when too many hashing jobs are already waiting."""
+
+
+class HashingPool:
+    """
+    A small, bounded thread pool for password hashing.
+
+    PBKDF2 (hashlib) releases the GIL while it runs, so a few threads keep
+    the CPUs busy without blocking the event loop or the request threads.
+    At most AUTH_HASHING_MAX_PENDING jobs may be queued or running at once;
+    beyond that `submit()` fails fast with PoolBusy and the auth views
+    answer 503, so a login storm slows down logins but nothing else.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self._metrics = Counter()
+        self._seconds = Counter()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.AUTH_HASHING_WORKERS,
+                        thread_name_prefix="password-hashing",
+                    )
+        return self._executor
+
+    def submit(self, fn, *args):
+        """Run `fn(*args)` on the pool; returns a concurrent.futures.Future."""
+        with self._lock:
+            if self._pending >= settings.AUTH_HASHING_MAX_PENDING:
+                self._metrics["rejected"] += 1
+                logger.warning("Password hashing pool is full (%d pending)", self._pending)
+                raise PoolBusy
+            self._pending += 1
+            self._metrics["submitted"] += 1
+            self._metrics["peak_pending"] = max(self._metrics["peak_pending"], self._pending)
+
+        queued_at = time.monotonic()
+
+        def run():
+            started_at = time.monotonic()
+            try:
+                result = fn(*args)
+            except BaseException:
+                outcome = "failed"
+                raise
+            else:
+                outcome = "completed"
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self._pending -= 1
+                    self._metrics[outcome] += 1
+                    self._seconds["waiting"] += started_at - queued_at
+                    self._seconds["hashing"] += finished_at - started_at
+            return result
+
+        try:
+            return self._get_executor().submit(run)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": settings.AUTH_HASHING_WORKERS,
+                "max_pending": settings.AUTH_HASHING_MAX_PENDING,
+                "pending": self._pending,
+                "peak_pending": self._metrics["peak_pending"],
+                "submitted": self._metrics["submitted"],
+                "completed": self._metrics["completed"],
+                "failed": self._metrics["failed"],
+                "rejected": self._metrics["rejected"],
+                "waiting_seconds": self._seconds["waiting"],
+                "hashing_seconds": self._seconds["hashing"],
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._metrics.clear()
+            self._seconds.clear()
+
+
+pool = HashingPool()
+
+
+async def amake_password(password):
+    return await pool.run(hashers.make_password, password)
+
+
+async def acheck_user_password(user, password):
+    """
+    `user.check_password(password)` with the hashing done on the pool. A
+    hash in an outdated format is upgraded and saved as check_password()
+    would, but the save runs on the ORM's thread, not the pool's.
+    """
+    outdated = []
+    valid = await pool.run(hashers.check_password, password, user.password, outdated.append)
+    if valid and outdated:
+        user.password = await amake_password(password)
+        await user.asave(update_fields=["password"])
+    return valid
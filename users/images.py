@@ -0,0 +1,143 @@
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Sent with `sender=model, pk=...` once new variants have been recorded.
+variants_ready = Signal()
+
+
+class VariantPool:
+    """
+    Generates image variants on a few background threads, so an upload
+    costs the request no more than storing the original. Resizing runs in
+    Pillow's C code, which releases the GIL for the heavy parts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.IMAGE_VARIANT_WORKERS,
+                        thread_name_prefix="image-variants",
+                    )
+        return self._executor
+
+    def submit(self, model, pk, field_name):
+        return self._get_executor().submit(self._run, model, pk, field_name)
+
+    def _run(self, model, pk, field_name):
+        close_old_connections()
+        try:
+            generate_variants(model, pk, field_name)
+        except Exception:
+            logger.exception("Generating %s variants of %s %s failed", field_name, model.__name__, pk)
+        finally:
+            close_old_connections()
+
+
+pool = VariantPool()
+
+
+def variants_field_name(field_name):
+    return f"{field_name}_variants"
+
+
+def needs_variants(instance, field_name):
+    image = getattr(instance, field_name)
+    variants = getattr(instance, variants_field_name(field_name)) or {}
+    return bool(image) and variants.get("source") != image.name
+
+
+def schedule_variants(instance, field_name):
+    """Generate the variants of `instance`'s image once the transaction commits."""
+    model, pk = type(instance), instance.pk
+
+    def start():
+        if settings.IMAGE_VARIANTS_IN_BACKGROUND:
+            pool.submit(model, pk, field_name)
+        else:
+            generate_variants(model, pk, field_name)
+
+    transaction.on_commit(start)
+
+
+def render_variants(fh):
+    """
+    Yield `(variant, size, extension, content)` twice for every
+    IMAGE_VARIANT_SIZES entry: as JPEG (PNG if the image has transparency)
+    and as WebP. Images are only ever scaled down, keeping their aspect ratio.
+    """
+    with Image.open(fh) as image:
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+        fallback, extension = ("PNG", "png") if transparent else ("JPEG", "jpg")
+        for size, dimensions in settings.IMAGE_VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail(dimensions, Image.Resampling.LANCZOS)
+            yield size, size, extension, encode(resized, fallback)
+            yield f"{size}_webp", size, "webp", encode(resized, "WEBP")
+
+
+def encode(image, fmt):
+    buffer = BytesIO()
+    options = {"optimize": True} if fmt == "PNG" else {"quality": settings.IMAGE_VARIANT_QUALITY}
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def variant_path(source, size, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "variants", f"{stem}_{size}.{extension}")
+
+
+def generate_variants(model, pk, field_name):
+    """
+    Write the variants of the image in `field_name` of row `pk` next to the
+    original and record their names in `<field_name>_variants`, together
+    with the `source` they were made from. Returns False when the row is
+    gone, has no image or got a new one meanwhile.
+    """
+    variants_field = variants_field_name(field_name)
+    manager = model._default_manager
+    row = manager.filter(pk=pk).values_list(field_name, variants_field).first()
+    if row is None or not row[0]:
+        return False
+    source, previous = row[0], row[1] or {}
+
+    storage = model._meta.get_field(field_name).storage
+    variants = {"source": source}
+    with storage.open(source) as fh:
+        for variant, size, extension, content in render_variants(fh):
+            variants[variant] = storage.save(variant_path(source, size, extension), ContentFile(content))
+
+    # Only record them if the image was not replaced in the meantime; the
+    # newer upload has its own job.
+    updated = manager.filter(pk=pk, **{field_name: source}).update(**{variants_field: variants})
+    if updated:
+        kept = set(variants.values())
+        obsolete = [name for variant, name in previous.items() if variant != "source" and name not in kept]
+    else:
+        obsolete = [name for variant, name in variants.items() if variant != "source"]
+    for name in obsolete:
+        storage.delete(name)
+
+    if updated:
+        variants_ready.send(sender=model, pk=pk)
+    return bool(updated)
@@ -0,0 +1,63 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from users.models import UserProfile
+
+
+def get_profile(request):
+    """
+    Return the profile of the authenticated user, loading it (with its user
+    joined in) at most once per request. Raises UserProfile.DoesNotExist for
+    anonymous users and users without a profile.
+    """
+    request = getattr(request, "_request", request)
+    if not hasattr(request, "_cached_profile"):
+        user = request.user
+        if not user.is_authenticated:
+            raise UserProfile.DoesNotExist("Anonymous users have no profile.")
+        queryset = UserProfile.objects.select_related("user")
+        # Tokens issued by users.authentication carry the profile id.
+        profile_id = getattr(user, "profile_id", None)
+        if profile_id is not None:
+            request._cached_profile = queryset.get(pk=profile_id)
+        else:
+            request._cached_profile = queryset.get(user_id=user.pk)
+    return request._cached_profile
+
+
+def get_profile_id(request):
+    """Like get_profile(), but answered from the token claims when possible."""
+    profile_id = getattr(request.user, "profile_id", None)
+    if profile_id is not None:
+        return profile_id
+    return get_profile(request).pk
+
+
+class RequestProfileMiddleware:
+    """
+    Attach a lazy `request.profile`. Nothing is queried until it is first
+    used, and DRF views see the user their authentication classes resolved.
+    Async-capable, so that under ASGI async views are not funnelled through
+    the single thread that runs sync middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.attach_profile(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.attach_profile(request)
+        return await self.get_response(request)
+
+    def attach_profile(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(
+        fields=["first_name"], name="profile_first_name_trgm_idx", opclasses=["gin_trgm_ops"]
+    ),
+    django.contrib.postgres.indexes.GinIndex(
+        fields=["last_name"], name="profile_last_name_trgm_idx", opclasses=["gin_trgm_ops"]
+    ),
+]
+
+
+def add_indexes(apps, schema_editor):
+    # Trigram indexes only exist on PostgreSQL; other backends fall back to
+    # plain substring matching.
+    if schema_editor.connection.vendor == "postgresql":
+        model = apps.get_model("users", "UserProfile")
+        for index in INDEXES:
+            schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        model = apps.get_model("users", "UserProfile")
+        for index in INDEXES:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_token_version"),
+    ]
+
+    operations = [
+        # A no-op on other backends.
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="userprofile", index=index) for index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_indexes, remove_indexes),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import AbstractUser, UserManager
 import uuid
 
+from users.fields import TimestampField
+
 # Create your models here.
 class CustomUserManager(UserManager):
     def create_user(self, username, password=None, **extra_fields):
@@ -47,6 +50,9 @@ class User(AbstractUser):
         max_length=255,
         unique=True
     )
+    # Embedded in issued JWTs; bump it to revoke every outstanding token
+    # (effective within AUTH_USER_CACHE_TTL seconds, see users.authentication)
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = []
@@ -84,9 +90,19 @@ class UserProfile(models.Model):
     profile_photo = models.ImageField(
         upload_to="staff/photos/", blank=True, null=True
     )
-
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Resized copies of profile_photo, written by users.images.
+    profile_photo_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    created_at = TimestampField(auto_now_add=True)
+    updated_at = TimestampField(auto_now=True)
+
+    class Meta:
+        # Trigram indexes for author autocomplete, created on PostgreSQL only
+        # (migration 0003).
+        indexes = [
+            GinIndex(fields=["first_name"], name="profile_first_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["last_name"], name="profile_last_name_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from users.images import needs_variants, schedule_variants
+from users.models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+def generate_profile_photo_variants(sender, instance, **kwargs):
+    if needs_variants(instance, "profile_photo"):
+        schedule_variants(instance, "profile_photo")
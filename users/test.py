@@ -2,8 +2,49 @@ from django.test import TestCase
 from django.db import IntegrityError
 from users.models import User, UserProfile
 from django.db import transaction
-from users.api.user_profile.serializers import UserSignupSerializer, LoginSerializer
+from users.api.user_profile.serializers import UserSignupSerializer, LoginSerializer, UserProfileSerializer
 from rest_framework.exceptions import ValidationError
+from django.db.models import F
+from django.test import RequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from users import hashing
+from users.hashing import HashingPool, PoolBusy
+from datetime import timedelta
+from django.utils import timezone
+from users.fields import explicit_timestamps
+from users.middleware import RequestProfileMiddleware, get_profile, get_profile_id
+import asyncio
+import json
+import time
+from django.http import JsonResponse
+from django.test import AsyncClient
+from django.urls import path
+from users.authentication import (
+    ClaimsJWTAuthentication, ClaimsUser, RecentUserCache, recent_users, tokens_for_user,
+)
+
+async def slow_view(request):
+    await asyncio.sleep(SLOW_VIEW_SECONDS)
+    return JsonResponse({"ok": True})
+
+
+SLOW_VIEW_SECONDS = 0.5
+# Used by the middleware concurrency tests (ROOT_URLCONF="users.test").
+urlpatterns = [path("slow/", slow_view)]
+
 
 class UserModelTest(TestCase):
     
@@ -33,6 +74,39 @@ class UserModelTest(TestCase):
             User.objects.create_superuser(username="admin3", password="adminpass123", is_superuser=False)
 
 
+class ExplicitTimestampsTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="stamped", password="stampedpass123")
+        self.past = timezone.now() - timedelta(days=400)
+
+    def profile(self):
+        return UserProfile(
+            user=self.user, first_name="Old", last_name="Stamp", email="old@example.com",
+            phone_number="+1555000900", created_at=self.past, updated_at=self.past,
+        )
+
+    def test_keeps_explicit_values_inside_the_block(self):
+        with explicit_timestamps(UserProfile):
+            profile = UserProfile.objects.bulk_create([self.profile()])[0]
+        profile.refresh_from_db()
+        self.assertEqual((profile.created_at, profile.updated_at), (self.past, self.past))
+
+        profile.save()
+        self.assertGreater(profile.updated_at, self.past)
+
+    def test_other_threads_keep_stamping(self):
+        field = UserProfile._meta.get_field("updated_at")
+        stamped = []
+        with explicit_timestamps(UserProfile):
+            self.assertEqual(field.pre_save(self.profile(), add=False), self.past)
+            thread = threading.Thread(target=lambda: stamped.append(field.pre_save(self.profile(), add=False)))
+            thread.start()
+            thread.join()
+        self.assertGreater(stamped[0], self.past)
+        self.assertTrue(field.auto_now)
+
+
 class UserProfileModelTest(TestCase):
 
     def setUp(self):
@@ -158,4 +232,356 @@ class LoginSerializerTest(TestCase):
         data = {"username": "loginuser", "password": "loginpass123"}
         serializer = LoginSerializer(data=data)
         with self.assertRaises(ValidationError):
-            serializer.is_valid(raise_exception=True)
\ No newline at end of file
+            serializer.is_valid(raise_exception=True)
+
+class ClaimsJWTAuthenticationTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="claimsuser", password="claimspass123")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Claims",
+            last_name="User",
+            email="claims@example.com",
+            phone_number="+1555000100",
+        )
+        self.auth = ClaimsJWTAuthentication()
+        recent_users.clear()
+
+    def authenticate(self, token):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.auth.authenticate(request)
+
+    def test_tokens_carry_profile_claims(self):
+        access = tokens_for_user(self.user).access_token
+        self.assertEqual(access["profile_id"], self.profile.id)
+        self.assertTrue(access["is_active"])
+        self.assertEqual(access["token_version"], 0)
+
+    def test_authenticates_from_cache_without_queries(self):
+        token = tokens_for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(token)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(str(user.pk), str(self.user.pk))
+        self.assertEqual(user.profile_id, self.profile.id)
+        self.assertTrue(user.is_authenticated)
+
+    def test_tokens_without_claims_fall_back_to_database(self):
+        token = RefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate(token)
+        self.assertEqual(user, self.user)
+
+    def test_inactive_claim_is_rejected(self):
+        self.user.is_active = False
+        token = tokens_for_user(self.user).access_token
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_get_user_is_cached(self):
+        token = tokens_for_user(self.user).access_token
+        user, _ = self.authenticate(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.get_user(), self.user)
+
+    def test_bumping_token_version_revokes_tokens(self):
+        token = tokens_for_user(self.user).access_token
+        User.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_deactivating_user_revokes_tokens(self):
+        token = tokens_for_user(self.user).access_token
+        self.authenticate(token)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # Cached users stay valid until AUTH_USER_CACHE_TTL expires them.
+        recent_users.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_schema_documents_jwt_auth(self):
+        response = APIClient().get(reverse("schema"), {"format": "json"})
+        schema = response.json()
+        self.assertEqual(schema["components"]["securitySchemes"]["jwtAuth"]["scheme"], "bearer")
+        self.assertIn({"jwtAuth": []}, schema["paths"]["/blog/posts_list/"]["get"]["security"])
+
+    def test_recent_users_are_evicted(self):
+        cache = RecentUserCache()
+        with self.settings(AUTH_USER_CACHE_SIZE=2):
+            for key in ("a", "b", "c"):
+                cache.set(key, key)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+
+        with self.settings(AUTH_USER_CACHE_TTL=-1):
+            cache.set("d", "d")
+        self.assertIsNone(cache.get("d"))
+
+
+class RequestProfileTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="requestuser", password="requestpass123")
+        self.profile = UserProfile.objects.create(
+            user=self.user,
+            first_name="Request",
+            last_name="User",
+            email="request@example.com",
+            phone_number="+1555000200",
+        )
+
+    def make_request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        RequestProfileMiddleware(lambda request: None)(request)
+        return request
+
+    def test_profile_is_loaded_once_with_its_user(self):
+        request = self.make_request(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.profile.pk, self.profile.pk)
+            self.assertEqual(request.profile.user.username, "requestuser")
+            self.assertIs(get_profile(request), get_profile(request))
+
+    def test_profile_id_comes_from_token_claims(self):
+        token = tokens_for_user(self.user).access_token
+        request = self.make_request(ClaimsUser(token))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile_id(request), self.profile.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.profile.user, self.user)
+
+    def test_anonymous_request_has_no_profile(self):
+        request = self.make_request(AnonymousUser())
+        with self.assertRaises(UserProfile.DoesNotExist):
+            get_profile(request)
+
+
+@override_settings(ROOT_URLCONF="users.test")
+class AsyncMiddlewareConcurrencyTest(TestCase):
+    """
+    Under ASGI a single sync-only middleware makes Django run every request
+    through one thread, one at a time. Concurrent requests to an async view
+    must overlap with the project's MIDDLEWARE.
+    """
+
+    concurrent_requests = 4
+
+    async def assertRequestsOverlap(self):
+        client = AsyncClient()
+        started = time.monotonic()
+        responses = await asyncio.gather(*[client.get("/slow/") for _ in range(self.concurrent_requests)])
+        elapsed = time.monotonic() - started
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertLess(elapsed, SLOW_VIEW_SECONDS * self.concurrent_requests / 2)
+
+    async def test_async_views_run_concurrently(self):
+        await self.assertRequestsOverlap()
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_THRESHOLD=SLOW_VIEW_SECONDS / 2)
+    async def test_instrumented_async_views_run_concurrently(self):
+        with self.assertLogs("app.slow_requests", "WARNING") as logs:
+            await self.assertRequestsOverlap()
+
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([entry["path"] for entry in entries], ["/slow/"] * self.concurrent_requests)
+        self.assertTrue(all(entry["view_ms"] >= SLOW_VIEW_SECONDS * 1000 for entry in entries))
+
+    async def test_profile_is_attached_in_async_requests(self):
+        response = await AsyncClient().get("/slow/")
+        self.assertIn("profile", response.asgi_request.__dict__)
+
+
+class AuthViewTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="viewuser", password="viewpass123")
+        UserProfile.objects.create(
+            user=self.user,
+            first_name="View",
+            last_name="User",
+            email="view@example.com",
+            phone_number="+1555000300",
+        )
+
+    def login(self, username, password):
+        return self.client.post(
+            reverse("login user"), {"username": username, "password": password}, format="json",
+        )
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_THRESHOLD=1e-9)
+    def test_login_reports_server_timing(self):
+        with self.assertLogs("app.slow_requests", "WARNING") as logs:
+            response = self.login("viewuser", "viewpass123")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="[1-9]\d* queries", view;dur=')
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry["method"], entry["path"], entry["status"]), ("POST", reverse("login user"), 200))
+        self.assertEqual(entry["queries"], 1)
+
+    def test_signup_hashes_on_the_pool(self):
+        data = {
+            "username": "newviewuser",
+            "password": "strongpassword123",
+            "profile": {
+                "first_name": "New",
+                "last_name": "User",
+                "email": "newview@example.com",
+                "phone_number": "+1555000301",
+            },
+        }
+        hashing.pool.reset_stats()
+        response = self.client.post(reverse("register user"), data, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(hashing.pool.stats()["completed"], 1)
+
+        user = User.objects.get(username="newviewuser")
+        self.assertTrue(user.check_password("strongpassword123"))
+        self.assertEqual(user.user_profile.email, "newview@example.com")
+        self.assertIn("access", response.json()["data"])
+
+    def test_signup_validation_errors(self):
+        response = self.client.post(reverse("register user"), {"username": "viewuser"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json())
+
+    def test_login(self):
+        response = self.login("viewuser", "viewpass123")
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()["data"]
+        self.assertEqual(data["username"], "viewuser")
+        self.assertEqual(data["user_id"], str(self.user.id))
+
+    def test_login_rejects_bad_credentials(self):
+        self.user.is_active = False
+        self.user.save()
+        for username, password in [("viewuser", "wrongpass"), ("nobody", "viewpass123"), ("viewuser", "viewpass123")]:
+            response = self.login(username, password)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"non_field_errors": ["Invalid credentials"]})
+
+    def test_login_failures_send_user_login_failed(self):
+        failures = []
+
+        def receiver(sender, credentials, request, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.login("viewuser", "wrongpass")
+        self.login("nobody", "viewpass123")
+        self.login("viewuser", "viewpass123")
+        self.assertEqual(failures, [{"username": "viewuser"}, {"username": "nobody"}])
+
+    @override_settings(PASSWORD_HASHERS=[
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+    ])
+    def test_login_upgrades_outdated_hashes(self):
+        self.user.password = make_password("viewpass123", hasher="md5")
+        self.user.save()
+        response = self.login("viewuser", "viewpass123")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(self.user.check_password("viewpass123"))
+
+    def test_schema_documents_auth_views(self):
+        paths = self.client.get(reverse("schema"), {"format": "json"}).json()["paths"]
+        self.assertEqual(
+            paths["/user_auth/login_user/"]["post"]["requestBody"]["content"]["application/json"]["schema"],
+            {"$ref": "#/components/schemas/LoginCredentials"},
+        )
+        self.assertIn("201", paths["/user_auth/register_user/"]["post"]["responses"])
+
+    def test_hashing_stats_are_for_admins(self):
+        access = self.login("viewuser", "viewpass123").json()["data"]["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(self.client.get(reverse("hashing stats")).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        recent_users.clear()
+        response = self.client.get(reverse("hashing stats"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, hashing.pool.stats())
+
+    def test_logout_revokes_every_session(self):
+        first = self.login("viewuser", "viewpass123").json()["data"]
+        second = self.login("viewuser", "viewpass123").json()["data"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {first['access']}")
+        response = self.client.post(reverse("logout user"), {"refresh": first["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {second['access']}")
+        self.assertEqual(self.client.get(reverse("hashing stats")).status_code, 401)
+
+        # An old refresh token cannot log out a new session.
+        third = self.login("viewuser", "viewpass123").json()["data"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {third['access']}")
+        response = self.client.post(reverse("logout user"), {"refresh": second["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse("hashing stats")).status_code, 403)
+
+    def test_malformed_json(self):
+        response = self.client.post(reverse("login user"), "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_busy_pool_returns_503(self):
+        with mock.patch.object(hashing.pool, "submit", side_effect=PoolBusy):
+            response = self.login("viewuser", "viewpass123")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class HashingPoolTest(TestCase):
+
+    @override_settings(AUTH_HASHING_WORKERS=1, AUTH_HASHING_MAX_PENDING=2)
+    def test_rejects_beyond_max_pending(self):
+        pool = HashingPool()
+        release = threading.Event()
+        futures = [pool.submit(release.wait, 5) for _ in range(2)]
+        with self.assertRaises(PoolBusy):
+            pool.submit(release.wait, 5)
+        self.assertEqual(pool.stats()["pending"], 2)
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        stats = pool.stats()
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["peak_pending"], 2)
+        # Room again once the queue drains.
+        self.assertEqual(pool.submit(len, "abc").result(timeout=5), 3)
+
+
+@override_settings(IMAGE_VARIANTS_IN_BACKGROUND=False)
+class ProfilePhotoVariantsTest(TestCase):
+
+    def test_profile_photo_variants_are_serialized(self):
+        buffer = BytesIO()
+        Image.new("RGB", (400, 400), "blue").save(buffer, "JPEG")
+        user = User.objects.create_user(username="portrait", password="pass12345")
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            with self.captureOnCommitCallbacks(execute=True):
+                profile = UserProfile.objects.create(
+                    user=user,
+                    first_name="Portrait",
+                    last_name="User",
+                    email="portrait@example.com",
+                    phone_number="+1000000060",
+                    profile_photo=SimpleUploadedFile("me.jpg", buffer.getvalue()),
+                )
+            profile.refresh_from_db()
+            variants = UserProfileSerializer(profile).data["profile_photo_variants"]
+
+        self.assertEqual(variants["thumbnail"], "/media/staff/photos/variants/me_thumbnail.jpg")
+        self.assertEqual(variants["thumbnail_webp"], "/media/staff/photos/variants/me_thumbnail.webp")
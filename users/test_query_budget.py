@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.authentication import recent_users, tokens_for_user
+from users.models import User, UserProfile
+
+
+class AuthQueryBudgetTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="budgetuser", password="budgetpass123")
+        UserProfile.objects.create(
+            user=self.user,
+            first_name="Budget",
+            last_name="User",
+            email="budget@example.com",
+            phone_number="+1555000000",
+        )
+        recent_users.clear()
+
+    def assertBudget(self, budget, url, data, status_code):
+        with self.assertNumQueries(budget):
+            response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response
+
+    def test_register_budget(self):
+        data = {
+            "username": "newbudgetuser",
+            "password": "strongpassword123",
+            "profile": {
+                "first_name": "New",
+                "last_name": "User",
+                "email": "new@example.com",
+                "phone_number": "+1555000001",
+            },
+        }
+        # username (unique validator and validate_username), email and phone
+        # uniqueness checks, user insert, profile insert
+        self.assertBudget(6, reverse("register user"), data, 201)
+
+    def test_login_budget(self):
+        data = {"username": "budgetuser", "password": "budgetpass123"}
+        # user lookup with the profile (for the token claims) joined
+        self.assertBudget(1, reverse("login user"), data, 200)
+
+    def test_logout_budget(self):
+        refresh = tokens_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        # JWT revocation check (user lookup), token_version bump
+        self.assertBudget(2, reverse("logout user"), {"refresh": str(refresh)}, 200)
+
+        # The logout revoked the access token too.
+        response = self.client.post(reverse("logout user"), {"refresh": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)